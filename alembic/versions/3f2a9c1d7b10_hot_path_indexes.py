@@ -0,0 +1,123 @@
+"""hot path composite indexes
+
+Replaces single-column indexes with composites matching the hot queries.
+All index DDL runs CONCURRENTLY (outside a transaction) so writes are not
+blocked while indexes build.
+
+  transactions  (user_id, created_at DESC, id DESC)
+      list_transactions / DSAR: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+      replaces ix_transactions_user_id (leading column makes it redundant)
+  transactions  (created_at DESC, id DESC)
+      admin listing: ORDER BY created_at DESC, id DESC with keyset cursor
+  transactions  (created_at, id) WHERE status = 'pending'
+      partial: settlement / pending scans only touch the small PENDING set
+  audit_logs    (user_id, timestamp DESC)
+      DSAR / compliance filter: WHERE user_id = ? ORDER BY timestamp DESC
+      replaces ix_audit_logs_user_id
+  audit_logs    (action, timestamp DESC)
+      compliance filter: WHERE action = ? ORDER BY timestamp DESC
+      replaces ix_audit_logs_action
+  consents      (user_id, purpose) INCLUDE (consent_given)
+      covering: consent checks by user and purpose are index-only scans
+      replaces ix_consents_user_id and ix_consents_purpose (4 distinct values)
+
+Transaction enum labels are renamed to the enum values ('pending', ...),
+which is what the endpoints write, so the partial index predicate matches.
+
+Capture plans before/after with: python -m benchmarks.explain_hot_paths
+
+Revision ID: 3f2a9c1d7b10
+Revises: 
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+ENUM_LABELS = {
+    "transactiontype": ["DEPOSIT", "WITHDRAWAL", "TRANSFER", "PAYMENT", "REFUND"],
+    "transactionstatus": ["PENDING", "COMPLETED", "FAILED", "CANCELLED"],
+}
+
+NEW_INDEXES = [
+    (
+        "ix_transactions_user_id_created_at",
+        "transactions (user_id, created_at DESC, id DESC)",
+    ),
+    (
+        "ix_transactions_created_at_id",
+        "transactions (created_at DESC, id DESC)",
+    ),
+    (
+        "ix_transactions_pending",
+        "transactions (created_at, id) WHERE status = 'pending'",
+    ),
+    (
+        "ix_audit_logs_user_id_timestamp",
+        "audit_logs (user_id, timestamp DESC)",
+    ),
+    (
+        "ix_audit_logs_action_timestamp",
+        "audit_logs (action, timestamp DESC)",
+    ),
+    (
+        "ix_consents_user_id_purpose",
+        "consents (user_id, purpose) INCLUDE (consent_given)",
+    ),
+]
+
+REDUNDANT_INDEXES = [
+    ("ix_transactions_user_id", "transactions (user_id)"),
+    ("ix_audit_logs_user_id", "audit_logs (user_id)"),
+    ("ix_audit_logs_action", "audit_logs (action)"),
+    ("ix_consents_user_id", "consents (user_id)"),
+    ("ix_consents_purpose", "consents (purpose)"),
+]
+
+
+def _rename_enum_labels(labels: dict, to_lower: bool) -> None:
+    for type_name, names in labels.items():
+        for name in names:
+            old, new = (name, name.lower()) if to_lower else (name.lower(), name)
+            op.execute(
+                f"""
+                DO $$ BEGIN
+                    IF EXISTS (
+                        SELECT 1 FROM pg_enum e JOIN pg_type t ON t.oid = e.enumtypid
+                        WHERE t.typname = '{type_name}' AND e.enumlabel = '{old}'
+                    ) THEN
+                        ALTER TYPE {type_name} RENAME VALUE '{old}' TO '{new}';
+                    END IF;
+                END $$;
+                """
+            )
+
+
+def upgrade() -> None:
+    _rename_enum_labels(ENUM_LABELS, to_lower=True)
+    
+    with op.get_context().autocommit_block():
+        for name, definition in NEW_INDEXES:
+            # A failed CONCURRENTLY build leaves an INVALID index behind; drop it first
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            op.execute(f"CREATE INDEX CONCURRENTLY {name} ON {definition}")
+        for name, _ in REDUNDANT_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, definition in REDUNDANT_INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+        for name, _ in NEW_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    
+    _rename_enum_labels(ENUM_LABELS, to_lower=False)
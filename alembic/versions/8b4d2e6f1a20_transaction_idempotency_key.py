@@ -0,0 +1,42 @@
+"""transaction idempotency key
+
+Adds transactions.idempotency_key and a unique (user_id, idempotency_key)
+constraint, the database backstop for Idempotency-Key retries. The column is
+nullable (no table rewrite) and the unique index is built CONCURRENTLY, then
+attached as a constraint.
+
+Revision ID: 8b4d2e6f1a20
+Revises: 3f2a9c1d7b10
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4d2e6f1a20'
+down_revision = '3f2a9c1d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("transactions", sa.Column("idempotency_key", sa.String(255), nullable=True))
+    
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_transactions_user_id_idempotency_key")
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY uq_transactions_user_id_idempotency_key "
+            "ON transactions (user_id, idempotency_key)"
+        )
+    
+    op.execute(
+        "ALTER TABLE transactions ADD CONSTRAINT uq_transactions_user_id_idempotency_key "
+        "UNIQUE USING INDEX uq_transactions_user_id_idempotency_key"
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_transactions_user_id_idempotency_key", "transactions", type_="unique")
+    op.drop_column("transactions", "idempotency_key")
@@ -0,0 +1,44 @@
+"""retention purge
+
+Adds purge_checkpoints (resume points of keyset-batched purge jobs) and a
+partial index over the users marked for deletion, which the retention purge
+scans in id order:
+
+  users  (id, data_retention_until) WHERE data_retention_until IS NOT NULL
+
+Revision ID: a3d7f9b2c584
+Revises: f5c1e7a3d926
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d7f9b2c584'
+down_revision = 'f5c1e7a3d926'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "purge_checkpoints",
+        sa.Column("name", sa.String(100), primary_key=True),
+        sa.Column("last_id", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    
+    with op.get_context().autocommit_block():
+        # A failed CONCURRENTLY build leaves an INVALID index behind; drop it first
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_retention")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY ix_users_retention ON users (id, data_retention_until) "
+            "WHERE data_retention_until IS NOT NULL"
+        )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_users_retention")
+    op.drop_table("purge_checkpoints")
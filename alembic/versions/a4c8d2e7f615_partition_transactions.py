@@ -0,0 +1,226 @@
+"""partition transactions by month
+
+Rebuilds transactions as a table range-partitioned by month on created_at,
+without taking the table offline:
+
+  1. create transaction_keys (global reference / idempotency key registry)
+     and an empty partitioned shadow table transactions_p with monthly
+     partitions covering existing data plus PARTITION_MONTHS_AHEAD
+  2. a mirror trigger copies every insert/update/delete on transactions
+     into the shadow table while it is backfilled; the trigger's copy of a
+     row always wins over the backfill's
+  3. backfill in id-range batches, each committed on its own; each batch
+     locks its source rows FOR SHARE, so concurrent updates and deletes of
+     those rows wait for it and are then mirrored on top of it
+  4. swap the tables in one short ACCESS EXCLUSIVE transaction
+
+The old table is kept as transactions_old for verification; drop it once
+row counts match. Unique constraints on a partitioned table must include
+the partition key, so reference and (user_id, idempotency_key) uniqueness
+move to transaction_keys, maintained by triggers.
+
+Revision ID: a4c8d2e7f615
+Revises: e2f9b6c3a841
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8d2e7f615'
+down_revision = 'e2f9b6c3a841'
+branch_labels = None
+depends_on = None
+
+
+BACKFILL_BATCH_SIZE = 50000
+MONTHS_AHEAD = 3
+
+# (final name, definition on the shadow table)
+INDEXES = [
+    ("ix_transactions_id", "(id)"),
+    ("ix_transactions_reference", "(reference)"),
+    ("ix_transactions_user_id_created_at", "(user_id, created_at DESC, id DESC)"),
+    ("ix_transactions_created_at_id", "(created_at DESC, id DESC)"),
+    ("ix_transactions_pending", "(created_at, id) WHERE status = 'pending'"),
+    ("ix_transactions_updated_at", "(updated_at)"),
+]
+
+OLD_INDEXES = [name for name, _ in INDEXES] + [
+    "transactions_pkey",
+    "uq_transactions_user_id_idempotency_key",
+]
+
+KEY_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION transactions_register_key() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO transaction_keys (reference, user_id, idempotency_key, transaction_id, created_at)
+    VALUES (NEW.reference, NEW.user_id, NEW.idempotency_key, NEW.id, NEW.created_at)
+    ON CONFLICT (user_id, idempotency_key) DO NOTHING;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION transactions_release_key() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM transaction_keys WHERE reference = OLD.reference AND transaction_id = OLD.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# {assignments}: "col = EXCLUDED.col" for every column, filled in at upgrade time.
+# An upsert, not DO NOTHING: a row backfilled by a still-uncommitted batch is
+# invisible to the trigger's DELETE, so the insert conflicts with it and must
+# overwrite it with the newer version.
+MIRROR_FUNCTION = """
+CREATE OR REPLACE FUNCTION transactions_mirror() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM transactions_p WHERE id = OLD.id AND created_at = OLD.created_at;
+        DELETE FROM transaction_keys WHERE transaction_id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO transactions_p SELECT (NEW).*
+        ON CONFLICT (id, created_at) DO UPDATE SET {assignments};
+        INSERT INTO transaction_keys (reference, user_id, idempotency_key, transaction_id, created_at)
+        VALUES (NEW.reference, NEW.user_id, NEW.idempotency_key, NEW.id, NEW.created_at)
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "transaction_keys",
+        sa.Column("reference", sa.String(100), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("idempotency_key", sa.String(255), nullable=True),
+        sa.Column("transaction_id", sa.Integer(), nullable=False, unique=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("user_id", "idempotency_key", name="uq_transaction_keys_user_id_idempotency_key"),
+    )
+    
+    # Shadow table: same columns and defaults (id keeps using transactions_id_seq)
+    op.execute("CREATE TABLE transactions_p (LIKE transactions INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+    op.execute("ALTER TABLE transactions_p ADD CONSTRAINT transactions_p_pkey PRIMARY KEY (id, created_at)")
+    op.execute(
+        "ALTER TABLE transactions_p ADD CONSTRAINT transactions_p_user_id_fkey "
+        "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE"
+    )
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month date := date_trunc('month', COALESCE((SELECT MIN(created_at) FROM transactions), NOW()))::date;
+            last_month date := (date_trunc('month', NOW()) + INTERVAL '{MONTHS_AHEAD} months')::date;
+        BEGIN
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF transactions_p FOR VALUES FROM (%L) TO (%L)',
+                    'transactions_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+                    month, (month + INTERVAL '1 month')::date
+                );
+                month := (month + INTERVAL '1 month')::date;
+            END LOOP;
+        END $$;
+        """
+    )
+    # The shadow table is empty, so building its indexes now is cheap
+    for name, definition in INDEXES:
+        op.execute(f"CREATE INDEX {name}_p ON transactions_p {definition}")
+    
+    columns = op.get_bind().execute(
+        sa.text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = 'transactions' "
+            "ORDER BY ordinal_position"
+        )
+    ).scalars().all()
+    assignments = ", ".join(f'"{column}" = EXCLUDED."{column}"' for column in columns)
+    op.execute(MIRROR_FUNCTION.format(assignments=assignments))
+    op.execute(
+        "CREATE TRIGGER transactions_mirror AFTER INSERT OR UPDATE OR DELETE ON transactions "
+        "FOR EACH ROW EXECUTE FUNCTION transactions_mirror()"
+    )
+    
+    # Backfill in batches, each in its own transaction, so locks stay short
+    with op.get_context().autocommit_block():
+        bounds = op.get_bind().execute(sa.text("SELECT MIN(id) AS low, MAX(id) AS high FROM transactions")).fetchone()
+        if bounds.low is not None:
+            for low in range(bounds.low, bounds.high + 1, BACKFILL_BATCH_SIZE):
+                params = {"low": low, "high": low + BACKFILL_BATCH_SIZE - 1}
+                op.get_bind().execute(
+                    sa.text(
+                        "INSERT INTO transactions_p SELECT * FROM transactions "
+                        "WHERE id BETWEEN :low AND :high FOR SHARE ON CONFLICT DO NOTHING"
+                    ),
+                    params,
+                )
+                op.get_bind().execute(
+                    sa.text(
+                        "INSERT INTO transaction_keys (reference, user_id, idempotency_key, transaction_id, created_at) "
+                        "SELECT reference, user_id, idempotency_key, id, created_at FROM transactions "
+                        "WHERE id BETWEEN :low AND :high ON CONFLICT DO NOTHING"
+                    ),
+                    params,
+                )
+    
+    # Swap
+    op.execute("LOCK TABLE transactions IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER transactions_mirror ON transactions")
+    op.execute("DROP FUNCTION transactions_mirror()")
+    for name in OLD_INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_old")
+    op.execute("ALTER TABLE transactions RENAME TO transactions_old")
+    op.execute("ALTER TABLE transactions_p RENAME TO transactions")
+    op.execute("ALTER TABLE transactions RENAME CONSTRAINT transactions_p_pkey TO transactions_pkey")
+    op.execute("ALTER TABLE transactions RENAME CONSTRAINT transactions_p_user_id_fkey TO transactions_user_id_fkey")
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX {name}_p RENAME TO {name}")
+    op.execute("ALTER SEQUENCE IF EXISTS transactions_id_seq OWNED BY transactions.id")
+    
+    op.execute(KEY_FUNCTIONS)
+    op.execute(
+        "CREATE TRIGGER transactions_register_key BEFORE INSERT ON transactions "
+        "FOR EACH ROW EXECUTE FUNCTION transactions_register_key()"
+    )
+    op.execute(
+        "CREATE TRIGGER transactions_release_key AFTER DELETE ON transactions "
+        "FOR EACH ROW EXECUTE FUNCTION transactions_release_key()"
+    )
+
+
+def downgrade() -> None:
+    # Offline: copies the data back into a plain table
+    op.execute("DROP TABLE IF EXISTS transactions_old")
+    op.execute("LOCK TABLE transactions IN ACCESS EXCLUSIVE MODE")
+    op.execute("CREATE TABLE transactions_plain (LIKE transactions INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO transactions_plain SELECT * FROM transactions")
+    op.execute("ALTER SEQUENCE IF EXISTS transactions_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE transactions")
+    op.execute("DROP FUNCTION IF EXISTS transactions_register_key()")
+    op.execute("DROP FUNCTION IF EXISTS transactions_release_key()")
+    op.execute("ALTER TABLE transactions_plain RENAME TO transactions")
+    op.execute("ALTER SEQUENCE IF EXISTS transactions_id_seq OWNED BY transactions.id")
+    op.execute("ALTER TABLE transactions ADD CONSTRAINT transactions_pkey PRIMARY KEY (id)")
+    op.execute(
+        "ALTER TABLE transactions ADD CONSTRAINT transactions_user_id_fkey "
+        "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE"
+    )
+    op.execute("ALTER TABLE transactions ADD CONSTRAINT transactions_reference_key UNIQUE (reference)")
+    op.execute(
+        "ALTER TABLE transactions ADD CONSTRAINT uq_transactions_user_id_idempotency_key "
+        "UNIQUE (user_id, idempotency_key)"
+    )
+    for name, definition in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON transactions {definition}")
+    op.drop_table("transaction_keys")
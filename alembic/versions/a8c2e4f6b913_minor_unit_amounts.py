@@ -0,0 +1,143 @@
+"""minor-unit amounts
+
+Stores money as BIGINT minor units (cents for ZAR) instead of NUMERIC.
+
+transactions (large, partitioned) is converted online:
+  1. add nullable amount_minor and make the old amount nullable (catalog only)
+  2. a BEFORE INSERT/UPDATE trigger keeps amount and amount_minor in step,
+     so code from before and after the deploy can run side by side
+  3. backfill amount_minor in id-range batches, each committed on its own
+  4. NOT NULL per partition via a CHECK constraint added NOT VALID and
+     validated without blocking writes, then on the parent
+
+The legacy amount column and the sync trigger stay until every deployed
+worker writes amount_minor; a follow-up migration drops them.
+
+balances, account_balances and monthly_summaries are small derived tables
+and are converted in place (amount -> amount_minor, total -> total_minor).
+
+Revision ID: a8c2e4f6b913
+Revises: f3b6d8a2c157
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8c2e4f6b913'
+down_revision = 'f3b6d8a2c157'
+branch_labels = None
+depends_on = None
+
+
+BACKFILL_BATCH_SIZE = 50000
+
+# Snapshot of app.core.currency.CURRENCY_EXPONENTS (non-default entries)
+EXPONENT_SQL = (
+    "(CASE {column} WHEN 'JPY' THEN 0 WHEN 'KRW' THEN 0 "
+    "WHEN 'BHD' THEN 3 WHEN 'KWD' THEN 3 WHEN 'OMR' THEN 3 ELSE 2 END)"
+)
+
+# (table, old column, new column, old type)
+DERIVED_COLUMNS = [
+    ("balances", "amount", "amount_minor", "numeric(15, 2)"),
+    ("account_balances", "amount", "amount_minor", "numeric(15, 2)"),
+    ("monthly_summaries", "total", "total_minor", "numeric(20, 2)"),
+]
+
+
+def _scale(table_alias: str = "") -> str:
+    return f"(10::numeric ^ {EXPONENT_SQL.format(column=table_alias + 'currency')})"
+
+
+SYNC_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION transactions_sync_amount() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        IF NEW.amount_minor IS NULL THEN
+            NEW.amount_minor := round(NEW.amount * {_scale('NEW.')})::bigint;
+        ELSIF NEW.amount IS NULL THEN
+            NEW.amount := NEW.amount_minor / {_scale('NEW.')};
+        END IF;
+    ELSIF NEW.amount IS DISTINCT FROM OLD.amount THEN
+        NEW.amount_minor := round(NEW.amount * {_scale('NEW.')})::bigint;
+    ELSIF NEW.amount_minor IS DISTINCT FROM OLD.amount_minor THEN
+        NEW.amount := NEW.amount_minor / {_scale('NEW.')};
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def _partitions() -> list[str]:
+    result = op.get_bind().execute(
+        sa.text(
+            """
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = 'transactions'
+            ORDER BY c.relname
+            """
+        )
+    )
+    return [row[0] for row in result]
+
+
+def upgrade() -> None:
+    op.add_column("transactions", sa.Column("amount_minor", sa.BigInteger(), nullable=True))
+    op.alter_column("transactions", "amount", nullable=True)
+    op.execute(SYNC_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER transactions_sync_amount BEFORE INSERT OR UPDATE ON transactions "
+        "FOR EACH ROW EXECUTE FUNCTION transactions_sync_amount()"
+    )
+    
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        bounds = bind.execute(sa.text("SELECT MIN(id) AS low, MAX(id) AS high FROM transactions")).fetchone()
+        if bounds.low is not None:
+            for low in range(bounds.low, bounds.high + 1, BACKFILL_BATCH_SIZE):
+                bind.execute(
+                    sa.text(
+                        f"UPDATE transactions SET amount_minor = round(amount * {_scale()})::bigint "
+                        "WHERE id BETWEEN :low AND :high AND amount_minor IS NULL"
+                    ),
+                    {"low": low, "high": low + BACKFILL_BATCH_SIZE - 1},
+                )
+        
+        for partition in _partitions():
+            check = f"{partition}_amount_minor_not_null"
+            op.execute(f"ALTER TABLE {partition} ADD CONSTRAINT {check} CHECK (amount_minor IS NOT NULL) NOT VALID")
+            op.execute(f"ALTER TABLE {partition} VALIDATE CONSTRAINT {check}")
+            # Uses the validated CHECK instead of scanning the partition
+            op.execute(f"ALTER TABLE {partition} ALTER COLUMN amount_minor SET NOT NULL")
+            op.execute(f"ALTER TABLE {partition} DROP CONSTRAINT {check}")
+    
+    op.alter_column("transactions", "amount_minor", nullable=False)
+    
+    for table, old, new, _ in DERIVED_COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {old} DROP DEFAULT")
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {old} TYPE bigint "
+            f"USING round({old} * {_scale()})::bigint"
+        )
+        op.execute(f"ALTER TABLE {table} RENAME COLUMN {old} TO {new}")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {new} SET DEFAULT 0")
+
+
+def downgrade() -> None:
+    for table, old, new, old_type in DERIVED_COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {new} DROP DEFAULT")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {new} TYPE {old_type} USING {new} / {_scale()}")
+        op.execute(f"ALTER TABLE {table} RENAME COLUMN {new} TO {old}")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {old} SET DEFAULT 0")
+    
+    op.execute(f"UPDATE transactions SET amount = amount_minor / {_scale()} WHERE amount IS NULL")
+    op.execute("DROP TRIGGER IF EXISTS transactions_sync_amount ON transactions")
+    op.execute("DROP FUNCTION IF EXISTS transactions_sync_amount()")
+    op.alter_column("transactions", "amount", nullable=False)
+    op.drop_column("transactions", "amount_minor")
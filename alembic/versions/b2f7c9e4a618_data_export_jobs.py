@@ -0,0 +1,60 @@
+"""data export jobs
+
+Adds data_export_jobs for asynchronous data subject exports, with a partial
+unique index allowing one queued or running job per user.
+
+Revision ID: b2f7c9e4a618
+Revises: e6a1b3d5f729
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2f7c9e4a618'
+down_revision = 'e6a1b3d5f729'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "data_export_jobs",
+        sa.Column("id", sa.String(32), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("queued", "running", "completed", "failed", "expired", name="dataexportstatus"),
+            nullable=False,
+        ),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("file_path", sa.String(500), nullable=True),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=True),
+        sa.Column("checksum", sa.String(64), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_data_export_jobs_user_id", "data_export_jobs", ["user_id"])
+    op.create_index(
+        "uq_data_export_jobs_user_id_active",
+        "data_export_jobs",
+        ["user_id"],
+        unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+    )
+    op.create_index(
+        "ix_data_export_jobs_queued",
+        "data_export_jobs",
+        ["created_at"],
+        postgresql_where=sa.text("status = 'queued'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("data_export_jobs")
+    op.execute("DROP TYPE IF EXISTS dataexportstatus")
@@ -0,0 +1,36 @@
+"""settlement retry columns
+
+Adds transactions.settlement_attempts and next_settlement_at for the
+settlement workers' retry backoff. Constant default and nullable column,
+so neither rewrites the table.
+
+Revision ID: b9e3f5a1c472
+Revises: a4c8d2e7f615
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e3f5a1c472'
+down_revision = 'a4c8d2e7f615'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "transactions",
+        sa.Column("settlement_attempts", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "transactions",
+        sa.Column("next_settlement_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("transactions", "next_settlement_at")
+    op.drop_column("transactions", "settlement_attempts")
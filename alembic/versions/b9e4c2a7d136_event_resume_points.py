@@ -0,0 +1,69 @@
+"""event resume points
+
+Replaces transactions_notify_status so each status event carries resume_us:
+the transition's updated_at capped at the commit horizon (the start of the
+oldest other open transaction). Replaying from it catches transitions of
+long-running writers that commit after the event, which a fixed look-back
+on updated_at could miss.
+
+Revision ID: b9e4c2a7d136
+Revises: a3d7f9b2c584
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e4c2a7d136'
+down_revision = 'a3d7f9b2c584'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION transactions_notify_status() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('transaction_events', json_build_object(
+                'id', NEW.id,
+                'user_id', NEW.user_id,
+                'reference', NEW.reference,
+                'status', NEW.status,
+                'completed_at', NEW.completed_at,
+                'resume_us', (EXTRACT(EPOCH FROM LEAST(
+                    NEW.updated_at,
+                    (SELECT LEAST(NOW(), COALESCE(MIN(xact_start), NOW()))
+                     FROM pg_stat_activity
+                     WHERE datname = current_database()
+                     AND backend_type = 'client backend'
+                     AND xact_start IS NOT NULL
+                     AND pid <> pg_backend_pid())
+                )) * 1000000)::bigint
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION transactions_notify_status() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('transaction_events', json_build_object(
+                'id', NEW.id,
+                'user_id', NEW.user_id,
+                'reference', NEW.reference,
+                'status', NEW.status,
+                'completed_at', NEW.completed_at,
+                'updated_us', (EXTRACT(EPOCH FROM NEW.updated_at) * 1000000)::bigint
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
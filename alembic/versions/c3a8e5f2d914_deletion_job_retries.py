@@ -0,0 +1,31 @@
+"""deletion job retries
+
+Adds deletion_jobs.next_attempt_at: a failed attempt returns the job to
+pending with a backoff instead of leaving it failed for good. Nullable
+column, so the table is not rewritten.
+
+Revision ID: c3a8e5f2d914
+Revises: b9e4c2a7d136
+Create Date: 2026-10-20 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a8e5f2d914'
+down_revision = 'b9e4c2a7d136'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "deletion_jobs",
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("deletion_jobs", "next_attempt_at")
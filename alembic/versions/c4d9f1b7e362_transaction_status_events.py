@@ -0,0 +1,52 @@
+"""transaction status events
+
+Adds the transactions_notify_status trigger, which NOTIFYs the
+transaction_events channel when a transaction's status changes. API workers
+LISTEN on it to push status events over SSE.
+
+Revision ID: c4d9f1b7e362
+Revises: a8c2e4f6b913
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d9f1b7e362'
+down_revision = 'a8c2e4f6b913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION transactions_notify_status() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('transaction_events', json_build_object(
+                'id', NEW.id,
+                'user_id', NEW.user_id,
+                'reference', NEW.reference,
+                'status', NEW.status,
+                'completed_at', NEW.completed_at,
+                'updated_us', (EXTRACT(EPOCH FROM NEW.updated_at) * 1000000)::bigint
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER transactions_notify_status
+        AFTER UPDATE OF status ON transactions
+        FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status)
+        EXECUTE FUNCTION transactions_notify_status()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS transactions_notify_status ON transactions")
+    op.execute("DROP FUNCTION IF EXISTS transactions_notify_status()")
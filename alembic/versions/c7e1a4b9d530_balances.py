@@ -0,0 +1,43 @@
+"""balances ledger
+
+Creates the per-user, per-currency balances table and seeds it from the
+already completed transactions.
+
+Revision ID: c7e1a4b9d530
+Revises: 8b4d2e6f1a20
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e1a4b9d530'
+down_revision = '8b4d2e6f1a20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "balances",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("currency", sa.String(3), primary_key=True),
+        sa.Column("amount", sa.Numeric(15, 2), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.execute(
+        """
+        INSERT INTO balances (user_id, currency, amount)
+        SELECT user_id, currency,
+               SUM(CASE WHEN transaction_type IN ('deposit', 'refund') THEN amount ELSE -amount END)
+        FROM transactions
+        WHERE status = 'completed'
+        GROUP BY user_id, currency
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("balances")
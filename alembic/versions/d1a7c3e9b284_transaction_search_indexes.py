@@ -0,0 +1,85 @@
+"""transaction search indexes
+
+Indexes for GET /transactions/search:
+
+  transactions  USING brin (created_at)
+      wide date-range scans; created_at follows insert order
+  transactions  (recipient_account, created_at DESC) WHERE recipient_account IS NOT NULL
+  transactions  (sender_account, created_at DESC) WHERE sender_account IS NOT NULL
+      counterparty search (OR of both becomes a BitmapOr)
+  transactions  (created_at DESC, id DESC) WHERE status = 'failed'
+      partial: failed-transaction triage
+
+transactions is partitioned and CREATE INDEX CONCURRENTLY does not work on a
+partitioned table, so each index is created ON ONLY the parent (invalid,
+no data), built CONCURRENTLY on every partition and attached; the parent
+index becomes valid once all partitions are attached. Partitions created
+later inherit the indexes automatically.
+
+Check plans with: python -m benchmarks.explain_hot_paths
+
+Revision ID: d1a7c3e9b284
+Revises: b9e3f5a1c472
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1a7c3e9b284'
+down_revision = 'b9e3f5a1c472'
+branch_labels = None
+depends_on = None
+
+
+# (name, suffix for partition index names, definition)
+INDEXES = [
+    ("ix_transactions_created_at_brin", "created_at_brin", "USING brin (created_at)"),
+    (
+        "ix_transactions_recipient_account",
+        "recipient_account",
+        "(recipient_account, created_at DESC) WHERE recipient_account IS NOT NULL",
+    ),
+    (
+        "ix_transactions_sender_account",
+        "sender_account",
+        "(sender_account, created_at DESC) WHERE sender_account IS NOT NULL",
+    ),
+    ("ix_transactions_failed", "failed", "(created_at DESC, id DESC) WHERE status = 'failed'"),
+]
+
+
+def _partitions() -> list[str]:
+    result = op.get_bind().execute(
+        sa.text(
+            """
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = 'transactions'
+            ORDER BY c.relname
+            """
+        )
+    )
+    return [row[0] for row in result]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        partitions = _partitions()
+        for name, suffix, definition in INDEXES:
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY transactions {definition}")
+            for partition in partitions:
+                partition_index = f"{partition}_{suffix}"
+                # A failed CONCURRENTLY build leaves an INVALID index behind; drop it first
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {partition_index}")
+                op.execute(f"CREATE INDEX CONCURRENTLY {partition_index} ON {partition} {definition}")
+                op.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}")
+
+
+def downgrade() -> None:
+    # Dropping the parent index drops the attached partition indexes
+    for name, _, _ in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
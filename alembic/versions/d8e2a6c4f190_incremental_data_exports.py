@@ -0,0 +1,71 @@
+"""incremental data exports
+
+Adds data_export_watermarks (the last /data-subject/export per user) and the
+indexes delta exports read through:
+
+  transactions  (user_id, updated_at)
+  consents      (user_id, updated_at)
+
+transactions is partitioned, so its index is created ON ONLY the parent,
+built CONCURRENTLY on every partition and attached (see d1a7c3e9b284).
+
+Revision ID: d8e2a6c4f190
+Revises: b2f7c9e4a618
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8e2a6c4f190'
+down_revision = 'b2f7c9e4a618'
+branch_labels = None
+depends_on = None
+
+
+def _partitions() -> list[str]:
+    result = op.get_bind().execute(
+        sa.text(
+            """
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = 'transactions'
+            ORDER BY c.relname
+            """
+        )
+    )
+    return [row[0] for row in result]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "data_export_watermarks",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("export_id", sa.String(32), nullable=False),
+        sa.Column("base_export_id", sa.String(32), nullable=True),
+        sa.Column("watermark", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_consents_user_id_updated_at")
+        op.execute("CREATE INDEX CONCURRENTLY ix_consents_user_id_updated_at ON consents (user_id, updated_at)")
+        
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_transactions_user_id_updated_at ON ONLY transactions (user_id, updated_at)"
+        )
+        for partition in _partitions():
+            partition_index = f"{partition}_user_id_updated_at"
+            # A failed CONCURRENTLY build leaves an INVALID index behind; drop it first
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {partition_index}")
+            op.execute(f"CREATE INDEX CONCURRENTLY {partition_index} ON {partition} (user_id, updated_at)")
+            op.execute(f"ALTER INDEX ix_transactions_user_id_updated_at ATTACH PARTITION {partition_index}")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_transactions_user_id_updated_at")
+    op.execute("DROP INDEX IF EXISTS ix_consents_user_id_updated_at")
+    op.drop_table("data_export_watermarks")
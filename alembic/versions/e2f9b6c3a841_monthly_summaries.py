@@ -0,0 +1,57 @@
+"""monthly summaries rollup
+
+Adds transactions.updated_at (non-volatile default, so no table rewrite) with
+a CONCURRENTLY built index for incremental rollup scans, plus the
+monthly_summaries and rollup_watermarks tables. The first run of
+app.transactions.summaries backfills all buckets (watermark starts at epoch).
+
+Revision ID: e2f9b6c3a841
+Revises: c7e1a4b9d530
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2f9b6c3a841'
+down_revision = 'c7e1a4b9d530'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "transactions",
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    
+    op.create_table(
+        "monthly_summaries",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("month", sa.Date(), primary_key=True),
+        sa.Column("transaction_type", sa.String(20), primary_key=True),
+        sa.Column("status", sa.String(20), primary_key=True),
+        sa.Column("currency", sa.String(3), primary_key=True),
+        sa.Column("count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("total", sa.Numeric(20, 2), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_table(
+        "rollup_watermarks",
+        sa.Column("name", sa.String(100), primary_key=True),
+        sa.Column("watermark", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_transactions_updated_at")
+        op.execute("CREATE INDEX CONCURRENTLY ix_transactions_updated_at ON transactions (updated_at)")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_updated_at", table_name="transactions")
+    op.drop_table("rollup_watermarks")
+    op.drop_table("monthly_summaries")
+    op.drop_column("transactions", "updated_at")
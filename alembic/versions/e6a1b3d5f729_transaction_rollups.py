@@ -0,0 +1,42 @@
+"""transaction analytics rollups
+
+Adds transaction_rollups (platform-wide minute, hour and day buckets with
+amount sketches) for GET /transactions/analytics. The first run of
+app.transactions.analytics backfills them (watermark starts at epoch).
+
+Revision ID: e6a1b3d5f729
+Revises: c4d9f1b7e362
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a1b3d5f729'
+down_revision = 'c4d9f1b7e362'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "transaction_rollups",
+        sa.Column("granularity", sa.String(10), primary_key=True),
+        sa.Column("bucket", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("transaction_type", sa.String(20), primary_key=True),
+        sa.Column("status", sa.String(20), primary_key=True),
+        sa.Column("currency", sa.String(3), primary_key=True),
+        sa.Column("count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("total_minor", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("sketch_bins", postgresql.ARRAY(sa.SmallInteger()), nullable=False),
+        sa.Column("sketch_counts", postgresql.ARRAY(sa.BigInteger()), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("transaction_rollups")
+    op.execute("DELETE FROM rollup_watermarks WHERE name = 'transaction_rollups'")
@@ -0,0 +1,56 @@
+"""account sub-ledgers
+
+Creates account_balances (counterparty account balances split into
+sub-ledger shards) and hot_accounts (accounts whose postings are spread
+over several shards), and seeds shard 0 from completed transactions.
+
+Revision ID: f3b6d8a2c157
+Revises: d1a7c3e9b284
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b6d8a2c157'
+down_revision = 'd1a7c3e9b284'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "account_balances",
+        sa.Column("account", sa.String(50), primary_key=True),
+        sa.Column("currency", sa.String(3), primary_key=True),
+        sa.Column("shard", sa.SmallInteger(), primary_key=True, server_default="0"),
+        sa.Column("amount", sa.Numeric(15, 2), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_table(
+        "hot_accounts",
+        sa.Column("account", sa.String(50), primary_key=True),
+        sa.Column("shards", sa.SmallInteger(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.execute(
+        """
+        INSERT INTO account_balances (account, currency, shard, amount)
+        SELECT account, currency, 0, SUM(amount)
+        FROM (
+            SELECT recipient_account AS account, currency, amount FROM transactions
+            WHERE status = 'completed' AND recipient_account IS NOT NULL
+            UNION ALL
+            SELECT sender_account AS account, currency, -amount FROM transactions
+            WHERE status = 'completed' AND sender_account IS NOT NULL
+        ) AS legs
+        GROUP BY account, currency
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("hot_accounts")
+    op.drop_table("account_balances")
@@ -0,0 +1,61 @@
+"""deletion jobs
+
+Adds deletion_jobs for chunked, resumable hard deletion of users, with a
+partial unique index allowing one pending or running deletion per user.
+
+Revision ID: f5c1e7a3d926
+Revises: d8e2a6c4f190
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c1e7a3d926'
+down_revision = 'd8e2a6c4f190'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "deletion_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("reason", sa.String(50), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("pending", "running", "completed", "failed", name="deletionjobstatus"),
+            nullable=False,
+        ),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("step", sa.String(50), nullable=True),
+        sa.Column("progress", postgresql.JSONB(), nullable=False, server_default="{}"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("requested_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_deletion_jobs_user_id", "deletion_jobs", ["user_id"])
+    op.create_index(
+        "uq_deletion_jobs_user_id_active",
+        "deletion_jobs",
+        ["user_id"],
+        unique=True,
+        postgresql_where=sa.text("status IN ('pending', 'running')"),
+    )
+    op.create_index(
+        "ix_deletion_jobs_pending",
+        "deletion_jobs",
+        ["requested_at"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("deletion_jobs")
+    op.execute("DROP TYPE IF EXISTS deletionjobstatus")
@@ -3,6 +3,7 @@ Authentication Endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
 from datetime import timedelta
@@ -19,7 +20,7 @@ from app.auth.dependencies import get_current_user
 from app.auth.mfa import mfa_service
 from app.models.user import User, UserRole
 from app.models.audit_log import AuditAction
-from app.compliance.audit import log_audit_event
+from app.compliance.audit import queue_audit_event
 import structlog
 
 logger = structlog.get_logger()
@@ -115,10 +116,15 @@ async def login(
 ):
     """
     User login with optional MFA
+    Hot path: one SELECT and one UPDATE ... RETURNING in a single transaction,
+    audit records are handed to the background audit writer
     """
-    # Get user
+    # Get user (only the columns needed to authenticate)
     result = await db.execute(
-        "SELECT * FROM users WHERE email = :email",
+        """
+        SELECT id, email, hashed_password, role, is_active, mfa_enabled, mfa_secret
+        FROM users WHERE email = :email
+        """,
         {"email": login_data.email}
     )
     user_row = result.fetchone()
@@ -129,11 +135,11 @@ async def login(
             detail="Incorrect email or password",
         )
     
-    # Verify password
-    if not verify_password(login_data.password, user_row.hashed_password):
-        await log_audit_event(
-            db=db,
+    # Verify password (bcrypt is CPU bound - keep it off the event loop)
+    if not await run_in_threadpool(verify_password, login_data.password, user_row.hashed_password):
+        await queue_audit_event(
             user_id=user_row.id,
+            user_email=user_row.email,
             action=AuditAction.ACCESS_DENIED,
             resource_type="user",
             description="Failed login attempt - incorrect password",
@@ -159,9 +165,9 @@ async def login(
             )
         
         if not mfa_service.verify_token(user_row.mfa_secret, login_data.mfa_token):
-            await log_audit_event(
-                db=db,
+            await queue_audit_event(
                 user_id=user_row.id,
+                user_email=user_row.email,
                 action=AuditAction.ACCESS_DENIED,
                 resource_type="user",
                 description="Failed login attempt - invalid MFA token",
@@ -171,17 +177,29 @@ async def login(
                 detail="Invalid MFA token",
             )
     
-    # Update last login
-    await db.execute(
-        "UPDATE users SET last_login = NOW() WHERE id = :user_id",
+    # Update last login and read back the token claims in the same statement.
+    # The is_active guard closes the race with a concurrent deactivation.
+    result = await db.execute(
+        """
+        UPDATE users SET last_login = NOW()
+        WHERE id = :user_id AND is_active = true
+        RETURNING id, email, role
+        """,
         {"user_id": user_row.id}
     )
+    user = result.fetchone()
     await db.commit()
     
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive",
+        )
+    
     # Log successful login
-    await log_audit_event(
-        db=db,
-        user_id=user_row.id,
+    await queue_audit_event(
+        user_id=user.id,
+        user_email=user.email,
         action=AuditAction.LOGIN,
         resource_type="user",
         description="User logged in successfully",
@@ -189,10 +207,10 @@ async def login(
     
     # Create tokens
     access_token = create_access_token(
-        data={"sub": user_row.id, "email": user_row.email, "role": user_row.role}
+        data={"sub": user.id, "email": user.email, "role": user.role}
     )
     refresh_token = create_refresh_token(
-        data={"sub": user_row.id}
+        data={"sub": user.id}
     )
     
     return TokenResponse(
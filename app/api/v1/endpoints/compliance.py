@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List, Dict, Any
+import json
 from app.core.database import get_db
 from app.auth.dependencies import require_role
 from app.models.user import User
@@ -129,6 +130,55 @@ async def get_audit_logs(
     ]
 
 
+@router.get("/deletion-jobs")
+async def get_deletion_jobs(
+    limit: int = 100,
+    user_id: int | None = None,
+    status: str | None = None,
+    current_user: User = Depends(require_role(["admin", "auditor"])),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Personal data deletion jobs and their progress (POPIA: Retention)
+    progress holds the rows deleted so far per table; step is the table
+    currently being deleted from
+    """
+    query = "SELECT * FROM deletion_jobs WHERE 1=1"
+    params = {}
+    
+    if user_id:
+        query += " AND user_id = :user_id"
+        params["user_id"] = user_id
+    
+    if status:
+        query += " AND status = :status"
+        params["status"] = status
+    
+    query += " ORDER BY requested_at DESC LIMIT :limit"
+    params["limit"] = limit
+    
+    result = await db.execute(query, params)
+    jobs = result.fetchall()
+    
+    return [
+        {
+            "id": job.id,
+            "user_id": job.user_id,
+            "reason": job.reason,
+            "status": job.status,
+            "step": job.step,
+            "progress": job.progress if isinstance(job.progress, dict) else json.loads(job.progress),
+            "attempts": job.attempts,
+            "error": job.error,
+            "requested_at": job.requested_at.isoformat() if job.requested_at else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+            "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+        }
+        for job in jobs
+    ]
+
+
 @router.get("/compliance-status")
 async def get_compliance_status(
     current_user: User = Depends(require_role(["admin"])),
@@ -2,17 +2,22 @@
 Data Subject Rights Endpoints - POPIA Compliance
 Implements data subject rights: access, correction, deletion, portability
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import Dict, Any
-from datetime import datetime
+from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+import os
 from app.core.database import get_db
 from app.auth.dependencies import get_current_active_user
 from app.models.user import User
-from app.compliance.audit import log_audit_event
+from app.compliance.audit import log_audit_event, queue_audit_event
+from app.compliance.data_access import ACCESS_SECTIONS, get_export_watermark, stream_export, stream_personal_data
+from app.compliance.deletion import request_deletion
+from app.compliance.export_jobs import create_export_job, signed_download_url, verify_download
 from app.models.audit_log import AuditAction
-import json
+from app.models.data_export import DataExportStatus
 
 router = APIRouter()
 
@@ -34,40 +39,8 @@ async def access_personal_data(
     """
     POPIA Section 23: Right to Access
     Data subject can request access to their personal information
+    Streamed section by section, so any history length uses constant memory
     """
-    # Collect all user data
-    user_result = await db.execute(
-        "SELECT * FROM users WHERE id = :user_id",
-        {"user_id": current_user.id}
-    )
-    user = user_result.fetchone()
-    
-    # Get transactions
-    transactions_result = await db.execute(
-        "SELECT * FROM transactions WHERE user_id = :user_id ORDER BY created_at DESC",
-        {"user_id": current_user.id}
-    )
-    transactions = transactions_result.fetchall()
-    
-    # Get consents
-    consents_result = await db.execute(
-        "SELECT * FROM consents WHERE user_id = :user_id ORDER BY created_at DESC",
-        {"user_id": current_user.id}
-    )
-    consents = consents_result.fetchall()
-    
-    # Get audit logs (user's own access)
-    audit_result = await db.execute(
-        """
-        SELECT * FROM audit_logs 
-        WHERE user_id = :user_id 
-        ORDER BY timestamp DESC 
-        LIMIT 100
-        """,
-        {"user_id": current_user.id}
-    )
-    audit_logs = audit_result.fetchall()
-    
     # Log data access (POPIA: audit all data access)
     await log_audit_event(
         db=db,
@@ -77,54 +50,9 @@ async def access_personal_data(
         description="Data subject accessed personal information",
     )
     
-    return DataAccessResponse(
-        user_data={
-            "id": user.id,
-            "email": user.email,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "phone_number": user.phone_number,
-            "role": user.role,
-            "is_active": user.is_active,
-            "mfa_enabled": user.mfa_enabled,
-            "consent_given": user.consent_given,
-            "consent_date": user.consent_date.isoformat() if user.consent_date else None,
-            "created_at": user.created_at.isoformat() if user.created_at else None,
-        },
-        transactions=[
-            {
-                "id": t.id,
-                "transaction_type": t.transaction_type,
-                "status": t.status,
-                "amount": str(t.amount),
-                "currency": t.currency,
-                "reference": t.reference,
-                "description": t.description,
-                "created_at": t.created_at.isoformat() if t.created_at else None,
-            }
-            for t in transactions
-        ],
-        consents=[
-            {
-                "id": c.id,
-                "purpose": c.purpose,
-                "consent_given": c.consent_given,
-                "given_at": c.given_at.isoformat() if c.given_at else None,
-                "withdrawn_at": c.withdrawn_at.isoformat() if c.withdrawn_at else None,
-            }
-            for c in consents
-        ],
-        audit_logs=[
-            {
-                "id": a.id,
-                "action": a.action,
-                "resource_type": a.resource_type,
-                "description": a.description,
-                "timestamp": a.timestamp.isoformat() if a.timestamp else None,
-            }
-            for a in audit_logs
-        ],
-        exported_at=datetime.utcnow(),
+    return StreamingResponse(
+        stream_personal_data(current_user.id, ACCESS_SECTIONS),
+        media_type="application/json",
     )
 
 
@@ -219,34 +147,53 @@ async def delete_personal_data(
             "deletion_date": None,  # Will be calculated
         }
     else:
-        # Hard delete if no transactions
-        await db.execute("DELETE FROM users WHERE id = :user_id", {"user_id": current_user.id})
+        # Hard delete if no transactions: deactivate now, delete in the background
+        await db.execute(
+            "UPDATE users SET is_active = false, updated_at = NOW() WHERE id = :user_id",
+            {"user_id": current_user.id}
+        )
+        job_id = await request_deletion(db, current_user.id, "data_subject_request")
         await db.commit()
         
-        return {"message": "Account and all personal data deleted successfully"}
+        await log_audit_event(
+            db=db,
+            user_id=current_user.id,
+            action=AuditAction.DELETE,
+            resource_type="user",
+            resource_id=current_user.id,
+            description="Data subject requested deletion (hard delete)",
+            metadata={"deletion_job_id": job_id},
+        )
+        
+        return {
+            "message": "Account deactivated. All personal data is being permanently deleted.",
+            "deletion_job_id": job_id,
+        }
 
 
 @router.get("/export")
 async def export_personal_data(
+    since: Optional[datetime] = Query(None, description="Only records created or changed at or after this time"),
+    delta: bool = Query(False, description="Only records created or changed since your last export"),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
     POPIA: Right to Data Portability
     Export personal data in machine-readable format (JSON)
+    Full by default; incremental with since= or delta=true (see the manifest)
     """
-    # Get all data (same as access endpoint)
-    access_data = await access_personal_data(current_user, db)
+    if since is not None and delta:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either since or delta, not both",
+        )
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
     
-    # Convert to JSON
-    export_data = {
-        "user_data": access_data.user_data,
-        "transactions": access_data.transactions,
-        "consents": access_data.consents,
-        "exported_at": access_data.exported_at.isoformat(),
-        "format": "JSON",
-        "version": "1.0",
-    }
+    watermark = await get_export_watermark(db, current_user.id)
+    if delta and watermark is not None:
+        since = watermark.watermark
     
     # Log export
     await log_audit_event(
@@ -254,8 +201,131 @@ async def export_personal_data(
         user_id=current_user.id,
         action=AuditAction.DATA_EXPORT,
         resource_type="data_subject",
-        description="Data subject exported personal information",
+        description="Data subject exported personal information" + (" (incremental)" if since else ""),
+        metadata={"since": since.isoformat()} if since else None,
+    )
+    
+    return StreamingResponse(
+        stream_export(current_user.id, watermark, since, chained=delta),
+        media_type="application/json",
+        headers={"Content-Disposition": 'attachment; filename="personal-data.json"'},
     )
+
+
+class DataExportJobResponse(BaseModel):
+    """Data export job status"""
+    id: str
+    status: str
+    created_at: datetime
+    completed_at: Optional[datetime]
+    expires_at: Optional[datetime]  # Archive deleted after this
+    size_bytes: Optional[int]
+    checksum: Optional[str]  # SHA-256 of the archive
+    download_url: Optional[str] = None  # Signed link, set once completed
+    download_url_expires_at: Optional[datetime] = None
+
+
+def _export_job_response(job) -> DataExportJobResponse:
+    response = DataExportJobResponse(
+        id=job.id,
+        status=job.status,
+        created_at=job.created_at,
+        completed_at=job.completed_at,
+        expires_at=job.expires_at,
+        size_bytes=job.size_bytes,
+        checksum=job.checksum,
+    )
+    if job.status == DataExportStatus.COMPLETED.value:
+        url, expires = signed_download_url(job.id)
+        response.download_url = url
+        response.download_url_expires_at = datetime.fromtimestamp(expires, tz=timezone.utc)
+    return response
+
+
+@router.post("/export-jobs", response_model=DataExportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_data_export_job(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    POPIA: Right to Data Portability (asynchronous)
+    Queue a full export archive; a user's queued or running job is returned
+    instead of starting another
+    """
+    job, created = await create_export_job(db, current_user.id)
+    
+    if created:
+        await queue_audit_event(
+            user_id=current_user.id,
+            user_email=current_user.email,
+            action=AuditAction.DATA_EXPORT,
+            resource_type="data_subject",
+            description="Data subject requested an export archive",
+            metadata={"job_id": job.id},
+        )
     
-    return export_data
+    return _export_job_response(job)
+
+
+@router.get("/export-jobs/{job_id}", response_model=DataExportJobResponse)
+async def get_data_export_job(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Export job status, with a signed download link once completed"""
+    result = await db.execute(
+        "SELECT * FROM data_export_jobs WHERE id = :job_id AND user_id = :user_id",
+        {"job_id": job_id, "user_id": current_user.id}
+    )
+    job = result.fetchone()
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export job not found",
+        )
+    return _export_job_response(job)
 
+
+@router.get("/export-jobs/{job_id}/download")
+async def download_data_export(
+    job_id: str,
+    expires: int = Query(...),
+    signature: str = Query(...),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Download an export archive
+    Authorized by the signed link from the job status, not a bearer token
+    """
+    if not verify_download(job_id, expires, signature):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Download link is invalid or has expired",
+        )
+    
+    result = await db.execute(
+        "SELECT * FROM data_export_jobs WHERE id = :job_id AND status = :completed",
+        {"job_id": job_id, "completed": DataExportStatus.COMPLETED.value}
+    )
+    job = result.fetchone()
+    if job is None or not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export archive not available",
+        )
+    
+    await queue_audit_event(
+        user_id=job.user_id,
+        action=AuditAction.DATA_EXPORT,
+        resource_type="data_subject",
+        description="Data subject downloaded an export archive",
+        metadata={"job_id": job.id},
+    )
+    
+    return FileResponse(
+        job.file_path,
+        media_type="application/zip",
+        filename=f"personal-data-{job.id}.zip",
+        headers={"Cache-Control": "no-store"},
+    )
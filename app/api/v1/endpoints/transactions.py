@@ -1,38 +1,67 @@
 """
 Transaction Endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, Header
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel
-from typing import List, Optional
-from decimal import Decimal
-from datetime import datetime
+from pydantic import BaseModel, model_validator
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+from datetime import date, datetime, timedelta, timezone
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.currency import currency_exponent, exponent_sql, format_minor_units, to_minor_units
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.idempotency import idempotency_store, request_fingerprint
 from app.auth.dependencies import get_current_active_user
 from app.models.user import User
 from app.models.transaction import TransactionType, TransactionStatus
-from app.compliance.audit import log_audit_event
+from app.compliance.audit import log_audit_event, queue_audit_event
+from app.transactions.ingest import BulkIngestResult, ingest_transactions
+from app.transactions.references import reference_generator
+from app.transactions.velocity import velocity_engine
+from app.transactions.analytics import choose_resolution, query_rollups, sketch_percentile
+from app.transactions.events import event_broker, replay_events, stream_events
+from app.transactions.etags import (
+    TERMINAL_CACHE_CONTROL,
+    TERMINAL_STATUSES,
+    cache_control,
+    etag_matches,
+    terminal_transactions,
+    transaction_etag,
+)
+from app.transactions.export import MEDIA_TYPES as EXPORT_MEDIA_TYPES, accepts_gzip, stream_transactions
 from app.models.audit_log import AuditAction
 
 router = APIRouter()
 
 
 class TransactionCreate(BaseModel):
-    """Create transaction request"""
+    """Create transaction request (amount in major units, e.g. "1000.00")"""
     transaction_type: TransactionType
     amount: Decimal
     currency: str = "ZAR"
     description: Optional[str] = None
     recipient_account: Optional[str] = None
+    
+    @model_validator(mode="after")
+    def check_amount_precision(self):
+        # Amounts are stored in minor units; reject sub-minor-unit fractions
+        to_minor_units(self.amount, self.currency)
+        return self
+    
+    @property
+    def amount_minor(self) -> int:
+        return to_minor_units(self.amount, self.currency)
 
 
 class TransactionResponse(BaseModel):
-    """Transaction response"""
+    """Transaction response (amount formatted from minor units, e.g. "1000.00")"""
     id: int
     user_id: int
     transaction_type: str
     status: str
-    amount: Decimal
+    amount: str
     currency: str
     reference: str
     description: Optional[str]
@@ -40,9 +69,21 @@ class TransactionResponse(BaseModel):
     completed_at: Optional[datetime]
 
 
+def generate_reference() -> str:
+    """Generate a unique, time-ordered transaction reference"""
+    return reference_generator.generate()
+
+
 @router.post("/", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
 async def create_transaction(
     transaction_data: TransactionCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Client-generated key; retries with the same key return the original result",
+    ),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -50,97 +91,266 @@ async def create_transaction(
     Create a new transaction
     POPIA: Only stores necessary transaction data
     """
-    import uuid
+    idempotency_scope = None
+    fingerprint = None
+    if idempotency_key:
+        idempotency_scope = f"idem:transactions:{current_user.id}:{idempotency_key}"
+        fingerprint = request_fingerprint(transaction_data.model_dump(mode="json"))
+        replay = await idempotency_store.acquire(idempotency_scope, fingerprint)
+        if replay is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+            return TransactionResponse(**replay)
+    
+    velocity = None
+    try:
+        velocity = await velocity_engine.check(
+            current_user.id, transaction_data.amount_minor, transaction_data.currency
+        )
+        if not velocity.allowed:
+            await queue_audit_event(
+                user_id=current_user.id,
+                user_email=current_user.email,
+                action=AuditAction.ACCESS_DENIED,
+                resource_type="transaction",
+                description=f"Transaction blocked by velocity rule {velocity.rule}",
+                metadata={"amount": str(transaction_data.amount), "currency": transaction_data.currency},
+            )
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Transaction velocity limit exceeded ({velocity.rule})",
+                headers={"Retry-After": str(velocity.retry_after)},
+            )
+        transaction_response, created = await _insert_transaction(
+            db, current_user, transaction_data, idempotency_key
+        )
+    except BaseException:
+        # Includes cancellation (client disconnect), which would otherwise leave the key in flight
+        if velocity is not None and velocity.allowed:
+            await velocity_engine.refund(
+                current_user.id, transaction_data.amount_minor, transaction_data.currency, velocity
+            )
+        if idempotency_scope:
+            await idempotency_store.release(idempotency_scope)
+        raise
+    
+    if idempotency_scope:
+        await idempotency_store.complete(
+            idempotency_scope, fingerprint, transaction_response.model_dump(mode="json")
+        )
+    
+    if not created:
+        # A replay of an existing transaction must not count against the limits
+        await velocity_engine.refund(
+            current_user.id, transaction_data.amount_minor, transaction_data.currency, velocity
+        )
+        response.headers["Idempotent-Replayed"] = "true"
+        return transaction_response
+    
+    # Log creation
+    await log_audit_event(
+        db=db,
+        user_id=current_user.id,
+        action=AuditAction.CREATE,
+        resource_type="transaction",
+        resource_id=transaction_response.id,
+        description=f"Created transaction {transaction_response.reference}",
+        metadata={"amount": str(transaction_data.amount), "type": transaction_data.transaction_type.value},
+    )
     
+    return transaction_response
+
+
+async def _insert_transaction(
+    db: AsyncSession,
+    current_user: User,
+    transaction_data: TransactionCreate,
+    idempotency_key: Optional[str],
+) -> tuple[TransactionResponse, bool]:
+    """
+    Insert a PENDING transaction
+    Returns (transaction, created); created is False when the key registry
+    already holds this (user_id, idempotency_key) and the insert was skipped
+    """
     # Generate unique reference
-    reference = f"TXN-{uuid.uuid4().hex[:12].upper()}"
+    reference = generate_reference()
     
     # Create transaction
     result = await db.execute(
         """
-        INSERT INTO transactions (user_id, transaction_type, status, amount, currency, 
-                                 reference, description, recipient_account, created_at)
-        VALUES (:user_id, :transaction_type, :status, :amount, :currency, :reference,
-                :description, :recipient_account, NOW())
+        INSERT INTO transactions (user_id, transaction_type, status, amount_minor, currency, 
+                                 reference, description, recipient_account, idempotency_key,
+                                 created_at)
+        VALUES (:user_id, :transaction_type, :status, :amount_minor, :currency, :reference,
+                :description, :recipient_account, :idempotency_key, NOW())
         RETURNING id, created_at
         """,
         {
             "user_id": current_user.id,
             "transaction_type": transaction_data.transaction_type.value,
             "status": TransactionStatus.PENDING.value,
-            "amount": transaction_data.amount,
+            "amount_minor": transaction_data.amount_minor,
             "currency": transaction_data.currency,
             "reference": reference,
             "description": transaction_data.description,
             "recipient_account": transaction_data.recipient_account,
+            "idempotency_key": idempotency_key,
         }
     )
     transaction = result.fetchone()
-    await db.commit()
     
-    # Log creation
-    await log_audit_event(
-        db=db,
-        user_id=current_user.id,
-        action=AuditAction.CREATE,
-        resource_type="transaction",
-        resource_id=transaction.id,
-        description=f"Created transaction {reference}",
-        metadata={"amount": str(transaction_data.amount), "type": transaction_data.transaction_type.value},
-    )
+    if transaction is None:
+        # Database backstop: the key was already used (e.g. idempotency store unavailable)
+        result = await db.execute(
+            """
+            SELECT t.* FROM transaction_keys k
+            JOIN transactions t ON t.id = k.transaction_id AND t.created_at = k.created_at
+            WHERE k.user_id = :user_id AND k.idempotency_key = :idempotency_key
+            """,
+            {"user_id": current_user.id, "idempotency_key": idempotency_key}
+        )
+        existing = result.fetchone()
+        if existing is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still in progress",
+            )
+        return TransactionResponse(
+            id=existing.id,
+            user_id=existing.user_id,
+            transaction_type=existing.transaction_type,
+            status=existing.status,
+            amount=format_minor_units(existing.amount_minor, existing.currency),
+            currency=existing.currency,
+            reference=existing.reference,
+            description=existing.description,
+            created_at=existing.created_at,
+            completed_at=existing.completed_at,
+        ), False
+    
+    await db.commit()
     
     return TransactionResponse(
         id=transaction.id,
         user_id=current_user.id,
         transaction_type=transaction_data.transaction_type.value,
         status=TransactionStatus.PENDING.value,
-        amount=transaction_data.amount,
+        amount=format_minor_units(transaction_data.amount_minor, transaction_data.currency),
         currency=transaction_data.currency,
         reference=reference,
         description=transaction_data.description,
         created_at=transaction.created_at,
         completed_at=None,
+    ), True
+
+
+@router.post("/bulk", response_model=BulkIngestResult)
+async def bulk_create_transactions(
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Bulk-create transactions from a streamed NDJSON or CSV body
+    One record per line; CSV needs a header row with TransactionCreate fields.
+    Invalid rows are skipped and reported with their line number.
+    """
+    result = await ingest_transactions(
+        request=request,
+        db=db,
+        user_id=current_user.id,
+        row_model=TransactionCreate,
+        generate_reference=generate_reference,
+    )
+    await db.commit()
+    
+    # One summarised audit record per batch
+    await queue_audit_event(
+        user_id=current_user.id,
+        user_email=current_user.email,
+        action=AuditAction.CREATE,
+        resource_type="transaction",
+        description=f"Bulk created {result.accepted} transactions (batch {result.batch_id})",
+        metadata={
+            "batch_id": result.batch_id,
+            "accepted": result.accepted,
+            "rejected": result.rejected,
+        },
     )
+    
+    return result
 
 
 @router.get("/", response_model=List[TransactionResponse])
 async def list_transactions(
-    skip: int = Query(0, ge=0),
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next link"),
     limit: int = Query(100, ge=1, le=1000),
+    skip: int = Query(
+        0,
+        ge=0,
+        le=settings.TRANSACTIONS_MAX_OFFSET,
+        deprecated=True,
+        description="Deprecated: use cursor pagination",
+    ),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """List user's transactions"""
-    # Only return user's own transactions (unless admin)
-    if current_user.role.value == "admin":
-        result = await db.execute(
-            """
-            SELECT * FROM transactions
-            ORDER BY created_at DESC
-            LIMIT :limit OFFSET :skip
-            """,
-            {"limit": limit, "skip": skip}
-        )
-    else:
-        result = await db.execute(
-            """
-            SELECT * FROM transactions
-            WHERE user_id = :user_id
-            ORDER BY created_at DESC
-            LIMIT :limit OFFSET :skip
-            """,
-            {"user_id": current_user.id, "limit": limit, "skip": skip}
+    """
+    List user's transactions, newest first
+    Keyset pagination on (created_at, id): pass the cursor from the
+    `Link: <...>; rel="next"` header to fetch the next page
+    """
+    if cursor and skip:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either cursor or skip, not both",
         )
     
+    conditions = []
+    params = {"limit": limit + 1}  # One extra row tells us if there is a next page
+    
+    # Only return user's own transactions (unless admin)
+    if current_user.role.value != "admin":
+        conditions.append("user_id = :user_id")
+        params["user_id"] = current_user.id
+    
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        conditions.append("(created_at, id) < (:cursor_created_at, :cursor_id)")
+        params["cursor_created_at"] = cursor_created_at
+        params["cursor_id"] = cursor_id
+    
+    query = "SELECT * FROM transactions"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY created_at DESC, id DESC LIMIT :limit"
+    
+    if skip:
+        # Deprecated OFFSET fallback (capped by TRANSACTIONS_MAX_OFFSET)
+        query += " OFFSET :skip"
+        params["skip"] = skip
+        response.headers["Deprecation"] = "true"
+    
+    result = await db.execute(query, params)
     transactions = result.fetchall()
     
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        last = transactions[-1]
+        next_url = request.url.remove_query_params("skip").include_query_params(
+            cursor=encode_cursor(last.created_at, last.id),
+            limit=limit,
+        )
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    
     # Log access
     await log_audit_event(
         db=db,
         user_id=current_user.id,
         action=AuditAction.READ,
         resource_type="transaction",
-        description=f"Listed transactions (limit={limit}, skip={skip})",
+        description=f"Listed transactions (limit={limit}, cursor={'yes' if cursor else 'no'}, skip={skip})",
     )
     
     return [
@@ -149,7 +359,7 @@ async def list_transactions(
             user_id=t.user_id,
             transaction_type=t.transaction_type,
             status=t.status,
-            amount=t.amount,
+            amount=format_minor_units(t.amount_minor, t.currency),
             currency=t.currency,
             reference=t.reference,
             description=t.description,
@@ -160,15 +370,496 @@ async def list_transactions(
     ]
 
 
+class BalanceResponse(BaseModel):
+    """Balance in one currency"""
+    currency: str
+    amount: str
+    updated_at: datetime
+
+
+@router.get("/balance", response_model=List[BalanceResponse])
+async def get_balance(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get the user's balance per currency
+    Reads the maintained ledger (completed transactions only)
+    """
+    result = await db.execute(
+        "SELECT currency, amount_minor, updated_at FROM balances WHERE user_id = :user_id ORDER BY currency",
+        {"user_id": current_user.id}
+    )
+    balances = result.fetchall()
+    
+    await queue_audit_event(
+        user_id=current_user.id,
+        user_email=current_user.email,
+        action=AuditAction.READ,
+        resource_type="balance",
+        description="Accessed balance",
+    )
+    
+    return [
+        BalanceResponse(
+            currency=b.currency,
+            amount=format_minor_units(b.amount_minor, b.currency),
+            updated_at=b.updated_at,
+        )
+        for b in balances
+    ]
+
+
+class MonthlySummaryResponse(BaseModel):
+    """Monthly totals for one type, status and currency"""
+    month: str  # YYYY-MM
+    transaction_type: str
+    status: str
+    currency: str
+    count: int
+    total: str
+
+
+@router.get("/summary", response_model=List[MonthlySummaryResponse])
+async def get_monthly_summary(
+    month_from: str = Query(..., alias="from", pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="First month (YYYY-MM)"),
+    month_to: str = Query(..., alias="to", pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="Last month, inclusive (YYYY-MM)"),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Monthly totals by type and status
+    Served from the monthly_summaries rollup (refreshed incrementally)
+    """
+    first_month = date.fromisoformat(f"{month_from}-01")
+    last_month = date.fromisoformat(f"{month_to}-01")
+    if first_month > last_month:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must not be after 'to'",
+        )
+    
+    result = await db.execute(
+        """
+        SELECT month, transaction_type, status, currency, count, total_minor
+        FROM monthly_summaries
+        WHERE user_id = :user_id AND month BETWEEN :first_month AND :last_month
+        ORDER BY month, transaction_type, status, currency
+        """,
+        {"user_id": current_user.id, "first_month": first_month, "last_month": last_month}
+    )
+    rows = result.fetchall()
+    
+    await queue_audit_event(
+        user_id=current_user.id,
+        user_email=current_user.email,
+        action=AuditAction.READ,
+        resource_type="transaction",
+        description=f"Accessed monthly summary ({month_from} to {month_to})",
+    )
+    
+    return [
+        MonthlySummaryResponse(
+            month=r.month.strftime("%Y-%m"),
+            transaction_type=r.transaction_type,
+            status=r.status,
+            currency=r.currency,
+            count=r.count,
+            total=format_minor_units(r.total_minor, r.currency),
+        )
+        for r in rows
+    ]
+
+
+@router.get("/export")
+async def export_transactions(
+    request: Request,
+    format: Literal["csv", "ndjson"] = Query("csv"),
+    date_from: Optional[datetime] = Query(None, alias="from", description="Inclusive lower bound on created_at"),
+    date_to: Optional[datetime] = Query(None, alias="to", description="Exclusive upper bound on created_at"),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Export transaction history as a streamed CSV or NDJSON statement
+    Constant memory for any history length; gzip-compressed while streaming
+    when the client's `Accept-Encoding` allows gzip (q-values honoured)
+    """
+    compress = accepts_gzip(request.headers.get("accept-encoding", ""))
+    
+    await queue_audit_event(
+        user_id=current_user.id,
+        user_email=current_user.email,
+        action=AuditAction.DATA_EXPORT,
+        resource_type="transaction",
+        description=f"Exported transaction statement ({format})",
+        metadata={
+            "from": date_from.isoformat() if date_from else None,
+            "to": date_to.isoformat() if date_to else None,
+        },
+    )
+    
+    headers = {
+        "Content-Disposition": f'attachment; filename="transactions.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    
+    return StreamingResponse(
+        stream_transactions(
+            user_id=current_user.id,
+            fmt=format,
+            date_from=date_from,
+            date_to=date_to,
+            compress=compress,
+        ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+
+@router.get("/search", response_model=List[TransactionResponse])
+async def search_transactions(
+    request: Request,
+    response: Response,
+    date_from: Optional[datetime] = Query(None, alias="from", description="Inclusive lower bound on created_at"),
+    date_to: Optional[datetime] = Query(None, alias="to", description="Exclusive upper bound on created_at"),
+    transaction_type: Optional[TransactionType] = Query(None),
+    transaction_status: Optional[TransactionStatus] = Query(None, alias="status"),
+    min_amount: Optional[Decimal] = Query(None, ge=0),
+    max_amount: Optional[Decimal] = Query(None, ge=0),
+    currency: Optional[str] = Query(None, min_length=3, max_length=3),
+    counterparty: Optional[str] = Query(None, max_length=50, description="Recipient or sender account"),
+    user_id: Optional[int] = Query(None, description="Staff only: restrict to one user"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next link"),
+    limit: int = Query(100, ge=1, le=settings.TRANSACTIONS_SEARCH_MAX_LIMIT),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Search transactions, newest first
+    Users search their own transactions; admins and auditors search all.
+    A search not narrowed to a user or counterparty is limited to a
+    created_at window of TRANSACTIONS_SEARCH_MAX_RANGE_DAYS (defaulting to
+    the most recent window), so it is always served by an index range scan.
+    """
+    is_staff = current_user.role.value in ("admin", "auditor")
+    if user_id is not None and not is_staff:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only staff can search other users' transactions",
+        )
+    if not is_staff:
+        user_id = current_user.id
+    
+    # Naive bounds are taken as UTC, so they compare with the aware defaults
+    if date_from is not None and date_from.tzinfo is None:
+        date_from = date_from.replace(tzinfo=timezone.utc)
+    if date_to is not None and date_to.tzinfo is None:
+        date_to = date_to.replace(tzinfo=timezone.utc)
+    
+    if min_amount is not None and max_amount is not None and min_amount > max_amount:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'min_amount' must not exceed 'max_amount'",
+        )
+    
+    if user_id is None and counterparty is None:
+        max_range = timedelta(days=settings.TRANSACTIONS_SEARCH_MAX_RANGE_DAYS)
+        if date_to is None:
+            date_to = datetime.now(timezone.utc)
+        if date_from is None:
+            date_from = date_to - max_range
+        if date_to - date_from > max_range:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Date range may not exceed {settings.TRANSACTIONS_SEARCH_MAX_RANGE_DAYS} days",
+            )
+    
+    if date_from is not None and date_to is not None and date_from >= date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must be before 'to'",
+        )
+    
+    conditions = []
+    params = {"limit": limit + 1}  # One extra row tells us if there is a next page
+    
+    if user_id is not None:
+        conditions.append("user_id = :user_id")
+        params["user_id"] = user_id
+    if date_from is not None:
+        conditions.append("created_at >= :date_from")
+        params["date_from"] = date_from
+    if date_to is not None:
+        conditions.append("created_at < :date_to")
+        params["date_to"] = date_to
+    # Enum filters are inlined (validated enum values) so partial index predicates match
+    if transaction_type is not None:
+        conditions.append(f"transaction_type = '{transaction_type.value}'")
+    if transaction_status is not None:
+        conditions.append(f"status = '{transaction_status.value}'")
+    # Amount bounds are in major units: exact minor units when the currency
+    # is known, otherwise scaled by each row's currency exponent
+    for name, bound, operator, rounding in (
+        ("min_amount", min_amount, ">=", ROUND_CEILING),
+        ("max_amount", max_amount, "<=", ROUND_FLOOR),
+    ):
+        if bound is None:
+            continue
+        if currency is not None:
+            conditions.append(f"amount_minor {operator} :{name}")
+            params[name] = int(bound.scaleb(currency_exponent(currency)).to_integral_value(rounding))
+        else:
+            conditions.append(f"amount_minor {operator} :{name} * (10::numeric ^ {exponent_sql('currency')})")
+            params[name] = bound
+    if currency is not None:
+        conditions.append("currency = :currency")
+        params["currency"] = currency.upper()
+    if counterparty is not None:
+        conditions.append("(recipient_account = :counterparty OR sender_account = :counterparty)")
+        params["counterparty"] = counterparty
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        conditions.append("(created_at, id) < (:cursor_created_at, :cursor_id)")
+        params["cursor_created_at"] = cursor_created_at
+        params["cursor_id"] = cursor_id
+    
+    query = "SELECT * FROM transactions"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY created_at DESC, id DESC LIMIT :limit"
+    
+    result = await db.execute(query, params)
+    transactions = result.fetchall()
+    
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        last = transactions[-1]
+        next_url = request.url.include_query_params(
+            cursor=encode_cursor(last.created_at, last.id),
+            limit=limit,
+        )
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    
+    filters = {
+        key: value for key, value in request.query_params.items()
+        if key not in ("cursor", "limit")
+    }
+    await queue_audit_event(
+        user_id=current_user.id,
+        user_email=current_user.email,
+        action=AuditAction.READ,
+        resource_type="transaction",
+        description=f"Searched transactions ({len(transactions)} results)",
+        metadata={"filters": filters},
+    )
+    
+    return [
+        TransactionResponse(
+            id=t.id,
+            user_id=t.user_id,
+            transaction_type=t.transaction_type,
+            status=t.status,
+            amount=format_minor_units(t.amount_minor, t.currency),
+            currency=t.currency,
+            reference=t.reference,
+            description=t.description,
+            created_at=t.created_at,
+            completed_at=t.completed_at,
+        )
+        for t in transactions
+    ]
+
+
+class AnalyticsPoint(BaseModel):
+    """Totals for one bucket (amounts in major units, percentiles estimated)"""
+    bucket: datetime
+    transaction_type: Optional[str] = None  # None when not grouped by type
+    status: Optional[str] = None  # None when not grouped by status
+    currency: str
+    count: int
+    total: str
+    average: str
+    percentiles: dict[str, str]  # "p50", "p90", "p95", "p99"
+
+
+class AnalyticsResponse(BaseModel):
+    """Analytics series at the bucket width actually used"""
+    bucket: str  # e.g. "1h", or "6h" when downsampled
+    bucket_seconds: int
+    points: List[AnalyticsPoint]
+
+
+ANALYTICS_PERCENTILES = (50, 90, 95, 99)
+
+
+@router.get("/analytics", response_model=AnalyticsResponse)
+async def transaction_analytics(
+    bucket: Literal["minute", "hour", "day"] = Query("hour"),
+    date_from: Optional[datetime] = Query(None, alias="from", description="Inclusive start (default: 1 day before 'to')"),
+    date_to: Optional[datetime] = Query(None, alias="to", description="Exclusive end (default: now)"),
+    group_by: List[Literal["transaction_type", "status"]] = Query(["transaction_type", "status"]),
+    transaction_type: Optional[TransactionType] = Query(None),
+    transaction_status: Optional[TransactionStatus] = Query(None, alias="status"),
+    currency: Optional[str] = Query(None, min_length=3, max_length=3),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Platform-wide transaction volume over time (admin only)
+    Served from the transaction_rollups tables; long ranges are downsampled
+    to at most ANALYTICS_MAX_POINTS buckets per series
+    """
+    if current_user.role.value != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    
+    date_to = date_to or datetime.now(timezone.utc)
+    date_from = date_from or date_to - timedelta(days=1)
+    if date_to.tzinfo is None:
+        date_to = date_to.replace(tzinfo=timezone.utc)
+    if date_from.tzinfo is None:
+        date_from = date_from.replace(tzinfo=timezone.utc)
+    if date_from >= date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must be before 'to'",
+        )
+    
+    label, bucket_seconds = choose_resolution(bucket, date_from, date_to)
+    rows = await query_rollups(
+        db,
+        start=date_from,
+        end=date_to,
+        bucket_seconds=bucket_seconds,
+        group_by=tuple(group_by),
+        filters={
+            "transaction_type": transaction_type.value if transaction_type else None,
+            "status": transaction_status.value if transaction_status else None,
+            "currency": currency.upper() if currency else None,
+        },
+    )
+    
+    await queue_audit_event(
+        user_id=current_user.id,
+        user_email=current_user.email,
+        action=AuditAction.READ,
+        resource_type="transaction",
+        description=f"Accessed transaction analytics ({label} buckets)",
+        metadata={"from": date_from.isoformat(), "to": date_to.isoformat()},
+    )
+    
+    return AnalyticsResponse(
+        bucket=label,
+        bucket_seconds=bucket_seconds,
+        points=[
+            AnalyticsPoint(
+                bucket=r.bucket,
+                transaction_type=getattr(r, "transaction_type", None),
+                status=getattr(r, "status", None),
+                currency=r.currency,
+                count=r.count,
+                total=format_minor_units(r.total_minor, r.currency),
+                average=format_minor_units((2 * r.total_minor + r.count) // (2 * r.count), r.currency),
+                percentiles={
+                    f"p{p}": format_minor_units(sketch_percentile(r.bins, r.counts, p), r.currency)
+                    for p in ANALYTICS_PERCENTILES
+                },
+            )
+            for r in rows
+        ],
+    )
+
+
+@router.get("/events")
+async def transaction_events(
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Server-Sent Events stream of the user's transaction status changes
+    Reconnect with `Last-Event-ID` to replay the transitions missed meanwhile
+    """
+    subscription = event_broker.subscribe(current_user.id)
+    if subscription is None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many open event streams",
+        )
+    
+    # Subscribed before replaying, so nothing falls between the two
+    replayed, resync = [], False
+    try:
+        if last_event_id:
+            replayed = await replay_events(db, current_user.id, last_event_id)
+            resync = replayed is None
+            replayed = replayed or []
+        # Release the pooled connection; the stream itself needs none
+        await db.commit()
+        
+        await queue_audit_event(
+            user_id=current_user.id,
+            user_email=current_user.email,
+            action=AuditAction.READ,
+            resource_type="transaction",
+            description="Subscribed to transaction status events",
+            metadata={"last_event_id": last_event_id},
+        )
+    except BaseException:
+        # Includes cancellation; from here on the stream unsubscribes itself
+        event_broker.unsubscribe(subscription)
+        raise
+    
+    return StreamingResponse(
+        stream_events(subscription, replayed, resync),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx)
+        },
+    )
+
+
 @router.get("/{transaction_id}", response_model=TransactionResponse)
 async def get_transaction(
     transaction_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get transaction by ID"""
+    """
+    Get transaction by ID
+    Sends a strong ETag; `If-None-Match` revalidation of a completed, failed
+    or cancelled transaction is answered from memory without a query
+    """
+    is_admin = current_user.role.value == "admin"
+    
+    cached = terminal_transactions.get(transaction_id)
+    if cached and (is_admin or cached.user_id == current_user.id) and etag_matches(if_none_match, cached.etag):
+        await queue_audit_event(
+            user_id=current_user.id,
+            user_email=current_user.email,
+            action=AuditAction.READ,
+            resource_type="transaction",
+            resource_id=transaction_id,
+            description=f"Revalidated transaction {cached.reference}",
+        )
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": cached.etag, "Cache-Control": TERMINAL_CACHE_CONTROL},
+        )
+    
     result = await db.execute(
-        "SELECT * FROM transactions WHERE id = :transaction_id",
+        """
+        SELECT * FROM transactions
+        WHERE id = :transaction_id
+        AND created_at = (SELECT created_at FROM transaction_keys WHERE transaction_id = :transaction_id)
+        """,
         {"transaction_id": transaction_id}
     )
     transaction = result.fetchone()
@@ -180,12 +871,28 @@ async def get_transaction(
         )
     
     # Check access (user can only see own transactions, unless admin)
-    if current_user.role.value != "admin" and transaction.user_id != current_user.id:
+    if not is_admin and transaction.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied",
         )
     
+    etag = transaction_etag(transaction.id, transaction.status, transaction.completed_at)
+    headers = {"ETag": etag, "Cache-Control": cache_control(transaction.status)}
+    if transaction.status in TERMINAL_STATUSES:
+        terminal_transactions.put(transaction.id, etag, transaction.user_id, transaction.reference)
+    
+    if etag_matches(if_none_match, etag):
+        await queue_audit_event(
+            user_id=current_user.id,
+            user_email=current_user.email,
+            action=AuditAction.READ,
+            resource_type="transaction",
+            resource_id=transaction_id,
+            description=f"Revalidated transaction {transaction.reference}",
+        )
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
     # Log access
     await log_audit_event(
         db=db,
@@ -196,12 +903,13 @@ async def get_transaction(
         description=f"Accessed transaction {transaction.reference}",
     )
     
+    response.headers.update(headers)
     return TransactionResponse(
         id=transaction.id,
         user_id=transaction.user_id,
         transaction_type=transaction.transaction_type,
         status=transaction.status,
-        amount=transaction.amount,
+        amount=format_minor_units(transaction.amount_minor, transaction.currency),
         currency=transaction.currency,
         reference=transaction.reference,
         description=transaction.description,
@@ -2,13 +2,23 @@
 Audit Logging Utilities - POPIA Compliance
 Helper functions for logging audit events
 """
+import asyncio
+from prometheus_client import Counter
+from sqlalchemy.exc import DataError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.audit_log import AuditLog, AuditAction
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
 import structlog
 
 logger = structlog.get_logger()
 
+AUDIT_EVENTS_DROPPED = Counter(
+    "audit_events_dropped_total",
+    "Audit events that could not be written",
+    ["reason"],  # queue_full, write_failed (database unavailable), rejected (by the database)
+)
+
 
 async def log_audit_event(
     db: AsyncSession,
@@ -53,9 +63,196 @@ async def log_audit_event(
         
         db.add(audit_log)
         await db.commit()
-        
+    
     except Exception as e:
         # Don't fail the main operation if audit logging fails
         logger.error("Failed to log audit event", error=str(e), action=action.value)
         await db.rollback()
 
+
+class AuditWriter:
+    """
+    Background audit writer
+    Buffers audit events in memory and writes them in batches on its own
+    session, so request handlers never wait on an audit INSERT/commit.
+    When the buffer is full, requests wait up to AUDIT_ENQUEUE_TIMEOUT_SECONDS
+    for room (backpressure); an event still not queued is dropped and
+    counted in audit_events_dropped_total, as is a batch the database stays
+    unavailable for through AUDIT_WRITE_MAX_ATTEMPTS.
+    """
+    
+    def __init__(self):
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+    
+    async def start(self):
+        """Start the background flush task (called from app lifespan)"""
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=settings.AUDIT_QUEUE_MAX_SIZE)
+        self._task = asyncio.create_task(self._run())
+        logger.info("Audit writer started")
+    
+    async def stop(self):
+        """Flush pending events and stop the background task"""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Audit writer stopped")
+    
+    async def enqueue(
+        self,
+        user_id: int | None,
+        action: AuditAction,
+        resource_type: str,
+        resource_id: int | None = None,
+        description: str | None = None,
+        metadata: dict | None = None,
+        user_email: str | None = None,
+        ip_address: str | None = None,
+        user_agent: str | None = None,
+    ) -> bool:
+        """
+        Hand an audit event to the background writer, waiting for room if
+        its buffer is full
+        Returns False only if the writer is not running
+        """
+        if self._queue is None:
+            return False
+        audit_log = AuditLog(
+            user_id=user_id,
+            user_email=user_email,
+            action=action,
+            resource_type=resource_type,
+            resource_id=resource_id,
+            description=description,
+            metadata=metadata or {},
+            ip_address=ip_address,
+            user_agent=user_agent,
+            cloud_provider=settings.CLOUD_PROVIDER,
+            region=settings.REGION,
+        )
+        try:
+            await asyncio.wait_for(self._queue.put(audit_log), timeout=settings.AUDIT_ENQUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            AUDIT_EVENTS_DROPPED.labels(reason="queue_full").inc()
+            logger.error(
+                "Audit queue full, event dropped",
+                action=action.value,
+                user_id=user_id,
+                resource_type=resource_type,
+                description=description,
+            )
+        return True
+    
+    async def _run(self):
+        """Drain the queue in batches"""
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                # Give concurrent requests a moment to add to the same batch
+                await asyncio.sleep(settings.AUDIT_FLUSH_INTERVAL_SECONDS)
+                while len(batch) < settings.AUDIT_BATCH_SIZE and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    async def _write(self, batch: list[AuditLog]):
+        """Write one batch in a single transaction, retrying with backoff while the database is unavailable"""
+        for attempt in range(settings.AUDIT_WRITE_MAX_ATTEMPTS):
+            try:
+                async with AsyncSessionLocal() as session:
+                    session.add_all(batch)
+                    await session.commit()
+                return
+            except (DataError, IntegrityError) as e:
+                # Rejected rows, not an outage: isolate them so the rest still lands
+                await self._isolate(batch, e)
+                return
+            except Exception as e:
+                error = e
+                if attempt + 1 < settings.AUDIT_WRITE_MAX_ATTEMPTS:
+                    delay = min(
+                        settings.AUDIT_WRITE_RETRY_MAX_SECONDS,
+                        settings.AUDIT_WRITE_RETRY_BASE_SECONDS * 2 ** attempt,
+                    )
+                    logger.warning(
+                        "Failed to write audit batch, retrying", error=str(e), batch_size=len(batch), retry_in=delay
+                    )
+                    await asyncio.sleep(delay)
+        
+        # Don't crash the writer if the database stays unavailable
+        AUDIT_EVENTS_DROPPED.labels(reason="write_failed").inc(len(batch))
+        logger.error("Failed to write audit batch, events dropped", error=str(error), batch_size=len(batch))
+    
+    async def _isolate(self, batch: list[AuditLog], error: Exception):
+        """Write a rejected batch in halves, down to the offending events"""
+        if len(batch) == 1:
+            audit_log = batch[0]
+            AUDIT_EVENTS_DROPPED.labels(reason="rejected").inc()
+            logger.error(
+                "Audit event rejected by the database",
+                error=str(error),
+                action=audit_log.action.value,
+                user_id=audit_log.user_id,
+                resource_type=audit_log.resource_type,
+                resource_id=audit_log.resource_id,
+                description=audit_log.description,
+            )
+            return
+        middle = len(batch) // 2
+        await self._write(batch[:middle])
+        await self._write(batch[middle:])
+
+
+async def queue_audit_event(
+    user_id: int | None,
+    action: AuditAction,
+    resource_type: str,
+    resource_id: int | None = None,
+    description: str | None = None,
+    metadata: dict | None = None,
+    user_email: str | None = None,
+    ip_address: str | None = None,
+    user_agent: str | None = None,
+):
+    """
+    Log an audit event without blocking the caller
+    Falls back to a direct write if the background writer is not running
+    """
+    queued = await audit_writer.enqueue(
+        user_id=user_id,
+        action=action,
+        resource_type=resource_type,
+        resource_id=resource_id,
+        description=description,
+        metadata=metadata,
+        user_email=user_email,
+        ip_address=ip_address,
+        user_agent=user_agent,
+    )
+    if not queued:
+        async with AsyncSessionLocal() as session:
+            await log_audit_event(
+                db=session,
+                user_id=user_id,
+                action=action,
+                resource_type=resource_type,
+                resource_id=resource_id,
+                description=description,
+                metadata=metadata,
+                ip_address=ip_address,
+                user_agent=user_agent,
+            )
+
+
+# Global audit writer instance
+audit_writer = AuditWriter()
@@ -0,0 +1,405 @@
+"""
+Data Subject Access Documents - POPIA Section 23
+Streams the access/export JSON document section by section from server-side
+cursors, so memory stays flat for any history length and the first bytes
+go out before the largest section has been read.
+
+Sections are read concurrently, each on its own pooled connection, so
+latency is that of the slowest section rather than the sum of all of them.
+A coordinating REPEATABLE READ transaction exports its snapshot
+(pg_export_snapshot) and every section transaction imports it, so the
+document is still one consistent snapshot of the subject's data. Sections
+are emitted in order; later ones read ahead by at most
+DATA_ACCESS_PREFETCH_BATCHES batches, and each has its own
+DATA_ACCESS_SECTION_TIMEOUT_SECONDS. Concurrent reads may hold at most
+DATA_ACCESS_POOL_SHARE of the connection pool between them; a read that
+would exceed it runs its sections one after another on a single
+connection instead, so DSAR requests can never starve the pool.
+
+Exports can be incremental: given a `since` time, sections hold only the
+records created or changed at or after it, and the document carries a
+manifest chaining it to the user's previous export (see export_manifest).
+A document is complete up to the commit horizon read just before its
+snapshot (see COMMIT_HORIZON_SQL), which is what the next delta continues
+from, so changes of long-running writers are never lost between deltas.
+"""
+import asyncio
+import json
+import secrets
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.currency import format_minor_units
+from app.core.database import AsyncSessionLocal, COMMIT_HORIZON_SQL, engine
+import structlog
+
+logger = structlog.get_logger()
+
+USER_QUERY = """
+SELECT id, email, first_name, last_name, phone_number, role, is_active,
+       mfa_enabled, consent_given, consent_date, created_at
+FROM users WHERE id = $1
+"""
+
+SECTION_QUERIES = {
+    "transactions": """
+        SELECT id, transaction_type, status, amount_minor, currency, reference, description, created_at
+        FROM transactions WHERE user_id = $1 ORDER BY created_at DESC
+    """,
+    "consents": """
+        SELECT id, purpose, consent_given, given_at, withdrawn_at
+        FROM consents WHERE user_id = $1 ORDER BY created_at DESC
+    """,
+    # The subject's own recent activity
+    "audit_logs": """
+        SELECT id, action, resource_type, description, timestamp
+        FROM audit_logs WHERE user_id = $1 ORDER BY timestamp DESC LIMIT 100
+    """,
+}
+
+# Incremental reads: records created or changed at or after $2, in change order
+DELTA_SECTION_QUERIES = {
+    "transactions": """
+        SELECT id, transaction_type, status, amount_minor, currency, reference, description, created_at
+        FROM transactions WHERE user_id = $1 AND updated_at >= $2 ORDER BY updated_at, id
+    """,
+    "consents": """
+        SELECT id, purpose, consent_given, given_at, withdrawn_at
+        FROM consents WHERE user_id = $1 AND updated_at >= $2 ORDER BY updated_at, id
+    """,
+    # Audit entries never change
+    "audit_logs": """
+        SELECT id, action, resource_type, description, timestamp
+        FROM audit_logs WHERE user_id = $1 AND timestamp >= $2 ORDER BY timestamp DESC LIMIT 100
+    """,
+}
+
+ACCESS_SECTIONS = ("transactions", "consents", "audit_logs")
+EXPORT_SECTIONS = ("transactions", "consents")
+EXPORT_TRAILER = {"format": "JSON", "version": "1.0"}
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def user_data(record) -> dict:
+    return {
+        "id": record["id"],
+        "email": record["email"],
+        "first_name": record["first_name"],
+        "last_name": record["last_name"],
+        "phone_number": record["phone_number"],
+        "role": record["role"],
+        "is_active": record["is_active"],
+        "mfa_enabled": record["mfa_enabled"],
+        "consent_given": record["consent_given"],
+        "consent_date": _isoformat(record["consent_date"]),
+        "created_at": _isoformat(record["created_at"]),
+    }
+
+
+SECTION_FORMATTERS = {
+    "transactions": lambda record: {
+        "id": record["id"],
+        "transaction_type": record["transaction_type"],
+        "status": record["status"],
+        "amount": format_minor_units(record["amount_minor"], record["currency"]),
+        "currency": record["currency"],
+        "reference": record["reference"],
+        "description": record["description"],
+        "created_at": _isoformat(record["created_at"]),
+    },
+    "consents": lambda record: {
+        "id": record["id"],
+        "purpose": record["purpose"],
+        "consent_given": record["consent_given"],
+        "given_at": _isoformat(record["given_at"]),
+        "withdrawn_at": _isoformat(record["withdrawn_at"]),
+    },
+    "audit_logs": lambda record: {
+        "id": record["id"],
+        "action": record["action"],
+        "resource_type": record["resource_type"],
+        "description": record["description"],
+        "timestamp": _isoformat(record["timestamp"]),
+    },
+}
+
+
+class _SectionReader:
+    """One section read on its own pooled connection, in an imported snapshot"""
+    
+    def __init__(self, section: str, user_id: int, snapshot: str, since: Optional[datetime]):
+        self.section = section
+        self.user_id = user_id
+        self.snapshot = snapshot
+        self.since = since
+        self.imported = asyncio.Event()  # Set once the snapshot is imported (or the read failed)
+        self.batches: asyncio.Queue = asyncio.Queue(maxsize=settings.DATA_ACCESS_PREFETCH_BATCHES)
+        self.task = asyncio.create_task(self._run())
+    
+    async def _run(self):
+        try:
+            await self._read()
+        except Exception as e:
+            self.imported.set()
+            logger.error("Personal data section read failed", section=self.section, error=repr(e))
+            await self.batches.put(e)
+    
+    async def _read(self):
+        formatter = SECTION_FORMATTERS[self.section]
+        loop = asyncio.get_running_loop()
+        async with asyncio.timeout(settings.DATA_ACCESS_SECTION_TIMEOUT_SECONDS) as deadline:
+            async with engine.connect() as connection:
+                raw_connection = (await connection.get_raw_connection()).driver_connection
+                async with raw_connection.transaction(isolation="repeatable_read", readonly=True):
+                    await raw_connection.execute(f"SET TRANSACTION SNAPSHOT '{self.snapshot}'")
+                    self.imported.set()
+                    if self.since is None:
+                        cursor = await raw_connection.cursor(SECTION_QUERIES[self.section], self.user_id)
+                    else:
+                        cursor = await raw_connection.cursor(
+                            DELTA_SECTION_QUERIES[self.section], self.user_id, self.since
+                        )
+                    while True:
+                        records = await cursor.fetch(settings.EXPORT_BATCH_ROWS)
+                        last = len(records) < settings.EXPORT_BATCH_ROWS
+                        # Time spent waiting for the consumer doesn't count against the timeout
+                        when, paused = deadline.when(), loop.time()
+                        deadline.reschedule(None)
+                        await self.batches.put(([formatter(record) for record in records], last))
+                        deadline.reschedule(when + loop.time() - paused)
+                        if last:
+                            return
+
+
+class _ConnectionBudget:
+    """Pooled connections that concurrent personal data reads may hold at once"""
+    
+    def __init__(self, size: int):
+        self.available = size
+    
+    def try_acquire(self, connections: int) -> bool:
+        if connections > self.available:
+            return False
+        self.available -= connections
+        return True
+    
+    def release(self, connections: int):
+        self.available += connections
+
+
+async def read_personal_data(
+    user_id: int,
+    sections: tuple[str, ...] = ACCESS_SECTIONS,
+    since: Optional[datetime] = None,
+) -> AsyncIterator[tuple[str, list[dict], bool]]:
+    """
+    Yield (section, records, last) batches of at most EXPORT_BATCH_ROWS
+    formatted records: "snapshot" first ({"taken_at": ..., "horizon": ...},
+    the time the data is as of and the commit horizon before which it holds
+    every change), then "user_data", then each section in order. Every
+    section ends with a batch flagged last (possibly empty). With `since`,
+    sections hold only records created or changed at or after it. Uses its own
+    pooled connections (one per section, plus one while the snapshot is
+    being imported, or a single one when the pool budget is spent), since
+    callers outlive the request handler.
+    """
+    connections = len(sections) + 1
+    if not connection_budget.try_acquire(connections):
+        # Waiting for more connections while holding one could exhaust the pool
+        logger.info("Personal data read running sequentially", user_id=user_id)
+        async for batch in _read_sequentially(user_id, sections, since):
+            yield batch
+        return
+    try:
+        async for batch in _read_concurrently(user_id, sections, since):
+            yield batch
+    finally:
+        connection_budget.release(connections)
+
+
+async def _read_concurrently(
+    user_id: int,
+    sections: tuple[str, ...],
+    since: Optional[datetime],
+) -> AsyncIterator[tuple[str, list[dict], bool]]:
+    readers: list[_SectionReader] = []
+    try:
+        async with engine.connect() as connection:
+            raw_connection = (await connection.get_raw_connection()).driver_connection
+            # Read before the snapshot is taken, so it holds every change stamped before the horizon
+            horizon = await raw_connection.fetchval(f"SELECT {COMMIT_HORIZON_SQL}")
+            async with raw_connection.transaction(isolation="repeatable_read", readonly=True):
+                snapshot = await raw_connection.fetchrow("SELECT pg_export_snapshot() AS id, now() AS taken_at")
+                readers = [_SectionReader(section, user_id, snapshot["id"], since) for section in sections]
+                user = await raw_connection.fetchrow(USER_QUERY, user_id)
+                # The snapshot can only be imported while this transaction is open
+                await asyncio.gather(*(reader.imported.wait() for reader in readers))
+        yield "snapshot", [{"taken_at": snapshot["taken_at"], "horizon": horizon}], True
+        yield "user_data", [user_data(user)], True
+        
+        for reader in readers:
+            last = False
+            while not last:
+                batch = await reader.batches.get()
+                if isinstance(batch, Exception):
+                    raise batch
+                records, last = batch
+                yield reader.section, records, last
+    finally:
+        for reader in readers:
+            reader.task.cancel()
+        await asyncio.gather(*(reader.task for reader in readers), return_exceptions=True)
+
+
+async def _read_sequentially(
+    user_id: int,
+    sections: tuple[str, ...],
+    since: Optional[datetime],
+) -> AsyncIterator[tuple[str, list[dict], bool]]:
+    async with engine.connect() as connection:
+        raw_connection = (await connection.get_raw_connection()).driver_connection
+        horizon = await raw_connection.fetchval(f"SELECT {COMMIT_HORIZON_SQL}")
+        # Server-side cursors only live inside a transaction
+        async with raw_connection.transaction(isolation="repeatable_read", readonly=True):
+            user = await raw_connection.fetchrow(USER_QUERY, user_id)
+            taken_at = await raw_connection.fetchval("SELECT now()")
+            yield "snapshot", [{"taken_at": taken_at, "horizon": horizon}], True
+            yield "user_data", [user_data(user)], True
+            
+            for section in sections:
+                formatter = SECTION_FORMATTERS[section]
+                if since is None:
+                    cursor = await raw_connection.cursor(SECTION_QUERIES[section], user_id)
+                else:
+                    cursor = await raw_connection.cursor(DELTA_SECTION_QUERIES[section], user_id, since)
+                last = False
+                while not last:
+                    records = await cursor.fetch(settings.EXPORT_BATCH_ROWS)
+                    last = len(records) < settings.EXPORT_BATCH_ROWS
+                    yield section, [formatter(record) for record in records], last
+
+
+async def stream_personal_data(
+    user_id: int,
+    sections: tuple[str, ...] = ACCESS_SECTIONS,
+    trailer: Optional[dict] = None,
+    since: Optional[datetime] = None,
+    manifest: Optional[dict] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Yield the document {"user_data": {...}, "<section>": [...], ...,
+    "exported_at": ..., **trailer} as it is read
+    A manifest (see export_manifest) is completed with the snapshot's commit
+    horizon and added to the trailer.
+    """
+    exported_at = None
+    horizon = None
+    opened = None
+    separator = ""
+    
+    async for section, records, last in read_personal_data(user_id, sections, since):
+        if section == "snapshot":
+            exported_at = records[0]["taken_at"].isoformat()
+            horizon = records[0]["horizon"].isoformat()
+            continue
+        if section == "user_data":
+            yield f'{{"user_data": {json.dumps(records[0])}'.encode("utf-8")
+            continue
+        chunk = ""
+        if section != opened:
+            opened, separator = section, ""
+            chunk = f', "{section}": ['
+        if records:
+            chunk += separator + ", ".join(json.dumps(record) for record in records)
+            separator = ", "
+        if last:
+            chunk += "]"
+        yield chunk.encode("utf-8")
+    
+    fields = {"exported_at": exported_at, **(trailer or {})}
+    if manifest is not None:
+        manifest["until"] = horizon
+        fields["manifest"] = manifest
+    yield "".join(f", {json.dumps(key)}: {json.dumps(value)}" for key, value in fields.items()).encode("utf-8") + b"}"
+
+
+async def get_export_watermark(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        "SELECT export_id, base_export_id, watermark FROM data_export_watermarks WHERE user_id = :user_id",
+        {"user_id": user_id}
+    )
+    return result.fetchone()
+
+
+def export_manifest(watermark, since: Optional[datetime], chained: bool) -> dict:
+    """
+    Manifest for an export: a full one (since is None), a delta following
+    the user's previous export (chained, since = its watermark) or a delta
+    since a client-supplied time. Clients rebuild current state by taking
+    base_export_id's full export and applying each delta in order, upserting
+    records by section and id. "until" is set once the snapshot is taken:
+    the export holds every change stamped before it (and possibly some
+    after); pass it as since= to continue from this export.
+    """
+    export_id = secrets.token_hex(16)
+    if since is None:
+        base_export_id = export_id
+    else:
+        base_export_id = watermark.base_export_id if chained else None
+    return {
+        "export_id": export_id,
+        "mode": "full" if since is None else "delta",
+        "since": _isoformat(since),
+        "until": None,
+        "previous_export_id": watermark.export_id if chained and since is not None else None,
+        "base_export_id": base_export_id,
+        "merge": "upsert by id",
+    }
+
+
+async def record_export_watermark(user_id: int, manifest: dict, base_export_id: Optional[str]):
+    """Advance the user's watermark to a completed export (never backwards)"""
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            """
+            INSERT INTO data_export_watermarks (user_id, export_id, base_export_id, watermark, updated_at)
+            VALUES (:user_id, :export_id, :base_export_id, :watermark, NOW())
+            ON CONFLICT (user_id) DO UPDATE
+            SET export_id = EXCLUDED.export_id, base_export_id = EXCLUDED.base_export_id,
+                watermark = EXCLUDED.watermark, updated_at = NOW()
+            WHERE data_export_watermarks.watermark < EXCLUDED.watermark
+            """,
+            {
+                "user_id": user_id,
+                "export_id": manifest["export_id"],
+                "base_export_id": base_export_id,
+                "watermark": datetime.fromisoformat(manifest["until"]),
+            }
+        )
+        await session.commit()
+
+
+async def stream_export(user_id: int, watermark, since: Optional[datetime], chained: bool) -> AsyncIterator[bytes]:
+    """
+    /data-subject/export document, full or incremental
+    The watermark only advances once the whole document has been produced.
+    """
+    manifest = export_manifest(watermark, since, chained)
+    # Changes stamped between `since` and the previous snapshot are read again;
+    # repeated records are harmless (clients upsert by id)
+    async for chunk in stream_personal_data(user_id, EXPORT_SECTIONS, EXPORT_TRAILER, since, manifest):
+        yield chunk
+    
+    # A client-supplied since= starts no chain; full exports start a new one
+    base_export_id = manifest["base_export_id"] or (watermark.base_export_id if watermark else None)
+    await record_export_watermark(user_id, manifest, base_export_id)
+
+
+# Global budget for concurrent reads, sized from the connection pool
+connection_budget = _ConnectionBudget(
+    int((settings.DATABASE_POOL_SIZE + settings.DATABASE_MAX_OVERFLOW) * settings.DATA_ACCESS_POOL_SHARE)
+)
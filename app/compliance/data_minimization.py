@@ -1,53 +1,167 @@
 """
 Data Minimization - POPIA Compliance
 Ensures only necessary data is collected and stored
+
+Users past their retention period are purged in keyed batches: each
+transaction claims up to PURGE_BATCH_SIZE expired users in id order
+(FOR UPDATE SKIP LOCKED), queues their deletion for the chunked deletion
+engine (app.compliance.deletion) and advances a shared checkpoint, then
+commits. A failure loses at most one batch, a restarted purge resumes from
+the checkpoint, and any number of workers can run side by side without
+claiming the same users.
 """
+import asyncio
+import time
 from datetime import datetime, timedelta
+from typing import Optional
+from prometheus_client import Counter, Histogram
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.compliance.deletion import ACTIVE_STATUSES
+from app.models.deletion_job import DeletionJobStatus
 import structlog
 
 logger = structlog.get_logger()
 
+PURGED_USERS = Counter(
+    "purge_users_total",
+    "Expired users claimed by the retention purge",
+    ["outcome"],  # queued, or already_queued (a deletion was pending or running)
+)
+PURGE_BATCH_SECONDS = Histogram(
+    "purge_batch_seconds",
+    "Time to claim and queue one retention purge batch",
+)
+
+CHECKPOINT_NAME = "purge_expired_data"
+
+# Users with a deletion already pending or running are skipped, so concurrent
+# workers and repeated passes never claim the same user twice
+PURGE_BATCH_SQL = f"""
+WITH expired AS (
+    SELECT id FROM users
+    WHERE id > :after
+    AND data_retention_until IS NOT NULL
+    AND data_retention_until < :cutoff_date
+    AND NOT EXISTS (
+        SELECT 1 FROM deletion_jobs
+        WHERE deletion_jobs.user_id = users.id
+        AND deletion_jobs.status IN ('{ACTIVE_STATUSES[0]}', '{ACTIVE_STATUSES[1]}')
+    )
+    ORDER BY id
+    LIMIT :batch_size
+    FOR UPDATE SKIP LOCKED
+), queued AS (
+    INSERT INTO deletion_jobs (user_id, reason, status, attempts, progress, requested_at, updated_at)
+    SELECT id, 'retention_expired', '{DeletionJobStatus.PENDING.value}', 0, '{{}}', NOW(), NOW() FROM expired
+    ON CONFLICT (user_id) WHERE status IN ('{ACTIVE_STATUSES[0]}', '{ACTIVE_STATUSES[1]}') DO NOTHING
+    RETURNING user_id
+)
+SELECT (SELECT COUNT(*) FROM expired) AS claimed,
+       (SELECT COUNT(*) FROM queued) AS queued,
+       (SELECT MAX(id) FROM expired) AS last_id
+"""
+
 
-async def purge_expired_data(db: AsyncSession):
+async def purge_expired_batch(db: AsyncSession, cutoff_date: datetime) -> int:
     """
-    Purge data that has exceeded retention period
-    POPIA: Data should not be kept longer than necessary
+    Claim and queue one batch after the checkpoint, in one transaction
+    Returns the number of users claimed; fewer than PURGE_BATCH_SIZE means
+    the pass is complete (and the checkpoint has been reset).
     """
-    retention_days = settings.DATA_RETENTION_DAYS
-    cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
+    started = time.monotonic()
+    result = await db.execute(
+        "SELECT last_id FROM purge_checkpoints WHERE name = :name",
+        {"name": CHECKPOINT_NAME}
+    )
+    checkpoint = result.fetchone()
     
-    # Find users marked for deletion past retention period
     result = await db.execute(
-        """
-        SELECT id FROM users 
-        WHERE data_retention_until IS NOT NULL 
-        AND data_retention_until < :cutoff_date
-        """,
-        {"cutoff_date": cutoff_date}
+        PURGE_BATCH_SQL,
+        {
+            "after": checkpoint.last_id if checkpoint else 0,
+            "cutoff_date": cutoff_date,
+            "batch_size": settings.PURGE_BATCH_SIZE,
+        }
     )
-    users_to_delete = result.fetchall()
+    batch = result.fetchone()
     
-    deleted_count = 0
-    for user in users_to_delete:
-        # Delete user and all associated data (cascade)
+    if batch.claimed < settings.PURGE_BATCH_SIZE:
+        # End of the table: the next pass starts over (and picks up rows skipped as locked)
+        await db.execute(
+            "UPDATE purge_checkpoints SET last_id = 0, updated_at = NOW() WHERE name = :name",
+            {"name": CHECKPOINT_NAME}
+        )
+    else:
         await db.execute(
-            "DELETE FROM users WHERE id = :user_id",
-            {"user_id": user.id}
+            """
+            UPDATE purge_checkpoints SET last_id = GREATEST(last_id, :last_id), updated_at = NOW()
+            WHERE name = :name
+            """,
+            {"name": CHECKPOINT_NAME, "last_id": batch.last_id}
         )
-        deleted_count += 1
+    await db.commit()
     
+    PURGED_USERS.labels(outcome="queued").inc(batch.queued)
+    PURGED_USERS.labels(outcome="already_queued").inc(batch.claimed - batch.queued)
+    PURGE_BATCH_SECONDS.observe(time.monotonic() - started)
+    return batch.claimed
+
+
+async def purge_expired_data(db: AsyncSession, cutoff_date: Optional[datetime] = None):
+    """
+    Purge data that has exceeded retention period
+    POPIA: Data should not be kept longer than necessary
+    Queues expired users for chunked deletion, batch by batch, until the
+    pass is complete; returns the number of users claimed
+    """
+    retention_days = settings.DATA_RETENTION_DAYS
+    cutoff_date = cutoff_date or datetime.utcnow() - timedelta(days=retention_days)
+    
+    await db.execute(
+        """
+        INSERT INTO purge_checkpoints (name, last_id, updated_at)
+        VALUES (:name, 0, NOW())
+        ON CONFLICT (name) DO NOTHING
+        """,
+        {"name": CHECKPOINT_NAME}
+    )
     await db.commit()
     
-    if deleted_count > 0:
+    started = time.monotonic()
+    claimed_count = 0
+    batches = 0
+    while True:
+        claimed = await purge_expired_batch(db, cutoff_date)
+        claimed_count += claimed
+        batches += 1
+        if claimed < settings.PURGE_BATCH_SIZE:
+            break
+    
+    if claimed_count > 0:
+        elapsed = time.monotonic() - started
         logger.info(
-            "Purged expired data",
-            deleted_users=deleted_count,
+            "Queued expired data for deletion",
+            users=claimed_count,
+            batches=batches,
+            users_per_second=round(claimed_count / elapsed, 1) if elapsed > 0 else None,
             retention_days=retention_days,
         )
     
-    return deleted_count
+    return claimed_count
+
+
+async def run_purge(workers: Optional[int] = None) -> int:
+    """Run purge_expired_data on several sessions in parallel; returns the users claimed"""
+    workers = workers or settings.PURGE_WORKERS
+    cutoff_date = datetime.utcnow() - timedelta(days=settings.DATA_RETENTION_DAYS)
+    
+    async def worker():
+        async with AsyncSessionLocal() as session:
+            return await purge_expired_data(session, cutoff_date)
+    
+    return sum(await asyncio.gather(*(worker() for _ in range(workers))))
 
 
 async def anonymize_old_audit_logs(db: AsyncSession):
@@ -71,3 +185,18 @@ async def anonymize_old_audit_logs(db: AsyncSession):
     
     logger.info("Anonymized old audit logs")
 
+
+if __name__ == "__main__":
+    import argparse
+    from prometheus_client import start_http_server
+    
+    parser = argparse.ArgumentParser(description="Queue users past their retention period for deletion")
+    parser.add_argument("--workers", type=int, default=settings.PURGE_WORKERS)
+    args = parser.parse_args()
+    
+    async def main():
+        if settings.ENABLE_METRICS:
+            start_http_server(settings.METRICS_PORT)
+        await run_purge(args.workers)
+    
+    asyncio.run(main())
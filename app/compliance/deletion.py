@@ -0,0 +1,355 @@
+"""
+Personal Data Deletion
+Hard-deletes a user in bounded chunks instead of one DELETE FROM users,
+whose ON DELETE CASCADE / SET NULL over millions of transactions and audit
+rows holds its locks for the whole statement and writes one huge burst of
+WAL.
+
+A deletion is a deletion_jobs row. A worker applies CASCADE_STEPS (the
+same effect as the foreign keys' cascades) table by table, at most
+DELETION_BATCH_SIZE rows per transaction, and deletes the users row last,
+when nothing references it any more. The job's step and per-table row
+counts are updated in the same transaction as each chunk, so a stopped or
+crashed job resumes exactly where it left off, and the row doubles as a
+progress report (GET /compliance/deletion-jobs).
+
+Before each chunk the worker backs off while any replica's replay lag is
+above DELETION_MAX_REPLICATION_LAG_SECONDS or the server is writing WAL
+faster than DELETION_MAX_WAL_BYTES_PER_SECOND.
+
+A failed attempt puts the job back to pending with an exponential backoff
+(next_attempt_at); after DELETION_MAX_ATTEMPTS it stays failed.
+"""
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Optional
+from prometheus_client import Counter
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.deletion_job import DeletionJobStatus
+import structlog
+
+logger = structlog.get_logger()
+
+DELETED_ROWS = Counter(
+    "deletion_rows_total",
+    "Rows deleted (or detached, for audit_logs) by deletion workers",
+    ["table"],
+)
+DELETION_THROTTLED_SECONDS = Counter(
+    "deletion_throttled_seconds_total",
+    "Time deletion workers spent backing off",
+    ["reason"],
+)
+DELETION_JOBS = Counter(
+    "deletion_jobs_total",
+    "Deletion job attempts finished",
+    ["outcome"],  # completed, retry (back to pending with a backoff) or failed (out of attempts)
+)
+
+ACTIVE_STATUSES = (DeletionJobStatus.PENDING.value, DeletionJobStatus.RUNNING.value)
+
+# (table, statement removing at most :batch_size of the user's rows), in order.
+# Each statement returns one row per row removed; export jobs return their
+# archive path so the file is deleted too.
+CASCADE_STEPS = (
+    ("data_export_jobs", """
+        DELETE FROM data_export_jobs
+        WHERE id IN (SELECT id FROM data_export_jobs WHERE user_id = :user_id LIMIT :batch_size)
+        RETURNING file_path
+    """),
+    ("data_export_watermarks", """
+        DELETE FROM data_export_watermarks WHERE user_id = :user_id RETURNING user_id
+    """),
+    # transactions_release_key deletes each transaction's transaction_keys row
+    ("transactions", """
+        DELETE FROM transactions
+        WHERE (id, created_at) IN (
+            SELECT id, created_at FROM transactions WHERE user_id = :user_id LIMIT :batch_size
+        )
+        RETURNING id
+    """),
+    ("transaction_keys", """
+        DELETE FROM transaction_keys
+        WHERE reference IN (SELECT reference FROM transaction_keys WHERE user_id = :user_id LIMIT :batch_size)
+        RETURNING reference
+    """),
+    # One row per month, type, status and currency
+    ("monthly_summaries", """
+        DELETE FROM monthly_summaries WHERE user_id = :user_id RETURNING user_id
+    """),
+    ("balances", """
+        DELETE FROM balances WHERE user_id = :user_id RETURNING user_id
+    """),
+    ("consents", """
+        DELETE FROM consents
+        WHERE id IN (SELECT id FROM consents WHERE user_id = :user_id LIMIT :batch_size)
+        RETURNING id
+    """),
+    # Audit logs are kept (anonymized later by anonymize_old_audit_logs)
+    ("audit_logs", """
+        UPDATE audit_logs SET user_id = NULL
+        WHERE id IN (SELECT id FROM audit_logs WHERE user_id = :user_id LIMIT :batch_size)
+        RETURNING id
+    """),
+    ("users", """
+        DELETE FROM users WHERE id = :user_id RETURNING id
+    """),
+)
+
+STEP_NAMES = [table for table, _ in CASCADE_STEPS]
+
+# A running job whose heartbeat has lapsed belongs to a crashed worker and is resumed
+CLAIM_SQL = f"""
+UPDATE deletion_jobs
+SET status = '{DeletionJobStatus.RUNNING.value}', attempts = attempts + 1,
+    started_at = COALESCE(started_at, NOW()), updated_at = NOW()
+WHERE id = (
+    SELECT id FROM deletion_jobs
+    WHERE (status = '{DeletionJobStatus.PENDING.value}' AND (next_attempt_at IS NULL OR next_attempt_at <= NOW()))
+       OR (status = '{DeletionJobStatus.RUNNING.value}' AND updated_at < NOW() - make_interval(secs => :lease))
+    ORDER BY requested_at
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING id, user_id, step, attempts
+"""
+
+# Without pg_read_all_stats (e.g. via pg_monitor) pg_stat_replication shows
+# only each replica's pid; its state and lag columns read as NULL
+THROTTLE_SQL = """
+SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), '0/0')::bigint AS wal_bytes,
+       (SELECT COALESCE(MAX(EXTRACT(EPOCH FROM replay_lag)), 0) FROM pg_stat_replication) AS replication_lag,
+       (SELECT COUNT(*) FROM pg_stat_replication WHERE state IS NULL) AS hidden_replicas
+"""
+
+
+async def request_deletion(db: AsyncSession, user_id: int, reason: str) -> int:
+    """
+    Queue a hard deletion of the user; returns the job id (the existing one
+    if a deletion is already pending or running). Does not commit.
+    """
+    while True:
+        result = await db.execute(
+            f"""
+            INSERT INTO deletion_jobs (user_id, reason, status, attempts, progress, requested_at, updated_at)
+            VALUES (:user_id, :reason, :pending, 0, '{{}}', NOW(), NOW())
+            ON CONFLICT (user_id) WHERE status IN ('{ACTIVE_STATUSES[0]}', '{ACTIVE_STATUSES[1]}') DO NOTHING
+            RETURNING id
+            """,
+            {"user_id": user_id, "reason": reason, "pending": DeletionJobStatus.PENDING.value}
+        )
+        job = result.fetchone()
+        if job is None:
+            result = await db.execute(
+                "SELECT id FROM deletion_jobs WHERE user_id = :user_id AND status = ANY(:active)",
+                {"user_id": user_id, "active": list(ACTIVE_STATUSES)}
+            )
+            job = result.fetchone()
+        # None: the conflicting job finished in between, so queue a new one
+        if job is not None:
+            return job.id
+
+
+class DeletionThrottle:
+    """Backs off while replicas lag or the server writes WAL too fast"""
+    
+    def __init__(self):
+        self._wal_bytes: Optional[int] = None
+        self._measured_at: Optional[float] = None
+        self._lag_warned = False
+    
+    async def _reason(self, db: AsyncSession) -> Optional[str]:
+        result = await db.execute(THROTTLE_SQL)
+        row = result.fetchone()
+        await db.commit()
+        
+        now = time.monotonic()
+        wal_rate = None
+        if self._wal_bytes is not None and now > self._measured_at:
+            wal_rate = (row.wal_bytes - self._wal_bytes) / (now - self._measured_at)
+        self._wal_bytes, self._measured_at = row.wal_bytes, now
+        
+        if row.hidden_replicas and not self._lag_warned:
+            logger.warning(
+                "Replication lag cannot be read; throttling on WAL rate only (grant pg_monitor)",
+                replicas=row.hidden_replicas,
+            )
+            self._lag_warned = True
+        if row.replication_lag > settings.DELETION_MAX_REPLICATION_LAG_SECONDS:
+            return "replication_lag"
+        if wal_rate is not None and wal_rate > settings.DELETION_MAX_WAL_BYTES_PER_SECOND:
+            return "wal_rate"
+        return None
+    
+    async def wait(self, db: AsyncSession, job_id: int):
+        """Return once it is fine to write the next chunk, keeping the job's heartbeat"""
+        while (reason := await self._reason(db)) is not None:
+            await db.execute("UPDATE deletion_jobs SET updated_at = NOW() WHERE id = :id", {"id": job_id})
+            await db.commit()
+            await asyncio.sleep(settings.DELETION_THROTTLE_SLEEP_SECONDS)
+            DELETION_THROTTLED_SECONDS.labels(reason=reason).inc(settings.DELETION_THROTTLE_SLEEP_SECONDS)
+
+
+async def _delete_chunk(db: AsyncSession, job_id: int, attempt: int, table: str, statement: str, user_id: int) -> Optional[int]:
+    """
+    Remove one chunk and record it in the job, in one transaction
+    Returns the rows removed, or None if the job was taken over by another worker.
+    """
+    result = await db.execute(statement, {"user_id": user_id, "batch_size": settings.DELETION_BATCH_SIZE})
+    rows = result.fetchall()
+    
+    result = await db.execute(
+        """
+        UPDATE deletion_jobs
+        SET step = :step,
+            progress = progress || jsonb_build_object(CAST(:step AS text), COALESCE((progress->>:step)::bigint, 0) + :rows),
+            updated_at = NOW()
+        WHERE id = :id AND attempts = :attempt
+        RETURNING id
+        """,
+        {"step": table, "rows": len(rows), "id": job_id, "attempt": attempt}
+    )
+    if result.fetchone() is None:
+        await db.rollback()
+        return None
+    await db.commit()
+    
+    if table == "data_export_jobs":
+        for row in rows:
+            if row.file_path:
+                Path(row.file_path).unlink(missing_ok=True)
+    DELETED_ROWS.labels(table=table).inc(len(rows))
+    return len(rows)
+
+
+async def run_deletion_job(db: AsyncSession, job_id: int, user_id: int, step: Optional[str], attempt: int):
+    """Delete a claimed job's user, resuming from its recorded step"""
+    throttle = DeletionThrottle()
+    first = STEP_NAMES.index(step) if step in STEP_NAMES else 0
+    logger.info("Deletion started", job_id=job_id, user_id=user_id, step=STEP_NAMES[first], attempt=attempt)
+    
+    try:
+        for table, statement in CASCADE_STEPS[first:]:
+            removed = settings.DELETION_BATCH_SIZE
+            total = 0
+            started = time.monotonic()
+            while removed >= settings.DELETION_BATCH_SIZE:
+                await throttle.wait(db, job_id)
+                removed = await _delete_chunk(db, job_id, attempt, table, statement, user_id)
+                if removed is None:
+                    logger.warning("Deletion job taken over by another worker", job_id=job_id)
+                    return
+                total += removed
+            logger.info(
+                "Deletion step completed",
+                job_id=job_id,
+                table=table,
+                rows=total,
+                seconds=round(time.monotonic() - started, 1),
+            )
+    except Exception as e:
+        await db.rollback()
+        retry = attempt < settings.DELETION_MAX_ATTEMPTS
+        logger.error("Deletion failed", job_id=job_id, step=table, attempt=attempt, retry=retry, error=str(e))
+        await db.execute(
+            """
+            UPDATE deletion_jobs
+            SET status = :status, error = :error, updated_at = NOW(),
+                next_attempt_at = NOW() + make_interval(secs => LEAST(:max_delay, :base_delay * power(2, attempts - 1)))
+            WHERE id = :id AND attempts = :attempt
+            """,
+            {
+                "status": (DeletionJobStatus.PENDING if retry else DeletionJobStatus.FAILED).value,
+                "error": str(e)[:1000],
+                "max_delay": settings.DELETION_RETRY_MAX_SECONDS,
+                "base_delay": settings.DELETION_RETRY_BASE_SECONDS,
+                "id": job_id,
+                "attempt": attempt,
+            }
+        )
+        await db.commit()
+        DELETION_JOBS.labels(outcome="retry" if retry else "failed").inc()
+        return
+    
+    result = await db.execute(
+        """
+        UPDATE deletion_jobs SET status = :completed, completed_at = NOW(), updated_at = NOW()
+        WHERE id = :id AND attempts = :attempt
+        RETURNING progress
+        """,
+        {"completed": DeletionJobStatus.COMPLETED.value, "id": job_id, "attempt": attempt}
+    )
+    job = result.fetchone()
+    await db.commit()
+    if job is not None:
+        DELETION_JOBS.labels(outcome="completed").inc()
+        progress = job.progress if isinstance(job.progress, dict) else json.loads(job.progress)
+        logger.info("Deletion completed", job_id=job_id, rows=progress)
+
+
+async def claim_deletion_job(db: AsyncSession) -> Optional[tuple]:
+    result = await db.execute(CLAIM_SQL, {"lease": settings.DELETION_LEASE_SECONDS})
+    job = result.fetchone()
+    await db.commit()
+    return job
+
+
+class DeletionWorkerPool:
+    """
+    N concurrent deletion workers, each on its own session
+    Idle workers poll every DELETION_POLL_INTERVAL_SECONDS. Throttling is
+    per worker, so keep the pool small.
+    """
+    
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or settings.DELETION_WORKERS
+        self._tasks: list[asyncio.Task] = []
+    
+    async def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run(n)) for n in range(self.workers)]
+            logger.info("Deletion workers started", workers=self.workers)
+    
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    async def _run(self, worker: int):
+        while True:
+            job = None
+            try:
+                async with AsyncSessionLocal() as session:
+                    job = await claim_deletion_job(session)
+                    if job is not None:
+                        await run_deletion_job(session, job.id, job.user_id, job.step, job.attempts)
+            except Exception as e:
+                logger.error("Deletion worker failed", worker=worker, error=str(e))
+            if job is None:
+                await asyncio.sleep(settings.DELETION_POLL_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    import argparse
+    from prometheus_client import start_http_server
+    
+    parser = argparse.ArgumentParser(description="Run personal data deletion workers")
+    parser.add_argument("--workers", type=int, default=settings.DELETION_WORKERS)
+    args = parser.parse_args()
+    
+    async def main():
+        if settings.ENABLE_METRICS:
+            start_http_server(settings.METRICS_PORT)
+        pool = DeletionWorkerPool(workers=args.workers)
+        await pool.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await pool.stop()
+    
+    asyncio.run(main())
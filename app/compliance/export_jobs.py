@@ -0,0 +1,336 @@
+"""
+Data Subject Export Jobs
+Large exports are built in the background instead of holding an HTTP
+connection and a database session open for minutes.
+
+POST /data-subject/export-jobs queues a job (one active job per user; a
+repeat request returns it). Export workers, run as their own process,
+build a ZIP archive per job: user_data.json, one CSV per section and a
+manifest.json with row counts and SHA-256 checksums of every file. The
+archive is downloaded through a signed, time-limited link and deleted after
+DATA_EXPORT_RETENTION_DAYS.
+
+At most DATA_EXPORT_MAX_CONCURRENT jobs run at once across all worker
+processes (claims are serialized by an advisory lock), which bounds the
+database connections exports take from interactive traffic (each job reads
+its sections concurrently, one connection per section).
+"""
+import asyncio
+import csv
+import hashlib
+import hmac
+import io
+import json
+import secrets
+import time
+import zipfile
+from pathlib import Path
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.compliance.data_access import ACCESS_SECTIONS, read_personal_data
+from app.models.data_export import DataExportStatus
+import structlog
+
+logger = structlog.get_logger()
+
+ARCHIVE_FORMAT_VERSION = "1.0"
+
+ACTIVE_STATUSES = (DataExportStatus.QUEUED.value, DataExportStatus.RUNNING.value)
+
+# Serializes claims, so the running-job count checked in CLAIM_SQL is exact
+CLAIM_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext('data_export_jobs'))"
+
+# A running job whose lease has lapsed belongs to a crashed worker and is re-run
+CLAIM_SQL = f"""
+UPDATE data_export_jobs
+SET status = '{DataExportStatus.RUNNING.value}', started_at = NOW(), attempts = attempts + 1
+WHERE id = (
+    SELECT id FROM data_export_jobs
+    WHERE status = '{DataExportStatus.QUEUED.value}'
+       OR (status = '{DataExportStatus.RUNNING.value}' AND started_at < NOW() - make_interval(secs => :lease))
+    ORDER BY created_at
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+)
+AND (
+    SELECT COUNT(*) FROM data_export_jobs
+    WHERE status = '{DataExportStatus.RUNNING.value}' AND started_at >= NOW() - make_interval(secs => :lease)
+) < :max_concurrent
+RETURNING id, user_id, attempts
+"""
+
+
+async def create_export_job(db: AsyncSession, user_id: int) -> tuple:
+    """
+    Queue an export for the user, or return their queued/running one
+    Returns (job row, created)
+    """
+    while True:
+        result = await db.execute(
+            f"""
+            INSERT INTO data_export_jobs (id, user_id, status, attempts, created_at)
+            VALUES (:id, :user_id, :queued, 0, NOW())
+            ON CONFLICT (user_id) WHERE status IN ('{ACTIVE_STATUSES[0]}', '{ACTIVE_STATUSES[1]}') DO NOTHING
+            RETURNING *
+            """,
+            {"id": secrets.token_hex(16), "user_id": user_id, "queued": DataExportStatus.QUEUED.value}
+        )
+        job = result.fetchone()
+        if job is not None:
+            await db.commit()
+            return job, True
+        
+        result = await db.execute(
+            "SELECT * FROM data_export_jobs WHERE user_id = :user_id AND status = ANY(:active)",
+            {"user_id": user_id, "active": list(ACTIVE_STATUSES)}
+        )
+        job = result.fetchone()
+        await db.commit()
+        # None: the conflicting job finished in between, so queue a new one
+        if job is not None:
+            return job, False
+
+
+def download_signature(job_id: str, expires: int) -> str:
+    message = f"{job_id}:{expires}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def signed_download_url(job_id: str) -> tuple[str, int]:
+    """Download link valid for DATA_EXPORT_LINK_TTL_SECONDS; returns (url, expiry epoch)"""
+    expires = int(time.time()) + settings.DATA_EXPORT_LINK_TTL_SECONDS
+    url = (
+        f"{settings.API_V1_PREFIX}/data-subject/export-jobs/{job_id}/download"
+        f"?expires={expires}&signature={download_signature(job_id, expires)}"
+    )
+    return url, expires
+
+
+def verify_download(job_id: str, expires: int, signature: str) -> bool:
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(download_signature(job_id, expires), signature)
+
+
+class _ArchiveEntry:
+    """A file being written into the archive, with its running checksum"""
+    
+    def __init__(self, archive: zipfile.ZipFile, name: str):
+        self.name = name
+        self.handle = archive.open(name, "w", force_zip64=True)
+        self.digest = hashlib.sha256()
+        self.rows = 0
+        self.bytes = 0
+    
+    def write(self, text: str):
+        data = text.encode("utf-8")
+        self.handle.write(data)
+        self.digest.update(data)
+        self.bytes += len(data)
+    
+    def close(self) -> dict:
+        self.handle.close()
+        return {"name": self.name, "rows": self.rows, "bytes": self.bytes, "sha256": self.digest.hexdigest()}
+
+
+async def build_archive(job_id: str, user_id: int, path: Path) -> dict:
+    """Write the user's export archive to `path`; returns the manifest"""
+    manifest = {
+        "job_id": job_id,
+        "user_id": user_id,
+        "exported_at": None,  # Snapshot time
+        "version": ARCHIVE_FORMAT_VERSION,
+        "files": [],
+    }
+    
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        entry = None
+        writer = None
+        buffer = io.StringIO()
+        async for section, records, last in read_personal_data(user_id, ACCESS_SECTIONS):
+            if section == "snapshot":
+                manifest["exported_at"] = records[0]["taken_at"].isoformat()
+                continue
+            if section == "user_data":
+                entry = _ArchiveEntry(archive, "user_data.json")
+                entry.write(json.dumps(records[0], indent=2))
+                entry.rows = 1
+                manifest["files"].append(entry.close())
+                continue
+            
+            if entry is None or entry.name != f"{section}.csv":
+                entry, writer = _ArchiveEntry(archive, f"{section}.csv"), None
+            for record in records:
+                if writer is None:
+                    writer = csv.DictWriter(buffer, fieldnames=list(record))
+                    writer.writeheader()
+                writer.writerow(record)
+            entry.rows += len(records)
+            entry.write(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+            if last:
+                manifest["files"].append(entry.close())
+        
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+    
+    return manifest
+
+
+def _file_checksum(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+async def run_export_job(db: AsyncSession, job_id: str, user_id: int, attempt: int):
+    """Build a claimed job's archive and record the outcome"""
+    directory = Path(settings.DATA_EXPORT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    # Per-attempt names, so a re-run of a presumed-crashed job never shares files with it
+    path = directory / f"{job_id}-{attempt}.zip"
+    partial = path.with_suffix(".partial")
+    
+    try:
+        manifest = await build_archive(job_id, user_id, partial)
+        partial.replace(path)
+    except Exception as e:
+        partial.unlink(missing_ok=True)
+        logger.error("Data export failed", job_id=job_id, error=str(e))
+        await db.execute(
+            """
+            UPDATE data_export_jobs SET status = :failed, error = :error, completed_at = NOW()
+            WHERE id = :id AND attempts = :attempt
+            """,
+            {"failed": DataExportStatus.FAILED.value, "error": str(e)[:1000], "id": job_id, "attempt": attempt}
+        )
+        await db.commit()
+        return
+    
+    result = await db.execute(
+        """
+        UPDATE data_export_jobs
+        SET status = :completed, file_path = :path, size_bytes = :size, checksum = :checksum,
+            completed_at = NOW(), expires_at = NOW() + make_interval(days => :retention_days)
+        WHERE id = :id AND attempts = :attempt
+        RETURNING id
+        """,
+        {
+            "completed": DataExportStatus.COMPLETED.value,
+            "path": str(path),
+            "size": path.stat().st_size,
+            "checksum": _file_checksum(path),
+            "retention_days": settings.DATA_EXPORT_RETENTION_DAYS,
+            "id": job_id,
+            "attempt": attempt,
+        }
+    )
+    if result.fetchone() is None:
+        # Superseded by a re-run
+        path.unlink(missing_ok=True)
+    await db.commit()
+    
+    logger.info(
+        "Data export completed",
+        job_id=job_id,
+        files=len(manifest["files"]),
+        rows=sum(f["rows"] for f in manifest["files"]),
+    )
+
+
+async def claim_export_job(db: AsyncSession) -> Optional[tuple]:
+    """Claim the oldest queued job, unless DATA_EXPORT_MAX_CONCURRENT are already running"""
+    await db.execute(CLAIM_LOCK_SQL)
+    result = await db.execute(
+        CLAIM_SQL,
+        {"lease": settings.DATA_EXPORT_LEASE_SECONDS, "max_concurrent": settings.DATA_EXPORT_MAX_CONCURRENT}
+    )
+    job = result.fetchone()
+    await db.commit()
+    return job
+
+
+async def expire_export_archives(db: AsyncSession) -> int:
+    """Delete archives past their expiry; returns the number expired"""
+    result = await db.execute(
+        """
+        SELECT id, file_path FROM data_export_jobs
+        WHERE status = :completed AND expires_at < NOW()
+        FOR UPDATE SKIP LOCKED
+        """,
+        {"completed": DataExportStatus.COMPLETED.value}
+    )
+    jobs = result.fetchall()
+    for job in jobs:
+        if job.file_path:
+            Path(job.file_path).unlink(missing_ok=True)
+    if jobs:
+        await db.execute(
+            "UPDATE data_export_jobs SET status = :expired, file_path = NULL WHERE id = ANY(:ids)",
+            {"expired": DataExportStatus.EXPIRED.value, "ids": [job.id for job in jobs]}
+        )
+    await db.commit()
+    
+    if jobs:
+        logger.info("Data export archives expired", count=len(jobs))
+    return len(jobs)
+
+
+class DataExportWorkerPool:
+    """
+    N concurrent export workers, each on its own session
+    Idle workers poll every DATA_EXPORT_POLL_INTERVAL_SECONDS; the first
+    also deletes expired archives.
+    """
+    
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or settings.DATA_EXPORT_WORKERS
+        self._tasks: list[asyncio.Task] = []
+    
+    async def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run(n)) for n in range(self.workers)]
+            logger.info("Data export workers started", workers=self.workers)
+    
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    async def _run(self, worker: int):
+        while True:
+            job = None
+            try:
+                async with AsyncSessionLocal() as session:
+                    job = await claim_export_job(session)
+                    if job is not None:
+                        await run_export_job(session, job.id, job.user_id, job.attempts)
+                    elif worker == 0:
+                        await expire_export_archives(session)
+            except Exception as e:
+                logger.error("Data export worker failed", worker=worker, error=str(e))
+            if job is None:
+                await asyncio.sleep(settings.DATA_EXPORT_POLL_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Run data subject export workers")
+    parser.add_argument("--workers", type=int, default=settings.DATA_EXPORT_WORKERS)
+    args = parser.parse_args()
+    
+    async def main():
+        pool = DataExportWorkerPool(workers=args.workers)
+        await pool.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await pool.stop()
+    
+    asyncio.run(main())
@@ -2,7 +2,7 @@
 Application Configuration
 """
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 import os
 
 
@@ -33,9 +33,117 @@ class Settings(BaseSettings):
     DATABASE_POOL_SIZE: int = 20
     DATABASE_MAX_OVERFLOW: int = 10
     
+    # Transaction Partitioning (monthly ranges on created_at)
+    PARTITION_MONTHS_AHEAD: int = 3
+    PARTITION_MAINTENANCE_INTERVAL_SECONDS: int = 86400
+    
+    # Settlement Workers
+    SETTLEMENT_WORKERS: int = 4
+    SETTLEMENT_BATCH_SIZE: int = 100
+    SETTLEMENT_POLL_INTERVAL_SECONDS: float = 1.0
+    SETTLEMENT_MAX_ATTEMPTS: int = 5
+    SETTLEMENT_RETRY_BASE_SECONDS: float = 5.0
+    SETTLEMENT_RETRY_MAX_SECONDS: float = 600.0
+    SETTLEMENT_SUBMIT_LEASE_SECONDS: int = 300  # A claimed batch not written back by then is resubmitted
+    SETTLEMENT_PROCESSOR: str = "local"  # "local" or "package.module:ClassName"
+    
+    # Pagination
+    TRANSACTIONS_MAX_OFFSET: int = 10000  # Cap for the deprecated skip/OFFSET paging
+    TRANSACTIONS_SEARCH_MAX_LIMIT: int = 500  # Page size cap for /transactions/search
+    TRANSACTIONS_SEARCH_MAX_RANGE_DAYS: int = 92  # created_at window for unscoped staff searches
+    
+    # Transaction ETags
+    TRANSACTION_ETAG_CACHE_SIZE: int = 50000  # Terminal transactions answered with 304 from memory
+    TRANSACTION_ETAG_CACHE_TTL_SECONDS: int = 3600
+    
+    # Transaction Events (SSE status stream)
+    TRANSACTION_EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    TRANSACTION_EVENTS_QUEUE_SIZE: int = 256  # Buffered events per stream before a slow client is dropped
+    TRANSACTION_EVENTS_MAX_STREAMS_PER_USER: int = 5  # Per worker
+    TRANSACTION_EVENTS_REPLAY_WINDOW_SECONDS: int = 3600  # How far back Last-Event-ID can resume
+    TRANSACTION_EVENTS_REPLAY_MAX_EVENTS: int = 500
+    TRANSACTION_EVENTS_RECONNECT_SECONDS: float = 2.0
+    
+    # Bulk Ingestion
+    BULK_INGEST_CHUNK_SIZE: int = 5000  # Rows per COPY
+    BULK_INGEST_MAX_ROWS: int = 200000  # Rows per request
+    BULK_INGEST_MAX_ERRORS: int = 1000  # Row errors reported per request
+    BULK_INGEST_MAX_LINE_BYTES: int = 65536
+    
+    # Idempotency Keys
+    IDEMPOTENCY_TTL_SECONDS: int = 86400  # How long completed responses are replayed
+    IDEMPOTENCY_LOCK_TTL_SECONDS: int = 60  # In-flight claim expiry (crashed workers)
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0  # How long a duplicate waits for the in-flight request
+    IDEMPOTENCY_POLL_SECONDS: float = 0.05
+    
+    # Balance Ledger
+    LEDGER_RECONCILE_CHUNK_SIZE: int = 1000  # Users per reconciliation chunk
+    LEDGER_RECONCILE_CONCURRENCY: int = 4  # Parallel chunks (each uses a pooled connection)
+    
+    # Transaction Analytics
+    ANALYTICS_MINUTE_RETENTION_DAYS: int = 14  # Older minute rollups are dropped (hour and day are kept)
+    ANALYTICS_MAX_POINTS: int = 1000  # Buckets per series before coarser buckets are used
+    
+    # Streaming Exports
+    EXPORT_BATCH_ROWS: int = 1000  # Cursor prefetch and rows per response chunk
+    
+    # Data Subject Access (sections are read concurrently)
+    DATA_ACCESS_SECTION_TIMEOUT_SECONDS: float = 30.0  # Query time per section, excluding waits on the client
+    DATA_ACCESS_PREFETCH_BATCHES: int = 4  # Batches a section reads ahead of the one being streamed
+    DATA_ACCESS_POOL_SHARE: float = 0.5  # Share of the connection pool concurrent reads may hold; beyond it reads run sequentially
+    
+    # Data Subject Export Jobs
+    DATA_EXPORT_DIR: str = os.getenv("DATA_EXPORT_DIR", "/var/lib/fintech/exports")  # Archive storage
+    DATA_EXPORT_WORKERS: int = 2  # Per worker process
+    DATA_EXPORT_MAX_CONCURRENT: int = 2  # Running jobs across all worker processes
+    DATA_EXPORT_POLL_INTERVAL_SECONDS: float = 5.0
+    DATA_EXPORT_LEASE_SECONDS: int = 3600  # A job running longer is presumed crashed and re-run
+    DATA_EXPORT_RETENTION_DAYS: int = 7  # Archives are deleted after this
+    DATA_EXPORT_LINK_TTL_SECONDS: int = 900  # Signed download link lifetime
+    
+    # Personal Data Deletion (chunked hard deletes)
+    DELETION_WORKERS: int = 1  # Per worker process
+    DELETION_BATCH_SIZE: int = 5000  # Rows per table per transaction
+    DELETION_POLL_INTERVAL_SECONDS: float = 10.0
+    DELETION_LEASE_SECONDS: int = 600  # A running job without a heartbeat for this long is presumed crashed and resumed
+    DELETION_MAX_REPLICATION_LAG_SECONDS: float = 10.0  # Pause while any replica's replay lag is above this
+    DELETION_MAX_WAL_BYTES_PER_SECOND: int = 16 * 1024 * 1024  # Pause while the server writes WAL faster than this
+    DELETION_THROTTLE_SLEEP_SECONDS: float = 1.0
+    DELETION_MAX_ATTEMPTS: int = 5  # A failed job goes back to pending until this many attempts, then stays failed
+    DELETION_RETRY_BASE_SECONDS: float = 60.0  # Doubles per attempt
+    DELETION_RETRY_MAX_SECONDS: float = 3600.0
+    
+    # Retention Purge
+    PURGE_BATCH_SIZE: int = 500  # Expired users queued for deletion per transaction
+    PURGE_WORKERS: int = 2
+    
     # Redis
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     REDIS_SESSION_TTL: int = 3600  # 1 hour
+    REDIS_MAX_CONNECTIONS: int = 50
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "redis")  # redis, local (in-process stand-in)
+    
+    # Rate Limiting (token buckets, "<requests>/<second|minute|hour|day>")
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_ANONYMOUS: str = "100/minute"  # Per client IP
+    RATE_LIMIT_AUTHENTICATED: str = "1000/hour"  # Per user
+    RATE_LIMIT_ROUTES: Dict[str, str] = {
+        "/api/v1/auth/login": "10/minute",
+        "/api/v1/auth/register": "5/minute",
+        "/api/v1/auth/refresh": "30/minute",
+        "/api/v1/transactions/bulk": "10/minute",
+    }
+    RATE_LIMIT_LEASE_FRACTION: float = 0.05  # Share of a bucket a worker may take per Redis call
+    RATE_LIMIT_LEASE_TTL_SECONDS: float = 1.0
+    
+    # Velocity Checks (fraud limits per user on transaction creation)
+    VELOCITY_ENABLED: bool = True
+    VELOCITY_RULES: List[Dict] = [
+        {"name": "10m", "window_seconds": 600, "max_count": 10, "max_amount": "50000", "currency": "ZAR"},
+        {"name": "24h", "window_seconds": 86400, "max_count": 100, "max_amount": "250000", "currency": "ZAR"},
+    ]
+    VELOCITY_BUCKETS: int = 60  # Ring-buffer slots per window
+    VELOCITY_MAX_KEYS: int = 200000  # Local (user, rule) windows kept in memory
     
     # Encryption
     ENCRYPTION_KEY: Optional[str] = os.getenv("ENCRYPTION_KEY")  # 32-byte key for AES-256
@@ -50,6 +158,13 @@ class Settings(BaseSettings):
     AUDIT_LOG_RETENTION_DAYS: int = 2555  # 7 years
     ENABLE_AUDIT_LOGGING: bool = True
     ENABLE_DATA_MINIMIZATION: bool = True
+    AUDIT_QUEUE_MAX_SIZE: int = 10000  # Background audit writer buffer
+    AUDIT_BATCH_SIZE: int = 200  # Audit rows per INSERT batch
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 0.05
+    AUDIT_ENQUEUE_TIMEOUT_SECONDS: float = 0.5  # Wait for room in a full queue before dropping (audit_events_dropped_total)
+    AUDIT_WRITE_MAX_ATTEMPTS: int = 5  # Per batch while the database is unavailable
+    AUDIT_WRITE_RETRY_BASE_SECONDS: float = 0.5  # Doubles per attempt
+    AUDIT_WRITE_RETRY_MAX_SECONDS: float = 10.0
     
     # Cloud Provider (for accountability)
     CLOUD_PROVIDER: str = os.getenv("CLOUD_PROVIDER", "aws")  # aws, azure, gcp
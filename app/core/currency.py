@@ -0,0 +1,71 @@
+"""
+Currency Amounts
+Money is stored as BIGINT minor units (cents for ZAR), so sums and
+comparisons are plain integer arithmetic in Postgres and Python. Decimal
+major-unit amounts exist only at the API boundary, converted here.
+"""
+from decimal import Decimal
+
+# ISO 4217 minor-unit exponents; currencies not listed use DEFAULT_EXPONENT
+CURRENCY_EXPONENTS = {
+    "ZAR": 2,
+    "BWP": 2,
+    "NAD": 2,
+    "LSL": 2,
+    "SZL": 2,
+    "USD": 2,
+    "EUR": 2,
+    "GBP": 2,
+    "CNY": 2,
+    "JPY": 0,
+    "KRW": 0,
+    "BHD": 3,
+    "KWD": 3,
+    "OMR": 3,
+}
+DEFAULT_EXPONENT = 2
+
+# Range of the BIGINT amount_minor columns
+MIN_MINOR_UNITS = -2 ** 63
+MAX_MINOR_UNITS = 2 ** 63 - 1
+
+
+def currency_exponent(currency: str) -> int:
+    return CURRENCY_EXPONENTS.get(currency.upper(), DEFAULT_EXPONENT)
+
+
+def to_minor_units(amount: Decimal, currency: str) -> int:
+    """
+    Convert a major-unit amount to minor units
+    Raises ValueError if the amount has more decimal places than the currency
+    allows, or is too large to store
+    """
+    minor = Decimal(amount).scaleb(currency_exponent(currency))
+    if minor != minor.to_integral_value():
+        raise ValueError(f"{currency} amounts allow at most {currency_exponent(currency)} decimal places")
+    if not MIN_MINOR_UNITS <= minor <= MAX_MINOR_UNITS:
+        raise ValueError(f"{currency} amount is out of range")
+    return int(minor)
+
+
+def from_minor_units(minor: int, currency: str) -> Decimal:
+    return Decimal(minor).scaleb(-currency_exponent(currency))
+
+
+def format_minor_units(minor: int, currency: str) -> str:
+    """Major-unit decimal string ("1000.00") using integer arithmetic only"""
+    exponent = currency_exponent(currency)
+    if exponent == 0:
+        return str(minor)
+    whole, fraction = divmod(abs(minor), 10 ** exponent)
+    return f"{'-' if minor < 0 else ''}{whole}.{fraction:0{exponent}d}"
+
+
+def exponent_sql(currency_column: str) -> str:
+    """SQL expression for the minor-unit exponent of a currency column"""
+    cases = " ".join(
+        f"WHEN '{code}' THEN {exponent}"
+        for code, exponent in CURRENCY_EXPONENTS.items()
+        if exponent != DEFAULT_EXPONENT
+    )
+    return f"(CASE {currency_column} {cases} ELSE {DEFAULT_EXPONENT} END)"
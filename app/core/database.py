@@ -31,6 +31,21 @@ AsyncSessionLocal = async_sessionmaker(
 # Base class for models
 Base = declarative_base()
 
+# Commit horizon: start of the oldest other transaction open in this
+# database, or now. Writers stamp updated_at with NOW(), their transaction's
+# start time, so every change stamped before the horizon has committed
+# (visible to any snapshot taken after this is read); changes stamped at or
+# after it may still be in flight. Sessions of other roles are only seen
+# with pg_read_all_stats.
+COMMIT_HORIZON_SQL = """
+    (SELECT LEAST(NOW(), COALESCE(MIN(xact_start), NOW()))
+     FROM pg_stat_activity
+     WHERE datname = current_database()
+     AND backend_type = 'client backend'
+     AND xact_start IS NOT NULL
+     AND pid <> pg_backend_pid())
+"""
+
 
 async def get_db() -> AsyncSession:
     """
@@ -51,12 +66,17 @@ async def init_db():
     """
     Initialize database (create tables)
     """
-    from app.models import user, transaction, audit_log, consent, data_inventory
+    from app.models import user, transaction, audit_log, consent, data_inventory, balance, rollup, data_export, deletion_job
     
     async with engine.begin() as conn:
         # Create all tables
         await conn.run_sync(Base.metadata.create_all)
         logger.info("Database tables created")
+    
+    # transactions is partitioned: make sure current and upcoming months exist
+    from app.transactions.partitions import ensure_partitions
+    async with AsyncSessionLocal() as session:
+        await ensure_partitions(session)
 
 
 async def check_db_connection() -> bool:
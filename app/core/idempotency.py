@@ -0,0 +1,178 @@
+"""
+Idempotency Keys
+Stores the first response for an Idempotency-Key so client retries replay it
+instead of repeating the work. Backed by Redis (shared across workers) or an
+in-process stand-in; the database unique constraint is the final backstop.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from typing import Optional
+from fastapi import HTTPException, status
+from app.core.config import settings
+from app.core.redis import get_redis, use_redis
+import structlog
+
+logger = structlog.get_logger()
+
+IN_FLIGHT = "in_flight"
+DONE = "done"
+
+
+def request_fingerprint(payload: dict) -> str:
+    """Stable hash of a request body, to reject key reuse with a different payload"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class LocalIdempotencyBackend:
+    """In-process stand-in for the Redis tier"""
+    
+    def __init__(self):
+        self._records: dict[str, tuple[float, dict]] = {}
+    
+    async def claim(self, key: str, record: dict, ttl: int) -> bool:
+        self._expire()
+        entry = self._records.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return False
+        self._records[key] = (time.monotonic() + ttl, record)
+        return True
+    
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self._records.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+    
+    async def put(self, key: str, record: dict, ttl: int):
+        self._records[key] = (time.monotonic() + ttl, record)
+    
+    async def delete(self, key: str):
+        self._records.pop(key, None)
+    
+    def _expire(self):
+        if len(self._records) < 10000:
+            return
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._records.items() if expires_at <= now]:
+            del self._records[key]
+
+
+class RedisIdempotencyBackend:
+    """Shared records in Redis (SET NX claims the key atomically)"""
+    
+    async def claim(self, key: str, record: dict, ttl: int) -> bool:
+        return bool(await get_redis().set(key, json.dumps(record), nx=True, ex=ttl))
+    
+    async def get(self, key: str) -> Optional[dict]:
+        value = await get_redis().get(key)
+        return json.loads(value) if value else None
+    
+    async def put(self, key: str, record: dict, ttl: int):
+        await get_redis().set(key, json.dumps(record), ex=ttl)
+    
+    async def delete(self, key: str):
+        await get_redis().delete(key)
+
+
+class IdempotencyStore:
+    """
+    Claim / complete / release protocol for idempotent requests
+    
+    Usage:
+        replay = await idempotency_store.acquire(key, fingerprint)
+        if replay is not None: return replay
+        try: ... do the work ...
+        except: await idempotency_store.release(key); raise
+        await idempotency_store.complete(key, fingerprint, response)
+    """
+    
+    def __init__(self):
+        self.backend = RedisIdempotencyBackend() if use_redis() else LocalIdempotencyBackend()
+        # Same-worker waiters are woken directly instead of polling
+        self._events: dict[str, asyncio.Event] = {}
+    
+    async def acquire(self, key: str, fingerprint: str) -> Optional[dict]:
+        """
+        Claim `key` for this request
+        Returns the stored response if the key was already completed, waiting
+        for an in-flight request with the same key to finish first
+        """
+        try:
+            return await self._acquire(key, fingerprint)
+        except HTTPException:
+            raise
+        except Exception as e:
+            # Store unavailable: proceed, the database constraint still prevents duplicates
+            logger.warning("Idempotency store unavailable", error=str(e))
+            return None
+    
+    async def _acquire(self, key: str, fingerprint: str) -> Optional[dict]:
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            claimed = await self.backend.claim(
+                key,
+                {"state": IN_FLIGHT, "fingerprint": fingerprint},
+                settings.IDEMPOTENCY_LOCK_TTL_SECONDS,
+            )
+            if claimed:
+                self._events[key] = asyncio.Event()
+                return None
+            
+            record = await self.backend.get(key)
+            if record is None:
+                # The in-flight request failed and released the key (or its claim expired); claim again
+                continue
+            if record["fingerprint"] != fingerprint:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used with a different request",
+                )
+            if record["state"] == DONE:
+                return record["response"]
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still in progress",
+                )
+            event = self._events.get(key)
+            try:
+                if event is not None:
+                    await asyncio.wait_for(event.wait(), timeout=remaining)
+                else:
+                    await asyncio.sleep(min(settings.IDEMPOTENCY_POLL_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                pass
+    
+    async def complete(self, key: str, fingerprint: str, response: dict):
+        """Store the response for replay and wake waiters"""
+        try:
+            await self.backend.put(
+                key,
+                {"state": DONE, "fingerprint": fingerprint, "response": response},
+                settings.IDEMPOTENCY_TTL_SECONDS,
+            )
+        except Exception as e:
+            # The database constraint still prevents duplicates
+            logger.error("Failed to store idempotent response", error=str(e))
+        self._wake(key)
+    
+    async def release(self, key: str):
+        """Drop an in-flight claim after a failure so the client can retry"""
+        try:
+            await self.backend.delete(key)
+        except Exception as e:
+            logger.error("Failed to release idempotency key", error=str(e))
+        self._wake(key)
+    
+    def _wake(self, key: str):
+        event = self._events.pop(key, None)
+        if event is not None:
+            event.set()
+
+
+# Global idempotency store instance
+idempotency_store = IdempotencyStore()
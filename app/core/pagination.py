@@ -0,0 +1,27 @@
+"""
+Keyset (Cursor) Pagination Helpers
+Opaque cursors over a (timestamp, id) sort key
+"""
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException, status
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode the sort key of the last row on a page as an opaque, URL-safe cursor"""
+    raw = json.dumps({"t": created_at.isoformat(), "i": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor (400 if it was tampered with)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["t"]), int(data["i"])
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
@@ -0,0 +1,233 @@
+"""
+Rate Limiting - Token Buckets
+Per-route and per-principal buckets shared across workers and nodes.
+
+Each worker leases a small batch of tokens from the shared bucket (one atomic
+Redis Lua call) and spends it locally, so most requests never leave the
+process while the fleet as a whole stays within the configured limit.
+Tokens left in an expired or dropped lease are returned to the bucket with
+the next call for that key, so light traffic doesn't drain it.
+"""
+import math
+import time
+from dataclasses import dataclass
+from app.core.config import settings
+from app.core.redis import get_redis, use_redis
+import structlog
+
+logger = structlog.get_logger()
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """A token bucket: `capacity` tokens, refilled evenly over `period` seconds"""
+    capacity: int
+    period: int
+    
+    @property
+    def refill_rate(self) -> float:
+        """Tokens per second"""
+        return self.capacity / self.period
+    
+    @classmethod
+    def parse(cls, value: str) -> "RateLimitRule":
+        """Parse "<requests>/<period>", e.g. "100/minute" """
+        count, _, period = value.partition("/")
+        if period not in PERIODS:
+            raise ValueError(f"Invalid rate limit period: {value!r}")
+        return cls(capacity=int(count), period=PERIODS[period])
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of a bucket check, used to build RateLimit-* headers"""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_seconds: int
+    retry_after: int = 0
+
+
+# KEYS[1] = bucket key
+# ARGV = capacity, refill rate (tokens/s), tokens requested, unspent lease tokens returned
+# Returns {granted, tokens left}; tokens left as a string to keep the fraction
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local refund = tonumber(ARGV[4]) or 0
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate + refund)
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {granted, tostring(tokens)}
+"""
+
+
+class LocalBucketStore:
+    """
+    In-process stand-in for the Redis tier (development and single-worker use)
+    Same refill semantics as TOKEN_BUCKET_SCRIPT
+    """
+    
+    def __init__(self, max_keys: int = 100000):
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._max_keys = max_keys
+    
+    async def acquire(self, key: str, rule: RateLimitRule, requested: int, refund: int = 0) -> tuple[int, float]:
+        now = time.monotonic()
+        tokens, ts = self._buckets.get(key, (rule.capacity, now))
+        tokens = min(rule.capacity, tokens + max(0.0, now - ts) * rule.refill_rate + refund)
+        granted = min(requested, math.floor(tokens))
+        tokens -= granted
+        if len(self._buckets) >= self._max_keys and key not in self._buckets:
+            self._evict(now)
+        self._buckets[key] = (tokens, now)
+        return granted, tokens
+    
+    async def refund(self, refunds: list[tuple[str, RateLimitRule, int]]):
+        """Return unspent lease tokens to several buckets"""
+        for key, rule, tokens in refunds:
+            await self.acquire(key, rule, 0, tokens)
+    
+    def _evict(self, now: float):
+        """Drop buckets idle long enough to be full again (they carry no state)"""
+        idle = [key for key, (_, ts) in self._buckets.items() if now - ts > 86400]
+        for key in idle or list(self._buckets)[: self._max_keys // 10]:
+            del self._buckets[key]
+
+
+class RedisBucketStore:
+    """Shared bucket state in Redis, updated atomically by a Lua script"""
+    
+    def __init__(self):
+        self._script = None
+    
+    async def acquire(self, key: str, rule: RateLimitRule, requested: int, refund: int = 0) -> tuple[int, float]:
+        if self._script is None:
+            self._script = get_redis().register_script(TOKEN_BUCKET_SCRIPT)
+        granted, tokens = await self._script(
+            keys=[key],
+            args=[rule.capacity, rule.refill_rate, requested, refund],
+        )
+        return int(granted), float(tokens)
+    
+    async def refund(self, refunds: list[tuple[str, RateLimitRule, int]]):
+        """Return unspent lease tokens to several buckets in one pipelined round trip"""
+        if self._script is None:
+            self._script = get_redis().register_script(TOKEN_BUCKET_SCRIPT)
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for key, rule, tokens in refunds:
+                await self._script(keys=[key], args=[rule.capacity, rule.refill_rate, 0, tokens], client=pipe)
+            await pipe.execute()
+
+
+class _Lease:
+    """Tokens taken from the shared bucket and not yet spent by this worker"""
+    __slots__ = ("rule", "tokens", "shared_tokens", "expires_at")
+    
+    def __init__(self, rule: RateLimitRule, tokens: int, shared_tokens: float, expires_at: float):
+        self.rule = rule
+        self.tokens = tokens
+        self.shared_tokens = shared_tokens
+        self.expires_at = expires_at
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter with an in-process fast path
+    """
+    
+    def __init__(self):
+        self._local_store = LocalBucketStore()
+        self._redis_store = RedisBucketStore() if use_redis() else None
+        self._leases: dict[str, _Lease] = {}
+    
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitDecision:
+        """Consume one token from the bucket `key`"""
+        now = time.monotonic()
+        lease = self._leases.get(key)
+        if lease is not None and lease.tokens > 0 and lease.expires_at > now:
+            lease.tokens -= 1
+            return self._decision(rule, True, lease.tokens + lease.shared_tokens)
+        
+        # The lease is expired or spent: hand back what it didn't use with the
+        # next batch. Dropped before awaiting so concurrent requests on this
+        # key can't refund the same tokens again.
+        refund = 0
+        if lease is not None:
+            self._leases.pop(key, None)
+            refund = lease.tokens
+        batch = max(1, int(rule.capacity * settings.RATE_LIMIT_LEASE_FRACTION))
+        granted, shared_tokens = await self._acquire(key, rule, batch, refund)
+        
+        if len(self._leases) > 10000:
+            await self._prune_leases(now)
+        
+        if granted == 0:
+            retry_after = math.ceil((1 - shared_tokens) / rule.refill_rate)
+            return self._decision(rule, False, shared_tokens, retry_after=max(1, retry_after))
+        
+        # A concurrent request may have stored a lease meanwhile; keep its tokens
+        current = self._leases.get(key)
+        carried = current.tokens if current is not None and current.expires_at > now else 0
+        self._leases[key] = _Lease(
+            rule=rule,
+            tokens=granted - 1 + carried,
+            shared_tokens=shared_tokens,
+            expires_at=now + settings.RATE_LIMIT_LEASE_TTL_SECONDS,
+        )
+        return self._decision(rule, True, granted - 1 + carried + shared_tokens)
+    
+    async def _acquire(self, key: str, rule: RateLimitRule, requested: int, refund: int = 0) -> tuple[int, float]:
+        """Take tokens from the shared tier, degrading to per-worker limits if Redis is down"""
+        if self._redis_store is not None:
+            try:
+                return await self._redis_store.acquire(key, rule, requested, refund)
+            except Exception as e:
+                logger.warning("Rate limit store unavailable, using local buckets", error=str(e))
+        return await self._local_store.acquire(key, rule, requested, refund)
+    
+    async def _prune_leases(self, now: float):
+        """Drop expired leases so memory stays bounded, returning their unspent tokens in one batch"""
+        refunds = []
+        for key in [k for k, lease in self._leases.items() if lease.expires_at <= now]:
+            lease = self._leases.pop(key)
+            if lease.tokens > 0:
+                refunds.append((key, lease.rule, lease.tokens))
+        if not refunds:
+            return
+        if self._redis_store is not None:
+            try:
+                await self._redis_store.refund(refunds)
+                return
+            except Exception as e:
+                logger.warning("Rate limit store unavailable, using local buckets", error=str(e))
+        await self._local_store.refund(refunds)
+    
+    @staticmethod
+    def _decision(
+        rule: RateLimitRule,
+        allowed: bool,
+        tokens: float,
+        retry_after: int = 0,
+    ) -> RateLimitDecision:
+        return RateLimitDecision(
+            allowed=allowed,
+            limit=rule.capacity,
+            remaining=max(0, int(tokens)),
+            reset_seconds=max(0, math.ceil((rule.capacity - tokens) / rule.refill_rate)),
+            retry_after=retry_after,
+        )
+
+
+# Global rate limiter instance
+rate_limiter = RateLimiter()
@@ -0,0 +1,39 @@
+"""
+Redis Client Management
+Shared connection for the cross-worker tier (rate limits, idempotency, etc.)
+"""
+from redis import asyncio as aioredis
+from app.core.config import settings
+import structlog
+
+logger = structlog.get_logger()
+
+_client: aioredis.Redis | None = None
+
+
+def use_redis() -> bool:
+    """Whether the shared tier is Redis or the in-process stand-in"""
+    return settings.CACHE_BACKEND == "redis"
+
+
+def get_redis() -> aioredis.Redis:
+    """
+    Get the shared Redis client (created lazily, pooled per worker)
+    """
+    global _client
+    if _client is None:
+        _client = aioredis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+        )
+    return _client
+
+
+async def close_redis():
+    """Close the shared Redis client (called on shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+        logger.info("Redis connection closed")
@@ -12,9 +12,14 @@ import structlog
 from app import __version__
 from app.core.config import settings
 from app.core.database import init_db
+from app.compliance.audit import audit_writer
+from app.transactions.partitions import partition_maintainer
+from app.transactions.events import event_broker
 from app.api.v1.router import api_router
 from app.middleware.audit import AuditLogMiddleware
 from app.middleware.security import SecurityHeadersMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.core.redis import close_redis
 
 # Configure structured logging
 structlog.configure(
@@ -39,9 +44,16 @@ async def lifespan(app: FastAPI):
     logger.info("Starting FinTech Platform", version=__version__)
     await init_db()
     logger.info("Database initialized")
+    await audit_writer.start()
+    await partition_maintainer.start()
+    await event_broker.start()
     yield
     # Shutdown
     logger.info("Shutting down FinTech Platform")
+    await event_broker.stop()
+    await partition_maintainer.stop()
+    await audit_writer.stop()
+    await close_redis()
 
 
 app = FastAPI(
@@ -54,6 +66,9 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Rate Limiting Middleware (innermost, so 429s still get CORS/security headers and are audited)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
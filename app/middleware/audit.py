@@ -8,8 +8,8 @@ from starlette.responses import Response
 import structlog
 from datetime import datetime
 from app.core.config import settings
-from app.core.database import AsyncSessionLocal
-from app.models.audit_log import AuditLog, AuditAction
+from app.models.audit_log import AuditAction
+from app.compliance.audit import queue_audit_event
 import json
 
 logger = structlog.get_logger()
@@ -31,6 +31,11 @@ class AuditLogMiddleware(BaseHTTPMiddleware):
         "/api/openapi.json",
     ]
     
+    # Endpoints that stream their request body
+    STREAMING_PATHS = {
+        "/api/v1/transactions/bulk",
+    }
+    
     # Read-only actions (GET, HEAD, OPTIONS)
     READ_ACTIONS = {"GET", "HEAD", "OPTIONS"}
     
@@ -71,8 +76,9 @@ class AuditLogMiddleware(BaseHTTPMiddleware):
         user_agent = request.headers.get("user-agent", "")
         
         # Read request body if available (for POST/PUT)
+        # Streamed uploads are not buffered here; their endpoints log a summary
         request_body = None
-        if request.method in ["POST", "PUT", "PATCH"]:
+        if request.method in ["POST", "PUT", "PATCH"] and request.url.path.rstrip("/") not in self.STREAMING_PATHS:
             try:
                 body = await request.body()
                 if body:
@@ -160,22 +166,16 @@ class AuditLogMiddleware(BaseHTTPMiddleware):
         status_code: int,
         metadata: dict,
     ):
-        """Log audit event to database"""
-        async with AsyncSessionLocal() as session:
-            audit_log = AuditLog(
-                user_id=user_id,
-                user_email=user_email,
-                action=action,
-                resource_type=resource_type,
-                resource_id=resource_id,
-                ip_address=ip_address,
-                user_agent=user_agent[:500],  # Limit length
-                description=f"{method} {path} - Status: {status_code}",
-                metadata=metadata,
-                cloud_provider=settings.CLOUD_PROVIDER,
-                region=settings.REGION,
-                # Availability zone would be determined at runtime
-            )
-            session.add(audit_log)
-            await session.commit()
-
+        """Queue audit event for the background audit writer (written directly if it cannot be queued)"""
+        await queue_audit_event(
+            user_id=user_id,
+            user_email=user_email,
+            action=action,
+            resource_type=resource_type,
+            resource_id=resource_id,
+            ip_address=ip_address,
+            user_agent=user_agent[:500],  # Limit length
+            description=f"{method} {path} - Status: {status_code}",
+            metadata=metadata,
+            # Availability zone would be determined at runtime
+        )
@@ -0,0 +1,77 @@
+"""
+Rate Limiting Middleware
+Per-principal and per-route token buckets with RateLimit-* response headers
+"""
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.core.config import settings
+from app.core.rate_limit import RateLimitRule, rate_limiter
+from app.core.security import verify_token
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """
+    Limits requests per client before they reach the database or bcrypt
+    Authenticated callers are limited per user, anonymous callers per IP
+    """
+    
+    # Endpoints that are never rate limited (load balancer probes, docs)
+    EXCLUDED_PATHS = [
+        "/health",
+        "/api/docs",
+        "/api/redoc",
+        "/api/openapi.json",
+    ]
+    
+    def __init__(self, app):
+        super().__init__(app)
+        self.anonymous_rule = RateLimitRule.parse(settings.RATE_LIMIT_ANONYMOUS)
+        self.authenticated_rule = RateLimitRule.parse(settings.RATE_LIMIT_AUTHENTICATED)
+        self.route_rules = {
+            path: RateLimitRule.parse(limit)
+            for path, limit in settings.RATE_LIMIT_ROUTES.items()
+        }
+    
+    async def dispatch(self, request: Request, call_next):
+        path = request.url.path
+        if not settings.RATE_LIMIT_ENABLED or any(path.startswith(p) for p in self.EXCLUDED_PATHS):
+            return await call_next(request)
+        
+        principal, rule = self._principal(request)
+        decisions = [await rate_limiter.hit(f"rl:{principal}", rule)]
+        
+        route_rule = self.route_rules.get(path.rstrip("/"))
+        if route_rule is not None and decisions[0].allowed:
+            decisions.append(await rate_limiter.hit(f"rl:{path}:{principal}", route_rule))
+        
+        # Report the most restrictive bucket
+        denied = [d for d in decisions if not d.allowed]
+        decision = denied[0] if denied else min(decisions, key=lambda d: d.remaining)
+        headers = {
+            "RateLimit-Limit": str(decision.limit),
+            "RateLimit-Remaining": str(decision.remaining),
+            "RateLimit-Reset": str(decision.reset_seconds),
+        }
+        
+        if not decision.allowed:
+            headers["Retry-After"] = str(decision.retry_after)
+            return JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": "Rate limit exceeded"},
+                headers=headers,
+            )
+        
+        response = await call_next(request)
+        response.headers.update(headers)
+        return response
+    
+    def _principal(self, request: Request) -> tuple[str, RateLimitRule]:
+        """Identify the caller: user id from a valid bearer token, else client IP"""
+        authorization = request.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            payload = verify_token(authorization[7:])
+            if payload and payload.get("sub") is not None:
+                return f"user:{payload['sub']}", self.authenticated_rule
+        client_ip = request.client.host if request.client else "unknown"
+        return f"ip:{client_ip}", self.anonymous_rule
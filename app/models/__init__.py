@@ -2,16 +2,31 @@
 Database Models
 """
 from app.models.user import User
-from app.models.transaction import Transaction
+from app.models.transaction import Transaction, TransactionKey
 from app.models.audit_log import AuditLog
 from app.models.consent import Consent
 from app.models.data_inventory import DataInventory
+from app.models.balance import Balance, AccountBalance, HotAccount
+from app.models.data_export import DataExportJob, DataExportWatermark
+from app.models.deletion_job import DeletionJob, PurgeCheckpoint
+from app.models.rollup import MonthlySummary, TransactionRollup, RollupWatermark
 
 __all__ = [
     "User",
     "Transaction",
+    "TransactionKey",
     "AuditLog",
     "Consent",
     "DataInventory",
+    "Balance",
+    "AccountBalance",
+    "HotAccount",
+    "DataExportJob",
+    "DataExportWatermark",
+    "DeletionJob",
+    "PurgeCheckpoint",
+    "MonthlySummary",
+    "TransactionRollup",
+    "RollupWatermark",
 ]
 
@@ -2,7 +2,7 @@
 Audit Log Model - POPIA Compliance Requirement
 All data access and modifications must be logged
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Enum as SQLEnum, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Enum as SQLEnum, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -30,17 +30,23 @@ class AuditLog(Base):
     Retention: 7 years (2555 days)
     """
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # DSAR / compliance: a user's trail, newest first
+        Index("ix_audit_logs_user_id_timestamp", "user_id", text("timestamp DESC")),
+        # Compliance: filter by action, newest first
+        Index("ix_audit_logs_action_timestamp", "action", text("timestamp DESC")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
     # Who
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     user_email = Column(String(255), nullable=True)  # Store email even if user deleted
     ip_address = Column(String(45), nullable=True)  # IPv6 compatible
     user_agent = Column(String(500), nullable=True)
     
     # What
-    action = Column(SQLEnum(AuditAction), nullable=False, index=True)
+    action = Column(SQLEnum(AuditAction), nullable=False)
     resource_type = Column(String(100), nullable=False, index=True)  # e.g., "user", "transaction"
     resource_id = Column(Integer, nullable=True, index=True)
     
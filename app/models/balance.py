@@ -0,0 +1,57 @@
+"""
+Balance Model - Per-User Ledger Balances
+"""
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class Balance(Base):
+    """
+    Running balance per user and currency
+    Maintained in the same transaction that completes a transaction,
+    so reads are O(1) instead of summing the full history
+    """
+    __tablename__ = "balances"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    currency = Column(String(3), primary_key=True)
+    amount_minor = Column(BigInteger, default=0, nullable=False)  # Minor units
+    
+    # Timestamps
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<Balance(user={self.user_id}, currency={self.currency}, amount_minor={self.amount_minor})>"
+
+
+class AccountBalance(Base):
+    """
+    Running balance of a counterparty account, split into sub-ledger shards
+    A hot account (see HotAccount) has several shard rows per currency so
+    concurrent postings lock different rows; its balance is the sum of its
+    shards. Other accounts use shard 0 only.
+    """
+    __tablename__ = "account_balances"
+    
+    account = Column(String(50), primary_key=True)
+    currency = Column(String(3), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True, default=0)
+    amount_minor = Column(BigInteger, default=0, nullable=False)  # Minor units
+    
+    # Timestamps
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<AccountBalance(account={self.account}, currency={self.currency}, shard={self.shard}, amount_minor={self.amount_minor})>"
+
+
+class HotAccount(Base):
+    """Accounts whose postings are spread over `shards` sub-ledger rows"""
+    __tablename__ = "hot_accounts"
+    
+    account = Column(String(50), primary_key=True)
+    shards = Column(SmallInteger, nullable=False)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
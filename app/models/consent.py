@@ -2,7 +2,7 @@
 Consent Model - POPIA Compliance Requirement
 Track user consent for data processing
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum as SQLEnum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -23,12 +23,23 @@ class Consent(Base):
     Tracks when, why, and how consent was given/withdrawn
     """
     __tablename__ = "consents"
+    __table_args__ = (
+        # Covering index: consent checks by user and purpose never touch the heap
+        Index(
+            "ix_consents_user_id_purpose",
+            "user_id",
+            "purpose",
+            postgresql_include=["consent_given"],
+        ),
+        # Per-user changes since a watermark (incremental DSAR exports)
+        Index("ix_consents_user_id_updated_at", "user_id", "updated_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     
     # Consent Details
-    purpose = Column(SQLEnum(ConsentPurpose), nullable=False, index=True)
+    purpose = Column(SQLEnum(ConsentPurpose), nullable=False)
     consent_given = Column(Boolean, default=False, nullable=False)
     
     # POPIA: Explicit consent
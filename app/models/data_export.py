@@ -0,0 +1,82 @@
+"""
+Data Export Job Model - Asynchronous DSAR Exports
+"""
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Enum as SQLEnum, Text, Index, text
+from sqlalchemy.sql import func
+import enum
+from app.core.database import Base
+from app.models.transaction import enum_values
+
+
+class DataExportStatus(str, enum.Enum):
+    """Data export job status"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    EXPIRED = "expired"  # Archive deleted after DATA_EXPORT_RETENTION_DAYS
+
+
+class DataExportJob(Base):
+    """
+    Data subject export job (POPIA: Right to Access / Data Portability)
+    Built by the export workers (app.compliance.export_jobs) into a
+    compressed archive on local storage
+    """
+    __tablename__ = "data_export_jobs"
+    __table_args__ = (
+        # One queued or running export per user (requests are deduplicated)
+        Index(
+            "uq_data_export_jobs_user_id_active",
+            "user_id",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+        # Worker queue
+        Index(
+            "ix_data_export_jobs_queued",
+            "created_at",
+            postgresql_where=text("status = 'queued'"),
+        ),
+    )
+    
+    id = Column(String(32), primary_key=True)  # Random hex, used in download links
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(
+        SQLEnum(DataExportStatus, values_callable=enum_values),
+        default=DataExportStatus.QUEUED,
+        nullable=False,
+    )
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    
+    # Archive (set when completed)
+    file_path = Column(String(500), nullable=True)
+    size_bytes = Column(BigInteger, nullable=True)
+    checksum = Column(String(64), nullable=True)  # SHA-256 of the archive
+    error = Column(Text, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True)  # Archive deleted after this
+    
+    def __repr__(self):
+        return f"<DataExportJob(id={self.id}, user_id={self.user_id}, status={self.status})>"
+
+
+class DataExportWatermark(Base):
+    """
+    Last /data-subject/export per user, for incremental (delta) exports
+    A delta covers records changed after the previous export's snapshot
+    """
+    __tablename__ = "data_export_watermarks"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    export_id = Column(String(32), nullable=False)  # Manifest export_id of the last export
+    base_export_id = Column(String(32), nullable=True)  # Last full export the delta chain starts from
+    watermark = Column(DateTime(timezone=True), nullable=False)  # Snapshot time of the last export
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<DataExportWatermark(user_id={self.user_id}, watermark={self.watermark})>"
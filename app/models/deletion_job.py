@@ -0,0 +1,82 @@
+"""
+Deletion Job Model - Chunked Personal Data Deletion
+"""
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Enum as SQLEnum, Text, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+import enum
+from app.core.database import Base
+from app.models.transaction import enum_values
+
+
+class DeletionJobStatus(str, enum.Enum):
+    """Deletion job status"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class DeletionJob(Base):
+    """
+    Hard deletion of a user and their personal data (POPIA Section 24/25)
+    Run by the deletion workers (app.compliance.deletion) in bounded chunks;
+    step and progress are updated with every chunk, so a job resumes where it
+    stopped. Kept after completion as the record that the data was deleted.
+    """
+    __tablename__ = "deletion_jobs"
+    __table_args__ = (
+        # One pending or running deletion per user
+        Index(
+            "uq_deletion_jobs_user_id_active",
+            "user_id",
+            unique=True,
+            postgresql_where=text("status IN ('pending', 'running')"),
+        ),
+        # Worker queue
+        Index(
+            "ix_deletion_jobs_pending",
+            "requested_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False, index=True)  # No foreign key: outlives the user
+    reason = Column(String(50), nullable=False)  # "data_subject_request", "retention_expired"
+    status = Column(
+        SQLEnum(DeletionJobStatus, values_callable=enum_values),
+        default=DeletionJobStatus.PENDING,
+        nullable=False,
+    )
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)  # Retry backoff after a failed attempt
+    
+    # Progress
+    step = Column(String(50), nullable=True)  # Table currently being deleted from
+    progress = Column(JSONB, default=dict, server_default="{}", nullable=False)  # Rows deleted per table
+    error = Column(Text, nullable=True)
+    
+    # Timestamps
+    requested_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # Heartbeat while running
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self):
+        return f"<DeletionJob(id={self.id}, user_id={self.user_id}, status={self.status}, step={self.step})>"
+
+
+class PurgeCheckpoint(Base):
+    """
+    Resume point of a keyset-batched purge job (last id processed)
+    Reset to 0 when a pass over the table completes
+    """
+    __tablename__ = "purge_checkpoints"
+    
+    name = Column(String(100), primary_key=True)
+    last_id = Column(BigInteger, default=0, server_default="0", nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<PurgeCheckpoint(name={self.name}, last_id={self.last_id})>"
@@ -0,0 +1,71 @@
+"""
+Rollup Models - Precomputed Transaction Aggregates
+"""
+from sqlalchemy import Column, Integer, SmallInteger, String, Date, DateTime, ForeignKey, BigInteger
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class MonthlySummary(Base):
+    """
+    Per-user monthly totals by type, status and currency
+    Maintained by the summary watermark job, read by GET /transactions/summary
+    """
+    __tablename__ = "monthly_summaries"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    month = Column(Date, primary_key=True)  # First day of the month (UTC)
+    transaction_type = Column(String(20), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    currency = Column(String(3), primary_key=True)
+    
+    count = Column(BigInteger, default=0, nullable=False)
+    total_minor = Column(BigInteger, default=0, nullable=False)  # Minor units
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<MonthlySummary(user={self.user_id}, month={self.month}, type={self.transaction_type}, status={self.status})>"
+
+
+class TransactionRollup(Base):
+    """
+    Platform-wide transaction totals per time bucket, type, status and currency
+    Kept at minute, hour and day granularity by the analytics refresh job,
+    read by GET /transactions/analytics. The amount distribution is a
+    log-bucketed sketch (see app.transactions.analytics) stored as parallel
+    arrays of bin numbers and counts; sketches merge by adding counts per bin.
+    """
+    __tablename__ = "transaction_rollups"
+    
+    granularity = Column(String(10), primary_key=True)  # minute, hour, day
+    bucket = Column(DateTime(timezone=True), primary_key=True)  # Bucket start (UTC)
+    transaction_type = Column(String(20), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    currency = Column(String(3), primary_key=True)
+    
+    count = Column(BigInteger, default=0, nullable=False)
+    total_minor = Column(BigInteger, default=0, nullable=False)  # Minor units
+    sketch_bins = Column(ARRAY(SmallInteger), nullable=False)
+    sketch_counts = Column(ARRAY(BigInteger), nullable=False)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<TransactionRollup(granularity={self.granularity}, bucket={self.bucket}, type={self.transaction_type}, status={self.status})>"
+
+
+class RollupWatermark(Base):
+    """
+    Progress marker for incremental rollup jobs
+    Each job processes source rows changed after its watermark
+    """
+    __tablename__ = "rollup_watermarks"
+    
+    name = Column(String(100), primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<RollupWatermark(name={self.name}, watermark={self.watermark})>"
@@ -1,11 +1,11 @@
 """
 Transaction Model - Financial Transaction Records
 """
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Enum as SQLEnum, Text, Index, UniqueConstraint, DDL, event, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
-from app.core.database import Base
+from app.core.database import Base, COMMIT_HORIZON_SQL
 
 
 class TransactionType(str, enum.Enum):
@@ -25,38 +25,193 @@ class TransactionStatus(str, enum.Enum):
     CANCELLED = "cancelled"
 
 
+def enum_values(enum_class) -> list[str]:
+    """Store enum values ("pending") rather than names ("PENDING")"""
+    return [member.value for member in enum_class]
+
+
 class Transaction(Base):
     """
     Financial transaction model
     POPIA: Financial records must be retained for 7 years (2555 days)
+    
+    Range-partitioned by month on created_at (see app.transactions.partitions).
+    Unique constraints on a partitioned table must include created_at, so
+    reference and idempotency key uniqueness live in TransactionKey.
     """
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Per-user history, newest first (list_transactions, DSAR)
+        Index("ix_transactions_user_id_created_at", "user_id", text("created_at DESC"), text("id DESC")),
+        # Platform-wide listing (admin)
+        Index("ix_transactions_created_at_id", text("created_at DESC"), text("id DESC")),
+        # Small partial index over the PENDING work queue
+        Index(
+            "ix_transactions_pending",
+            "created_at",
+            "id",
+            postgresql_where=text("status = 'pending'"),
+        ),
+        # Incremental rollup jobs scan recently changed rows
+        Index("ix_transactions_updated_at", "updated_at"),
+        # Per-user changes since a watermark (incremental DSAR exports)
+        Index("ix_transactions_user_id_updated_at", "user_id", "updated_at"),
+        # Search: created_at correlates with physical order (append-only), so a
+        # tiny BRIN index serves wide date-range scans
+        Index("ix_transactions_created_at_brin", "created_at", postgresql_using="brin"),
+        # Search by counterparty account (most rows have only one of the two)
+        Index(
+            "ix_transactions_recipient_account",
+            "recipient_account",
+            text("created_at DESC"),
+            postgresql_where=text("recipient_account IS NOT NULL"),
+        ),
+        Index(
+            "ix_transactions_sender_account",
+            "sender_account",
+            text("created_at DESC"),
+            postgresql_where=text("sender_account IS NOT NULL"),
+        ),
+        # Search / support triage of failed transactions
+        Index(
+            "ix_transactions_failed",
+            text("created_at DESC"),
+            text("id DESC"),
+            postgresql_where=text("status = 'failed'"),
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     
-    # Transaction Details
-    transaction_type = Column(SQLEnum(TransactionType), nullable=False)
-    status = Column(SQLEnum(TransactionStatus), default=TransactionStatus.PENDING, nullable=False)
-    amount = Column(Numeric(15, 2), nullable=False)  # Decimal with 2 decimal places
+    # Transaction Details (enum values are stored, matching what the endpoints write)
+    transaction_type = Column(SQLEnum(TransactionType, values_callable=enum_values), nullable=False)
+    status = Column(
+        SQLEnum(TransactionStatus, values_callable=enum_values),
+        default=TransactionStatus.PENDING,
+        nullable=False,
+    )
+    amount_minor = Column(BigInteger, nullable=False)  # Minor units, e.g. cents (see app.core.currency)
     currency = Column(String(3), default="ZAR", nullable=False)  # South African Rand
     
     # Transaction Metadata
-    reference = Column(String(100), unique=True, index=True, nullable=False)  # Unique transaction reference
+    reference = Column(String(100), index=True, nullable=False)  # Unique transaction reference (see TransactionKey)
     description = Column(Text, nullable=True)
     recipient_account = Column(String(50), nullable=True)  # For transfers/payments
     sender_account = Column(String(50), nullable=True)
+    idempotency_key = Column(String(255), nullable=True)  # Client Idempotency-Key header
+    
+    # Settlement retries (see app.transactions.settlement)
+    settlement_attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    next_settlement_at = Column(DateTime(timezone=True), nullable=True)
     
     # POPIA: Minimal data - only necessary transaction data
     # No unnecessary personal information stored here
     
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), primary_key=True)  # Partition key
     completed_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
     # Relationships
     user = relationship("User", back_populates="transactions")
     
     def __repr__(self):
-        return f"<Transaction(id={self.id}, type={self.transaction_type}, amount={self.amount}, status={self.status})>"
+        return f"<Transaction(id={self.id}, type={self.transaction_type}, amount_minor={self.amount_minor}, status={self.status})>"
+
+
+class TransactionKey(Base):
+    """
+    Global key registry for the partitioned transactions table
+    Enforces unique references and (user, Idempotency-Key) pairs across all
+    partitions, and maps an id to its created_at for partition pruning.
+    Rows are written by the transactions_register_key trigger.
+    """
+    __tablename__ = "transaction_keys"
+    __table_args__ = (
+        # Backstop for client retries (NULL keys never conflict)
+        UniqueConstraint("user_id", "idempotency_key", name="uq_transaction_keys_user_id_idempotency_key"),
+    )
+    
+    reference = Column(String(100), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    idempotency_key = Column(String(255), nullable=True)
+    transaction_id = Column(Integer, unique=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+
+# BEFORE INSERT trigger: register the row's keys. A duplicate reference raises;
+# a duplicate idempotency key skips the insert (INSERT ... RETURNING returns no row).
+# AFTER DELETE trigger: drop the keys of deleted (e.g. purged) transactions.
+REGISTER_KEY_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION transactions_register_key() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO transaction_keys (reference, user_id, idempotency_key, transaction_id, created_at)
+    VALUES (NEW.reference, NEW.user_id, NEW.idempotency_key, NEW.id, NEW.created_at)
+    ON CONFLICT (user_id, idempotency_key) DO NOTHING;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+RELEASE_KEY_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION transactions_release_key() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM transaction_keys WHERE reference = OLD.reference AND transaction_id = OLD.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+REGISTER_KEY_TRIGGER = DDL("""
+CREATE TRIGGER transactions_register_key
+BEFORE INSERT ON transactions
+FOR EACH ROW EXECUTE FUNCTION transactions_register_key()
+""")
+
+RELEASE_KEY_TRIGGER = DDL("""
+CREATE TRIGGER transactions_release_key
+AFTER DELETE ON transactions
+FOR EACH ROW EXECUTE FUNCTION transactions_release_key()
+""")
+
+# AFTER UPDATE trigger: publish status transitions to LISTENers on commit
+# (see app.transactions.events). resume_us, the event's replay point, is
+# capped at the commit horizon so no later-committing transition falls
+# before it.
+NOTIFY_STATUS_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION transactions_notify_status() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('transaction_events', json_build_object(
+        'id', NEW.id,
+        'user_id', NEW.user_id,
+        'reference', NEW.reference,
+        'status', NEW.status,
+        'completed_at', NEW.completed_at,
+        'resume_us', (EXTRACT(EPOCH FROM LEAST(NEW.updated_at, """ + COMMIT_HORIZON_SQL + """)) * 1000000)::bigint
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+NOTIFY_STATUS_TRIGGER = DDL("""
+CREATE TRIGGER transactions_notify_status
+AFTER UPDATE OF status ON transactions
+FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status)
+EXECUTE FUNCTION transactions_notify_status()
+""")
 
+for ddl in (
+    REGISTER_KEY_FUNCTION,
+    RELEASE_KEY_FUNCTION,
+    REGISTER_KEY_TRIGGER,
+    RELEASE_KEY_TRIGGER,
+    NOTIFY_STATUS_FUNCTION,
+    NOTIFY_STATUS_TRIGGER,
+):
+    event.listen(Transaction.__table__, "after_create", ddl)
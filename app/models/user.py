@@ -1,7 +1,7 @@
 """
 User Model - POPIA Compliant
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum as SQLEnum, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -24,6 +24,15 @@ class User(Base):
     - Audit trail: All changes logged
     """
     __tablename__ = "users"
+    __table_args__ = (
+        # Retention purge scans the (few) users marked for deletion in id order
+        Index(
+            "ix_users_retention",
+            "id",
+            "data_retention_until",
+            postgresql_where=text("data_retention_until IS NOT NULL"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
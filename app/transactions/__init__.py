@@ -0,0 +1 @@
+"""Transaction Processing Modules"""
@@ -0,0 +1,343 @@
+"""
+Transaction Analytics Rollups
+Platform-wide count, volume and amount distribution per time bucket, type,
+status and currency, for GET /transactions/analytics.
+
+transaction_rollups holds minute, hour and day buckets. The refresh job
+follows the monthly summaries pattern: it finds transactions changed since
+its watermark (up to the commit horizon) and recomputes the buckets they fall in. Minute buckets are
+built from transactions, hour buckets from their minutes (or from
+transactions once the minutes have been dropped) and day buckets from their
+hours, so a run touches little more than the changed rows.
+
+Amount percentiles come from a log-bucketed sketch: each bin spans a factor
+of SKETCH_GAMMA in minor units, so any value is estimated within
+SKETCH_RELATIVE_ACCURACY. Sketches of different buckets merge exactly by
+adding counts per bin, which is what lets queries downsample to any bucket
+width on the fly.
+"""
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import COMMIT_HORIZON_SQL
+import structlog
+
+logger = structlog.get_logger()
+
+WATERMARK_NAME = "transaction_rollups"
+
+SKETCH_RELATIVE_ACCURACY = 0.01  # Changing this invalidates stored sketches
+SKETCH_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+
+# Bin 0 holds amounts below one minor unit; bin k >= 1 holds (gamma^(k-2), gamma^(k-1)]
+BIN_SQL = f"""
+CASE WHEN amount_minor < 1 THEN 0
+     ELSE 1 + ceil(ln(amount_minor) / ln({SKETCH_GAMMA!r}))::int
+END
+"""
+
+GRANULARITY_SECONDS = {"minute": 60, "hour": 3600, "day": 86400}
+
+# Bucket widths a series may be downsampled to, finest first
+RESOLUTIONS = [
+    ("1m", 60),
+    ("5m", 300),
+    ("15m", 900),
+    ("30m", 1800),
+    ("1h", 3600),
+    ("3h", 10800),
+    ("6h", 21600),
+    ("1d", 86400),
+    ("7d", 604800),
+    ("30d", 2592000),
+]
+
+DIMENSIONS = ("transaction_type", "status", "currency")
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _merge_sql(source: str, bucket_sql: str, dimensions: tuple[str, ...]) -> str:
+    """
+    CTEs merging rollup rows from `source` into buckets given by `bucket_sql`:
+    totals(bucket, dims, count, total_minor) and sketches(bucket, dims, bins, counts)
+    """
+    dims = ", ".join(dimensions)
+    return f"""
+    merged AS (
+        SELECT {bucket_sql} AS bucket, {dims}, count, total_minor, sketch_bins, sketch_counts
+        FROM {source}
+    ),
+    totals AS (
+        SELECT bucket, {dims}, SUM(count)::bigint AS count, SUM(total_minor)::bigint AS total_minor
+        FROM merged
+        GROUP BY bucket, {dims}
+    ),
+    bins AS (
+        SELECT bucket, {dims}, u.bin, SUM(u.n)::bigint AS n
+        FROM merged, unnest(sketch_bins, sketch_counts) AS u(bin, n)
+        GROUP BY bucket, {dims}, u.bin
+    ),
+    sketches AS (
+        SELECT bucket, {dims}, array_agg(bin ORDER BY bin) AS bins, array_agg(n ORDER BY bin) AS counts
+        FROM bins
+        GROUP BY bucket, {dims}
+    )
+    """
+
+
+def _transactions_sql(granularity: str, dirty: str) -> str:
+    """CTEs building rollups for the buckets in `dirty` straight from transactions"""
+    return f"""
+    source AS (
+        SELECT d.bucket, t.transaction_type::text AS transaction_type, t.status::text AS status,
+               t.currency, t.amount_minor
+        FROM {dirty} d
+        JOIN transactions t
+          ON t.created_at >= d.bucket
+         AND t.created_at < d.bucket + INTERVAL '1 {granularity}'
+    ),
+    totals AS (
+        SELECT bucket, transaction_type, status, currency,
+               COUNT(*) AS count, SUM(amount_minor)::bigint AS total_minor
+        FROM source
+        GROUP BY bucket, transaction_type, status, currency
+    ),
+    bins AS (
+        SELECT bucket, transaction_type, status, currency, {BIN_SQL} AS bin, COUNT(*) AS n
+        FROM source
+        GROUP BY bucket, transaction_type, status, currency, bin
+    ),
+    sketches AS (
+        SELECT bucket, transaction_type, status, currency,
+               array_agg(bin ORDER BY bin) AS bins, array_agg(n ORDER BY bin) AS counts
+        FROM bins
+        GROUP BY bucket, transaction_type, status, currency
+    )
+    """
+
+
+def _rollups_sql(granularity: str, source_granularity: str, dirty: str) -> str:
+    """CTEs building rollups for the buckets in `dirty` from a finer granularity"""
+    source = f"""(
+        SELECT d.bucket, r.transaction_type, r.status, r.currency,
+               r.count, r.total_minor, r.sketch_bins, r.sketch_counts
+        FROM {dirty} d
+        JOIN transaction_rollups r
+          ON r.granularity = '{source_granularity}'
+         AND r.bucket >= d.bucket
+         AND r.bucket < d.bucket + INTERVAL '1 {granularity}'
+    ) finer"""
+    return _merge_sql(source, "bucket", DIMENSIONS)
+
+
+async def _rebuild(db: AsyncSession, granularity: str, dirty: str, ctes: str):
+    """Replace the rollups of every bucket listed in the `dirty` temporary table"""
+    await db.execute(
+        f"""
+        DELETE FROM transaction_rollups r
+        USING {dirty} d
+        WHERE r.granularity = '{granularity}' AND r.bucket = d.bucket
+        """
+    )
+    await db.execute(
+        f"""
+        WITH {ctes}
+        INSERT INTO transaction_rollups
+            (granularity, bucket, transaction_type, status, currency,
+             count, total_minor, sketch_bins, sketch_counts, updated_at)
+        SELECT '{granularity}', t.bucket, t.transaction_type, t.status, t.currency,
+               t.count, t.total_minor, s.bins, s.counts, NOW()
+        FROM totals t
+        JOIN sketches s USING (bucket, transaction_type, status, currency)
+        """
+    )
+
+
+async def refresh_transaction_rollups(db: AsyncSession) -> int:
+    """
+    Bring transaction_rollups up to date with recent transaction changes
+    Safe to run from several workers: only the holder of the watermark row
+    lock does the work. Returns the number of minute buckets changed.
+    """
+    await db.execute(
+        """
+        INSERT INTO rollup_watermarks (name, watermark, updated_at)
+        VALUES (:name, 'epoch', NOW())
+        ON CONFLICT (name) DO NOTHING
+        """,
+        {"name": WATERMARK_NAME}
+    )
+    await db.commit()
+    
+    # The horizon is read before the scans below take their snapshots
+    result = await db.execute(
+        f"""
+        SELECT watermark, {COMMIT_HORIZON_SQL} AS horizon
+        FROM rollup_watermarks WHERE name = :name FOR UPDATE SKIP LOCKED
+        """,
+        {"name": WATERMARK_NAME}
+    )
+    state = result.fetchone()
+    if state is None:
+        # Another worker is refreshing
+        return 0
+    
+    lower = state.watermark
+    upper = state.horizon
+    if upper <= lower:
+        # A transaction older than the watermark is still open
+        await db.commit()
+        return 0
+    # Minute rollups before this are dropped; hours from then on have all their minutes
+    minute_cutoff = (upper - timedelta(days=settings.ANALYTICS_MINUTE_RETENTION_DAYS)).replace(
+        minute=0, second=0, microsecond=0
+    )
+    
+    await db.execute(
+        """
+        CREATE TEMPORARY TABLE dirty_minutes ON COMMIT DROP AS
+        SELECT DISTINCT date_trunc('minute', created_at, 'UTC') AS bucket
+        FROM transactions
+        WHERE updated_at >= :lower AND updated_at < :upper
+        """,
+        {"lower": lower, "upper": upper}
+    )
+    await db.execute(
+        """
+        CREATE TEMPORARY TABLE dirty_hours ON COMMIT DROP AS
+        SELECT DISTINCT date_trunc('hour', bucket, 'UTC') AS bucket, bucket >= :cutoff AS has_minutes
+        FROM dirty_minutes
+        """,
+        {"cutoff": minute_cutoff}
+    )
+    await db.execute(
+        """
+        CREATE TEMPORARY TABLE dirty_days ON COMMIT DROP AS
+        SELECT DISTINCT date_trunc('day', bucket, 'UTC') AS bucket FROM dirty_hours
+        """
+    )
+    await db.execute("DELETE FROM dirty_minutes WHERE bucket < :cutoff", {"cutoff": minute_cutoff})
+    await db.execute(
+        "CREATE TEMPORARY TABLE dirty_hours_old ON COMMIT DROP AS "
+        "SELECT bucket FROM dirty_hours WHERE NOT has_minutes"
+    )
+    await db.execute("DELETE FROM dirty_hours WHERE NOT has_minutes")
+    
+    await _rebuild(db, "minute", "dirty_minutes", _transactions_sql("minute", "dirty_minutes"))
+    await _rebuild(db, "hour", "dirty_hours", _rollups_sql("hour", "minute", "dirty_hours"))
+    await _rebuild(db, "hour", "dirty_hours_old", _transactions_sql("hour", "dirty_hours_old"))
+    await _rebuild(db, "day", "dirty_days", _rollups_sql("day", "hour", "dirty_days"))
+    
+    await db.execute(
+        "DELETE FROM transaction_rollups WHERE granularity = 'minute' AND bucket < :cutoff",
+        {"cutoff": minute_cutoff}
+    )
+    
+    result = await db.execute("SELECT COUNT(*) AS count FROM dirty_minutes")
+    rebuilt = result.fetchone().count
+    
+    await db.execute(
+        "UPDATE rollup_watermarks SET watermark = :upper, updated_at = NOW() WHERE name = :name",
+        {"upper": upper, "name": WATERMARK_NAME}
+    )
+    await db.commit()
+    
+    if rebuilt:
+        logger.info("Transaction rollups refreshed", minutes=rebuilt, watermark=upper.isoformat())
+    
+    return rebuilt
+
+
+def choose_resolution(granularity: str, start: datetime, end: datetime) -> tuple[str, int]:
+    """
+    Bucket width for a series: the requested granularity, widened so the
+    range fits in ANALYTICS_MAX_POINTS buckets (and to hours once minute
+    rollups for the range have been dropped). Returns (label, seconds).
+    """
+    seconds = GRANULARITY_SECONDS[granularity]
+    retention = timedelta(days=settings.ANALYTICS_MINUTE_RETENTION_DAYS) - timedelta(hours=1)
+    if seconds < 3600 and start < datetime.now(timezone.utc) - retention:
+        seconds = 3600
+    seconds = max(seconds, math.ceil((end - start).total_seconds() / settings.ANALYTICS_MAX_POINTS))
+    for label, width in RESOLUTIONS:
+        if width >= seconds:
+            return label, width
+    days = math.ceil(seconds / 86400)
+    return f"{days}d", days * 86400
+
+
+def align(moment: datetime, seconds: int) -> datetime:
+    """Start of the bucket containing `moment`"""
+    offset = (moment - EPOCH).total_seconds()
+    return EPOCH + timedelta(seconds=offset - offset % seconds)
+
+
+async def query_rollups(
+    db: AsyncSession,
+    start: datetime,
+    end: datetime,
+    bucket_seconds: int,
+    group_by: tuple[str, ...],
+    filters: dict[str, Optional[str]],
+) -> list:
+    """
+    Merged rollups in buckets of `bucket_seconds` from `start` (aligned) to
+    `end`, grouped by currency and the `group_by` dimensions, from the
+    coarsest stored granularity that divides the bucket width
+    """
+    granularity = next(
+        name for name, seconds in sorted(GRANULARITY_SECONDS.items(), key=lambda item: -item[1])
+        if bucket_seconds % seconds == 0
+    )
+    dimensions = tuple(d for d in DIMENSIONS if d in group_by or d == "currency")
+    conditions = ["granularity = :granularity", "bucket >= :start", "bucket < :end"]
+    params = {"granularity": granularity, "start": align(start, bucket_seconds), "end": end, "stride": bucket_seconds}
+    for dimension in DIMENSIONS:
+        if filters.get(dimension) is not None:
+            conditions.append(f"{dimension} = :{dimension}")
+            params[dimension] = filters[dimension]
+    
+    source = f"(SELECT * FROM transaction_rollups WHERE {' AND '.join(conditions)}) r"
+    bucket_sql = "date_bin(make_interval(secs => :stride), r.bucket, TIMESTAMPTZ 'epoch')"
+    dims = ", ".join(dimensions)
+    result = await db.execute(
+        f"""
+        WITH {_merge_sql(source, bucket_sql, dimensions)}
+        SELECT t.bucket, {", ".join(f"t.{d}" for d in dimensions)}, t.count, t.total_minor,
+               s.bins, s.counts
+        FROM totals t
+        JOIN sketches s USING (bucket, {dims})
+        ORDER BY t.bucket, {", ".join(f"t.{d}" for d in dimensions)}
+        """,
+        params
+    )
+    return result.fetchall()
+
+
+def sketch_percentile(bins: list[int], counts: list[int], percentile: float) -> int:
+    """Estimated amount (minor units) at `percentile` (0-100) of a merged sketch"""
+    total = sum(counts)
+    rank = percentile / 100 * (total - 1)
+    seen = 0
+    for bin_number, count in zip(bins, counts):
+        seen += count
+        if seen > rank:
+            if bin_number == 0:
+                return 0
+            # Value halfway (in relative error) between the bin's bounds
+            return round(2 * SKETCH_GAMMA ** (bin_number - 1) / (SKETCH_GAMMA + 1))
+    return 0
+
+
+if __name__ == "__main__":
+    import asyncio
+    from app.core.database import AsyncSessionLocal
+    
+    async def main():
+        async with AsyncSessionLocal() as session:
+            print(f"Rebuilt {await refresh_transaction_rollups(session)} minute buckets")
+    
+    asyncio.run(main())
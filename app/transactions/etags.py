@@ -0,0 +1,92 @@
+"""
+Transaction ETags
+Strong ETags for single-transaction reads, derived from the only fields of
+the representation that ever change (status and completed_at).
+
+COMPLETED, FAILED and CANCELLED transactions never change again, so their
+ETags are kept in a small in-process LRU cache: a conditional GET for one
+can be answered with 304 without querying the transaction or building the
+response model. Entries expire after TRANSACTION_ETAG_CACHE_TTL_SECONDS,
+which bounds how long a purged transaction can still be revalidated.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from app.core.config import settings
+from app.models.transaction import TransactionStatus
+
+TERMINAL_STATUSES = {
+    TransactionStatus.COMPLETED.value,
+    TransactionStatus.FAILED.value,
+    TransactionStatus.CANCELLED.value,
+}
+
+# Terminal records are immutable; private because they are per-user data
+TERMINAL_CACHE_CONTROL = "private, max-age=86400, immutable"
+PENDING_CACHE_CONTROL = "private, no-cache"
+
+
+def transaction_etag(transaction_id: int, status: str, completed_at: Optional[datetime]) -> str:
+    version = f"{transaction_id}:{status}:{completed_at.isoformat() if completed_at else ''}"
+    return '"' + hashlib.blake2b(version.encode(), digest_size=12).hexdigest() + '"'
+
+
+def cache_control(status: str) -> str:
+    return TERMINAL_CACHE_CONTROL if status in TERMINAL_STATUSES else PENDING_CACHE_CONTROL
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+@dataclass(frozen=True)
+class CachedTransaction:
+    """What a 304 needs: the ETag, plus owner and reference for access checks and audit"""
+    etag: str
+    user_id: int
+    reference: str
+    expires_at: float
+
+
+class TerminalTransactionCache:
+    """LRU cache of terminal transactions' ETags (per worker)"""
+    
+    def __init__(self, max_entries: int):
+        self._entries: OrderedDict[int, CachedTransaction] = OrderedDict()
+        self._max_entries = max_entries
+    
+    def get(self, transaction_id: int) -> Optional[CachedTransaction]:
+        entry = self._entries.get(transaction_id)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[transaction_id]
+            return None
+        self._entries.move_to_end(transaction_id)
+        return entry
+    
+    def put(self, transaction_id: int, etag: str, user_id: int, reference: str):
+        self._entries[transaction_id] = CachedTransaction(
+            etag=etag,
+            user_id=user_id,
+            reference=reference,
+            expires_at=time.monotonic() + settings.TRANSACTION_ETAG_CACHE_TTL_SECONDS,
+        )
+        self._entries.move_to_end(transaction_id)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+# Global terminal transaction cache instance
+terminal_transactions = TerminalTransactionCache(settings.TRANSACTION_ETAG_CACHE_SIZE)
@@ -0,0 +1,272 @@
+"""
+Transaction Status Events
+Pushes status transitions (PENDING -> COMPLETED/FAILED/CANCELLED) to
+clients over Server-Sent Events instead of having them poll.
+
+The transactions_notify_status trigger issues a NOTIFY in the transaction
+that changes the status, so an event is only published once the change
+commits, whichever process made it (API worker or settlement worker). Each
+API worker holds one LISTEN connection and fans events out in process to
+the streams of the user they belong to.
+
+Event ids are "<resume point in microseconds>-<transaction id>". The resume
+point is the transition's updated_at, capped at the commit horizon when it
+was made (see COMMIT_HORIZON_SQL): updated_at is the writer's transaction
+start, so transitions of a long-running writer committing after an event
+can carry earlier timestamps, but never earlier than that horizon. A client that reconnects
+with Last-Event-ID is replayed every transition stamped at or after its
+resume point from the transactions table, so resuming works on any worker.
+Events carry the full status, so one delivered twice is harmless.
+"""
+import asyncio
+import json
+import weakref
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import asyncpg
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import COMMIT_HORIZON_SQL
+from app.models.transaction import TransactionStatus
+import structlog
+
+logger = structlog.get_logger()
+
+# NOTIFY channel used by the transactions_notify_status trigger
+CHANNEL = "transaction_events"
+
+STATUS_EVENT = "transaction.status"
+RESYNC_EVENT = "resync"  # Missed events can't be replayed; client should re-fetch
+
+
+class Subscription:
+    """One SSE stream's buffer of events"""
+    __slots__ = ("user_id", "queue", "closed")
+    
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.TRANSACTION_EVENTS_QUEUE_SIZE)
+        self.closed = False
+    
+    def close(self):
+        """End the stream; the client reconnects and resumes from its last event id"""
+        self.closed = True
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+
+class TransactionEventBroker:
+    """
+    In-process pub/sub for transaction status events, fed by LISTEN
+    A stream whose buffer fills up (slow client) is closed rather than
+    allowed to grow; so are all streams if the LISTEN connection drops,
+    since events sent while it was down were never received.
+    """
+    
+    def __init__(self):
+        self._subscribers: dict[int, set[Subscription]] = defaultdict(set)
+        self._task: asyncio.Task | None = None
+    
+    async def start(self):
+        """Start listening (called from app lifespan)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._close_all()
+    
+    def subscribe(self, user_id: int) -> Optional[Subscription]:
+        """Register a stream; None if the user already has the maximum open on this worker"""
+        streams = self._subscribers[user_id]
+        # Closed streams no longer count, even if their response never ran to unsubscribe
+        streams.difference_update([subscription for subscription in streams if subscription.closed])
+        if len(streams) >= settings.TRANSACTION_EVENTS_MAX_STREAMS_PER_USER:
+            return None
+        subscription = Subscription(user_id)
+        streams.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        streams = self._subscribers.get(subscription.user_id)
+        if streams is not None:
+            streams.discard(subscription)
+            if not streams:
+                del self._subscribers[subscription.user_id]
+    
+    def publish(self, event: dict):
+        """Deliver an event to the streams of its user"""
+        for subscription in self._subscribers.get(event["user_id"], ()):
+            if subscription.closed:
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning("Transaction event stream too slow, closing", user_id=event["user_id"])
+                subscription.closed = True
+    
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            self.publish(json.loads(payload))
+        except (ValueError, KeyError) as e:
+            logger.error("Malformed transaction event", error=str(e))
+    
+    def _close_all(self):
+        for streams in self._subscribers.values():
+            for subscription in streams:
+                subscription.close()
+        self._subscribers.clear()
+    
+    async def _run(self):
+        """Hold the LISTEN connection, reconnecting after failures"""
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(settings.DATABASE_URL.replace("+asyncpg", ""))
+                await connection.add_listener(CHANNEL, self._on_notify)
+                logger.info("Listening for transaction events")
+                while True:
+                    await asyncio.sleep(settings.TRANSACTION_EVENTS_HEARTBEAT_SECONDS)
+                    await connection.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Transaction event listener disconnected", error=str(e))
+                self._close_all()
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(settings.TRANSACTION_EVENTS_RECONNECT_SECONDS)
+
+
+def event_id(resume_us: int, transaction_id: int) -> str:
+    return f"{resume_us}-{transaction_id}"
+
+
+def parse_event_id(value: str) -> Optional[int]:
+    """Resume point (microseconds) of an event id, or None if it isn't one of ours"""
+    resume_us, _, transaction_id = value.partition("-")
+    if not (resume_us.isdigit() and transaction_id.isdigit()):
+        return None
+    return int(resume_us)
+
+
+def format_event(event: dict) -> str:
+    """SSE frame for a status event (trigger payload or replayed row)"""
+    data = {
+        "id": event["id"],
+        "reference": event["reference"],
+        "status": event["status"],
+        "completed_at": event["completed_at"],
+    }
+    return (
+        f"id: {event_id(event['resume_us'], event['id'])}\n"
+        f"event: {STATUS_EVENT}\n"
+        f"data: {json.dumps(data, separators=(',', ':'))}\n\n"
+    )
+
+
+def format_resync() -> str:
+    return f"event: {RESYNC_EVENT}\ndata: {{}}\n\n"
+
+
+async def replay_events(db: AsyncSession, user_id: int, last_event_id: str) -> Optional[list[dict]]:
+    """
+    Status transitions since `last_event_id`, oldest first
+    Returns None when they can't all be replayed (id too old or unknown,
+    or too many), in which case the client should re-fetch its transactions.
+    """
+    since_us = parse_event_id(last_event_id)
+    if since_us is None:
+        return None
+    since = datetime.fromtimestamp(since_us / 1_000_000, tz=timezone.utc)
+    if since < datetime.now(timezone.utc) - timedelta(seconds=settings.TRANSACTION_EVENTS_REPLAY_WINDOW_SECONDS):
+        return None
+    
+    # Read before the replay query takes its snapshot: every transition
+    # stamped before the horizon is then visible to it
+    result = await db.execute(f"SELECT {COMMIT_HORIZON_SQL} AS horizon")
+    horizon = result.fetchone().horizon
+    
+    result = await db.execute(
+        """
+        SELECT id, reference, status, completed_at,
+               (EXTRACT(EPOCH FROM LEAST(updated_at, :horizon)) * 1000000)::bigint AS resume_us
+        FROM transactions
+        WHERE user_id = :user_id
+        AND updated_at >= :since
+        AND status <> :pending
+        ORDER BY updated_at, id
+        LIMIT :limit
+        """,
+        {
+            "user_id": user_id,
+            "since": since,
+            "horizon": horizon,
+            "pending": TransactionStatus.PENDING.value,
+            "limit": settings.TRANSACTION_EVENTS_REPLAY_MAX_EVENTS + 1,
+        }
+    )
+    rows = result.fetchall()
+    if len(rows) > settings.TRANSACTION_EVENTS_REPLAY_MAX_EVENTS:
+        return None
+    return [
+        {
+            "id": row.id,
+            "reference": row.reference,
+            "status": row.status,
+            "completed_at": row.completed_at.isoformat() if row.completed_at else None,
+            "resume_us": row.resume_us,
+        }
+        for row in rows
+    ]
+
+
+def stream_events(subscription: Subscription, replayed: list[dict], resync: bool):
+    """
+    SSE body: replayed events, then live ones, with a comment line as
+    heartbeat so proxies keep the connection open
+    The subscription is dropped when the stream ends, or when the body is
+    discarded without ever being iterated (response cancelled first).
+    """
+    body = _stream_events(subscription, replayed, resync)
+    weakref.finalize(body, event_broker.unsubscribe, subscription)
+    return body
+
+
+async def _stream_events(subscription: Subscription, replayed: list[dict], resync: bool):
+    try:
+        yield f"retry: {int(settings.TRANSACTION_EVENTS_RECONNECT_SECONDS * 1000)}\n\n"
+        if resync:
+            yield format_resync()
+        for event in replayed:
+            yield format_event(event)
+        
+        while not subscription.closed:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(),
+                    timeout=settings.TRANSACTION_EVENTS_HEARTBEAT_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if event is None:
+                break
+            yield format_event(event)
+    finally:
+        event_broker.unsubscribe(subscription)
+
+
+# Global event broker instance
+event_broker = TransactionEventBroker()
@@ -0,0 +1,188 @@
+"""
+Bulk Transaction Ingestion
+Streams NDJSON/CSV request bodies, validates rows incrementally and loads
+them with COPY in bounded chunks (memory stays flat for large files)
+"""
+import csv
+import json
+import uuid
+from typing import AsyncIterator, Callable, Optional
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.transaction import TransactionStatus
+import structlog
+
+logger = structlog.get_logger()
+
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+CSV_CONTENT_TYPES = {"text/csv"}
+
+# Columns written by COPY (id and created_at come from server defaults)
+COPY_COLUMNS = [
+    "user_id",
+    "transaction_type",
+    "status",
+    "amount_minor",
+    "currency",
+    "reference",
+    "description",
+    "recipient_account",
+]
+
+
+class BulkRowError(BaseModel):
+    """Validation error for a single input row"""
+    line: int
+    error: str
+
+
+class BulkIngestResult(BaseModel):
+    """Outcome of a bulk ingestion batch"""
+    batch_id: str
+    accepted: int
+    rejected: int
+    errors: list[BulkRowError]
+    errors_truncated: bool = False
+
+
+def _check_line_length(line: bytes):
+    if len(line) > settings.BULK_INGEST_MAX_LINE_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Line exceeds maximum length",
+        )
+
+
+async def iter_lines(request: Request) -> AsyncIterator[bytes]:
+    """Yield raw lines from the request body as it arrives (decoded per row by the caller)"""
+    buffer = b""
+    async for chunk in request.stream():
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            _check_line_length(line)
+            yield line.rstrip(b"\r")
+        _check_line_length(buffer)
+    if buffer:
+        yield buffer.rstrip(b"\r")
+
+
+def _ndjson_parser() -> Callable[[str], Optional[dict]]:
+    def parse(line: str) -> Optional[dict]:
+        return json.loads(line)
+    return parse
+
+
+def _csv_parser() -> Callable[[str], Optional[dict]]:
+    """CSV with a header row; one record per line, empty cells are NULL"""
+    header: list[str] = []
+    
+    def parse(line: str) -> Optional[dict]:
+        values = next(csv.reader([line]))
+        if not header:
+            header.extend(name.strip() for name in values)
+            return None
+        if len(values) != len(header):
+            raise ValueError(f"Expected {len(header)} columns, got {len(values)}")
+        return {name: (value if value != "" else None) for name, value in zip(header, values)}
+    return parse
+
+
+async def ingest_transactions(
+    request: Request,
+    db: AsyncSession,
+    user_id: int,
+    row_model: type[BaseModel],
+    generate_reference: Callable[[], str],
+) -> BulkIngestResult:
+    """
+    Validate and COPY transactions from a streamed NDJSON or CSV body
+    Invalid rows are reported and skipped; valid rows are loaded in one
+    transaction, committed by the caller
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        parse = _ndjson_parser()
+    elif content_type in CSV_CONTENT_TYPES:
+        parse = _csv_parser()
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Use application/x-ndjson or text/csv",
+        )
+    
+    # COPY goes through the session's own asyncpg connection (same transaction)
+    connection = await db.connection()
+    raw_connection = (await connection.get_raw_connection()).driver_connection
+    
+    result = BulkIngestResult(batch_id=uuid.uuid4().hex, accepted=0, rejected=0, errors=[])
+    chunk: list[tuple] = []
+    line_number = 0
+    
+    async def flush():
+        references = [generate_reference() for _ in chunk]
+        await raw_connection.copy_records_to_table(
+            "transactions",
+            records=[(user_id, *row[:4], reference, *row[4:]) for row, reference in zip(chunk, references)],
+            columns=COPY_COLUMNS,
+        )
+        result.accepted += len(chunk)
+        chunk.clear()
+    
+    async for line in iter_lines(request):
+        line_number += 1
+        if not line.strip():
+            continue
+        
+        try:
+            # UnicodeDecodeError is a ValueError: reported like any other bad row
+            data = parse(line.decode("utf-8"))
+            if data is None:  # CSV header
+                continue
+            row = row_model.model_validate(data)
+        except (ValueError, ValidationError) as e:
+            result.rejected += 1
+            if len(result.errors) < settings.BULK_INGEST_MAX_ERRORS:
+                result.errors.append(BulkRowError(line=line_number, error=_format_error(e)))
+            else:
+                result.errors_truncated = True
+            continue
+        
+        if result.accepted + len(chunk) >= settings.BULK_INGEST_MAX_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Batch exceeds {settings.BULK_INGEST_MAX_ROWS} rows",
+            )
+        
+        chunk.append((
+            row.transaction_type.value,
+            TransactionStatus.PENDING.value,
+            row.amount_minor,
+            row.currency,
+            row.description,
+            row.recipient_account,
+        ))
+        if len(chunk) >= settings.BULK_INGEST_CHUNK_SIZE:
+            await flush()
+    
+    if chunk:
+        await flush()
+    
+    logger.info(
+        "Bulk transactions ingested",
+        batch_id=result.batch_id,
+        accepted=result.accepted,
+        rejected=result.rejected,
+    )
+    return result
+
+
+def _format_error(error: Exception) -> str:
+    """Short, single-line description of a row error"""
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}"
+            for e in error.errors()
+        )
+    return str(error)
@@ -0,0 +1,269 @@
+"""
+Balance Ledger
+Keeps user balances and counterparty account sub-ledgers in step with
+completed transactions, and reconciles user balances against the
+transaction history
+"""
+import asyncio
+from decimal import Decimal
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.currency import format_minor_units, from_minor_units
+from app.core.database import AsyncSessionLocal
+from app.models.transaction import TransactionType, TransactionStatus
+import structlog
+
+logger = structlog.get_logger()
+
+# Transaction types that add to the user's balance; all others subtract
+CREDIT_TYPES = (TransactionType.DEPOSIT, TransactionType.REFUND)
+
+SIGNED_AMOUNT_SQL = (
+    "CASE WHEN transaction_type IN ("
+    + ", ".join(f"'{t.value}'" for t in CREDIT_TYPES)
+    + ") THEN amount_minor ELSE -amount_minor END"
+)
+
+
+async def complete_transactions(db: AsyncSession, transaction_ids: list[int]) -> int:
+    """
+    Mark PENDING transactions COMPLETED and apply them to balances
+    Status change and user balance update happen in one statement, and the
+    counterparty account postings in the same transaction, so they commit
+    (or roll back) together. Returns the number completed.
+    """
+    if not transaction_ids:
+        return 0
+    
+    result = await db.execute(
+        f"""
+        WITH completed AS (
+            UPDATE transactions
+            SET status = :completed, completed_at = NOW(), updated_at = NOW()
+            WHERE id = ANY(:transaction_ids) AND status = :pending
+            RETURNING id, user_id, currency, {SIGNED_AMOUNT_SQL} AS delta,
+                      sender_account IS NOT NULL OR recipient_account IS NOT NULL AS has_accounts
+        ),
+        applied AS (
+            INSERT INTO balances (user_id, currency, amount_minor, updated_at)
+            SELECT user_id, currency, SUM(delta), NOW()
+            FROM completed
+            GROUP BY user_id, currency
+            ORDER BY user_id, currency  -- consistent lock order across workers
+            ON CONFLICT (user_id, currency)
+            DO UPDATE SET amount_minor = balances.amount_minor + EXCLUDED.amount_minor, updated_at = NOW()
+        )
+        SELECT COUNT(*) AS count, array_agg(id) FILTER (WHERE has_accounts) AS account_ids
+        FROM completed
+        """,
+        {
+            "transaction_ids": transaction_ids,
+            "completed": TransactionStatus.COMPLETED.value,
+            "pending": TransactionStatus.PENDING.value,
+        }
+    )
+    completed = result.fetchone()
+    
+    if completed.account_ids:
+        await post_account_legs(db, completed.account_ids)
+    
+    return completed.count
+
+
+async def post_account_legs(db: AsyncSession, transaction_ids: list[int]):
+    """
+    Credit recipient_account and debit sender_account for completed transactions
+    Legs are netted per (account, currency) and each lands on one shard of
+    the account's sub-ledger, picked at random, so concurrent postings to a
+    hot account rarely wait on the same row. Both legs of a transfer go
+    through one upsert ordered by (account, currency, shard): every worker
+    takes row locks in the same order, so two-party transfers in opposite
+    directions cannot deadlock.
+    """
+    await db.execute(
+        """
+        INSERT INTO account_balances (account, currency, shard, amount_minor, updated_at)
+        SELECT legs.account, legs.currency,
+               floor(random() * COALESCE(h.shards, 1))::smallint AS shard,
+               legs.amount_minor, NOW()
+        FROM (
+            SELECT account, currency, SUM(amount_minor) AS amount_minor
+            FROM (
+                SELECT recipient_account AS account, currency, amount_minor
+                FROM transactions
+                WHERE id = ANY(:transaction_ids) AND recipient_account IS NOT NULL
+                UNION ALL
+                SELECT sender_account AS account, currency, -amount_minor
+                FROM transactions
+                WHERE id = ANY(:transaction_ids) AND sender_account IS NOT NULL
+            ) AS leg
+            GROUP BY account, currency
+        ) AS legs
+        LEFT JOIN hot_accounts h ON h.account = legs.account
+        ORDER BY legs.account, legs.currency, shard
+        ON CONFLICT (account, currency, shard)
+        DO UPDATE SET amount_minor = account_balances.amount_minor + EXCLUDED.amount_minor, updated_at = NOW()
+        """,
+        {"transaction_ids": transaction_ids}
+    )
+
+
+async def account_balance(db: AsyncSession, account: str) -> dict[str, Decimal]:
+    """Balance of a counterparty account per currency (sum of its shards)"""
+    result = await db.execute(
+        """
+        SELECT currency, SUM(amount_minor) AS amount_minor
+        FROM account_balances
+        WHERE account = :account
+        GROUP BY currency
+        ORDER BY currency
+        """,
+        {"account": account}
+    )
+    return {row.currency: from_minor_units(int(row.amount_minor), row.currency) for row in result.fetchall()}
+
+
+async def set_hot_account(db: AsyncSession, account: str, shards: int):
+    """
+    Spread an account's postings over `shards` sub-ledger rows
+    Lowering the count is safe: existing shard rows keep counting towards
+    the balance, they just stop receiving new postings.
+    """
+    await db.execute(
+        """
+        INSERT INTO hot_accounts (account, shards, created_at)
+        VALUES (:account, :shards, NOW())
+        ON CONFLICT (account) DO UPDATE SET shards = EXCLUDED.shards
+        """,
+        {"account": account, "shards": shards}
+    )
+
+
+async def reconcile_balances(fix: bool = False) -> dict:
+    """
+    Recompute balances from completed transactions and report drift
+    Users are processed in id-range chunks on parallel sessions. With
+    fix=True drifted balances are overwritten with the recomputed value
+    (the chunk's balance rows are locked while it is recomputed).
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.execute("SELECT MIN(id) AS low, MAX(id) AS high FROM users")
+        bounds = result.fetchone()
+    
+    if bounds is None or bounds.low is None:
+        return {"chunks": 0, "drifted": 0, "drift": []}
+    
+    chunk_size = settings.LEDGER_RECONCILE_CHUNK_SIZE
+    chunks = [
+        (low, min(low + chunk_size - 1, bounds.high))
+        for low in range(bounds.low, bounds.high + 1, chunk_size)
+    ]
+    semaphore = asyncio.Semaphore(settings.LEDGER_RECONCILE_CONCURRENCY)
+    
+    async def run_chunk(low: int, high: int) -> list[dict]:
+        async with semaphore:
+            async with AsyncSessionLocal() as session:
+                drift = await _reconcile_chunk(session, low, high, fix)
+                await session.commit()
+                return drift
+    
+    results = await asyncio.gather(*(run_chunk(low, high) for low, high in chunks))
+    drift = [item for chunk in results for item in chunk]
+    
+    if drift:
+        logger.warning("Balance drift detected", drifted=len(drift), fixed=fix)
+    else:
+        logger.info("Balances reconciled", chunks=len(chunks))
+    
+    return {"chunks": len(chunks), "drifted": len(drift), "drift": drift}
+
+
+async def _reconcile_chunk(db: AsyncSession, low: int, high: int, fix: bool) -> list[dict]:
+    """Compare stored and recomputed balances for users low..high"""
+    params = {"low": low, "high": high, "completed": TransactionStatus.COMPLETED.value}
+    
+    if fix:
+        await db.execute(
+            """
+            SELECT 1 FROM balances WHERE user_id BETWEEN :low AND :high
+            ORDER BY user_id, currency FOR UPDATE
+            """,
+            params
+        )
+    
+    result = await db.execute(
+        f"""
+        WITH expected AS (
+            SELECT user_id, currency, SUM({SIGNED_AMOUNT_SQL}) AS amount_minor
+            FROM transactions
+            WHERE user_id BETWEEN :low AND :high AND status = :completed
+            GROUP BY user_id, currency
+        ),
+        stored AS (
+            SELECT user_id, currency, amount_minor FROM balances
+            WHERE user_id BETWEEN :low AND :high
+        )
+        SELECT user_id, currency,
+               COALESCE(expected.amount_minor, 0) AS expected,
+               COALESCE(stored.amount_minor, 0) AS stored
+        FROM expected FULL OUTER JOIN stored USING (user_id, currency)
+        WHERE COALESCE(expected.amount_minor, 0) <> COALESCE(stored.amount_minor, 0)
+        """,
+        params
+    )
+    drift = [
+        {
+            "user_id": row.user_id,
+            "currency": row.currency,
+            "expected": format_minor_units(int(row.expected), row.currency),
+            "stored": format_minor_units(int(row.stored), row.currency),
+            "difference": format_minor_units(int(row.stored) - int(row.expected), row.currency),
+            "expected_minor": int(row.expected),
+        }
+        for row in result.fetchall()
+    ]
+    
+    if fix:
+        for item in drift:
+            await db.execute(
+                """
+                INSERT INTO balances (user_id, currency, amount_minor, updated_at)
+                VALUES (:user_id, :currency, :amount_minor, NOW())
+                ON CONFLICT (user_id, currency)
+                DO UPDATE SET amount_minor = EXCLUDED.amount_minor, updated_at = NOW()
+                """,
+                {"user_id": item["user_id"], "currency": item["currency"], "amount_minor": item["expected_minor"]}
+            )
+    
+    return drift
+
+
+async def configure_hot_account(account: str, shards: int) -> dict:
+    """Set an account's shard count on its own session (CLI entry point)"""
+    async with AsyncSessionLocal() as session:
+        await set_hot_account(session, account, shards)
+        await session.commit()
+    logger.info("Hot account configured", account=account, shards=shards)
+    return {"account": account, "shards": shards}
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    
+    parser = argparse.ArgumentParser(
+        description="Reconcile balances against completed transactions, or configure a hot account"
+    )
+    parser.add_argument("--fix", action="store_true", help="Overwrite drifted balances")
+    parser.add_argument("--hot-account", metavar="ACCOUNT", help="Spread this account's postings over --shards rows")
+    parser.add_argument("--shards", type=int, metavar="N", help="Sub-ledger shards for --hot-account (1 turns sharding off)")
+    args = parser.parse_args()
+    
+    if args.hot_account is not None:
+        if args.shards is None or not 1 <= args.shards <= 32767:
+            parser.error("--hot-account requires --shards between 1 and 32767")
+        print(json.dumps(asyncio.run(configure_hot_account(args.hot_account, args.shards)), indent=2))
+    else:
+        if args.shards is not None:
+            parser.error("--shards requires --hot-account")
+        print(json.dumps(asyncio.run(reconcile_balances(fix=args.fix)), indent=2))
@@ -0,0 +1,158 @@
+"""
+Transaction Partition Management
+transactions is range-partitioned by month on created_at. Partitions are
+created ahead of time, and partitions past the retention period can be
+detached (without blocking writes) so they can be archived and dropped.
+"""
+import asyncio
+from datetime import date, datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+import structlog
+
+logger = structlog.get_logger()
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"transactions_y{month.year}m{month.month:02d}"
+
+
+async def ensure_partitions(db: AsyncSession, months_ahead: int | None = None) -> list[str]:
+    """
+    Create monthly partitions from the current month through `months_ahead`
+    months ahead (PARTITION_MONTHS_AHEAD by default). Returns created names.
+    """
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = month_start(datetime.utcnow().date())
+    created = []
+    
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        result = await db.execute("SELECT to_regclass(:name) IS NOT NULL AS exists", {"name": name})
+        if result.fetchone().exists:
+            continue
+        await db.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {name} PARTITION OF transactions
+            FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')
+            """
+        )
+        created.append(name)
+    
+    await db.commit()
+    if created:
+        logger.info("Transaction partitions created", partitions=created)
+    return created
+
+
+async def list_partitions(db: AsyncSession) -> list[tuple[str, date]]:
+    """Attached monthly partitions as (name, month), oldest first"""
+    result = await db.execute(
+        """
+        SELECT c.relname AS name
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'transactions'
+        ORDER BY c.relname
+        """
+    )
+    partitions = []
+    for row in result.fetchall():
+        # transactions_yYYYYmMM
+        try:
+            year, month = row.name[len("transactions_y"):].split("m")
+            partitions.append((row.name, date(int(year), int(month), 1)))
+        except ValueError:
+            logger.warning("Unrecognised transaction partition", partition=row.name)
+    return partitions
+
+
+async def detach_expired_partitions(retention_days: int | None = None) -> list[str]:
+    """
+    Detach partitions whose whole month is older than the retention period
+    Uses DETACH PARTITION ... CONCURRENTLY (no write lock), which cannot run
+    inside a transaction block. Detached tables are left in place for
+    archiving (pg_dump) and dropping. Returns detached names.
+    """
+    retention_days = settings.DATA_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = datetime.utcnow().date() - timedelta(days=retention_days)
+    
+    async with AsyncSessionLocal() as session:
+        expired = [
+            name for name, month in await list_partitions(session)
+            if add_months(month, 1) <= cutoff
+        ]
+    
+    detached = []
+    async with engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        for name in expired:
+            await connection.execute(f"ALTER TABLE transactions DETACH PARTITION {name} CONCURRENTLY")
+            detached.append(name)
+            logger.info("Transaction partition detached", partition=name)
+    return detached
+
+
+class PartitionMaintainer:
+    """
+    Background task that keeps future partitions in place
+    Runs at startup and then every PARTITION_MAINTENANCE_INTERVAL_SECONDS
+    """
+    
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+    
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+    
+    async def _run(self):
+        while True:
+            try:
+                async with AsyncSessionLocal() as session:
+                    await ensure_partitions(session)
+            except Exception as e:
+                logger.error("Partition maintenance failed", error=str(e))
+            await asyncio.sleep(settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS)
+
+
+# Global partition maintainer instance
+partition_maintainer = PartitionMaintainer()
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Maintain transaction partitions")
+    parser.add_argument("--detach-expired", action="store_true", help="Detach partitions past retention")
+    args = parser.parse_args()
+    
+    async def main():
+        async with AsyncSessionLocal() as session:
+            print("Created:", await ensure_partitions(session))
+        if args.detach_expired:
+            print("Detached:", await detach_expired_partitions())
+    
+    asyncio.run(main())
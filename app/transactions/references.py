@@ -0,0 +1,78 @@
+"""
+Transaction References
+Time-ordered references (ULID layout): TXN- followed by 26 Crockford base32
+characters encoding a 48-bit millisecond timestamp and 80 random bits.
+
+References sort by creation time, so inserts into the reference B-trees
+(transaction_keys primary key, ix_transactions_reference) append to the
+rightmost pages instead of splitting random ones. Within one millisecond the
+random part is incremented, keeping references from one worker monotonic.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+PREFIX = "TXN-"
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # Crockford base32
+TIMESTAMP_CHARS = 10
+RANDOM_CHARS = 16
+RANDOM_BITS = 80
+
+_DECODE = {char: value for value, char in enumerate(ALPHABET)}
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(ALPHABET[index])
+    return "".join(reversed(chars))
+
+
+class ReferenceGenerator:
+    """Monotonic ULID-style reference generator (thread-safe)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+    
+    def generate(self) -> str:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms <= self._last_ms:
+                # Same millisecond (or clock stepped back): keep ordering
+                now_ms = self._last_ms
+                self._last_random += 1
+                if self._last_random >> RANDOM_BITS:
+                    now_ms += 1
+                    self._last_random = int.from_bytes(os.urandom(10), "big")
+            else:
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            self._last_ms = now_ms
+            random_part = self._last_random
+        
+        return PREFIX + _encode(now_ms, TIMESTAMP_CHARS) + _encode(random_part, RANDOM_CHARS)
+
+
+def reference_timestamp(reference: str) -> Optional[datetime]:
+    """
+    Creation time embedded in a reference, or None for legacy (random)
+    references. Useful as a created_at range hint for partition pruning.
+    """
+    body = reference[len(PREFIX):] if reference.startswith(PREFIX) else ""
+    if len(body) != TIMESTAMP_CHARS + RANDOM_CHARS:
+        return None
+    try:
+        millis = 0
+        for char in body[:TIMESTAMP_CHARS]:
+            millis = millis * 32 + _DECODE[char]
+    except KeyError:
+        return None
+    return datetime.fromtimestamp(millis / 1000, tz=timezone.utc)
+
+
+# Global reference generator instance
+reference_generator = ReferenceGenerator()
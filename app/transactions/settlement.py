@@ -0,0 +1,249 @@
+"""
+Transaction Settlement
+Moves PENDING transactions to COMPLETED or FAILED.
+
+Workers claim batches with FOR UPDATE SKIP LOCKED, so any number of
+workers (in any number of processes) can run side by side. A claim marks
+the batch submitted (one more attempt, and next_settlement_at pushed out by
+SETTLEMENT_SUBMIT_LEASE_SECONDS) and commits before the processor is called,
+so no locks or transaction are held across the call. Outcomes are written
+back in bulk in a second transaction, guarded on the status still being
+PENDING. A batch whose worker died after claiming is submitted again once
+its lease runs out, so processors must treat each transaction's reference
+as an idempotency key and settle it at most once. Transient failures are
+retried with exponential backoff until SETTLEMENT_MAX_ATTEMPTS, then marked
+FAILED.
+"""
+import asyncio
+import importlib
+import time
+from typing import Optional
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.transaction import TransactionStatus
+from app.transactions.ledger import complete_transactions
+import structlog
+
+logger = structlog.get_logger()
+
+# Processor outcomes
+COMPLETED = "completed"
+FAILED = "failed"
+RETRY = "retry"
+
+SETTLED_TRANSACTIONS = Counter(
+    "settlement_transactions_total",
+    "Transactions processed by settlement workers",
+    ["outcome"],
+)
+SETTLEMENT_BATCH_SECONDS = Histogram(
+    "settlement_batch_seconds",
+    "Time to claim, process and write back one settlement batch",
+)
+SETTLEMENT_LAG_SECONDS = Gauge(
+    "settlement_lag_seconds",
+    "Age of the oldest transaction in the most recently claimed batch",
+)
+
+# Literal status in the predicate so the partial ix_transactions_pending index applies.
+# updated_at is left alone: submission is not a visible change.
+CLAIM_SQL = f"""
+WITH due AS (
+    SELECT id, created_at
+    FROM transactions
+    WHERE status = '{TransactionStatus.PENDING.value}'
+    AND (next_settlement_at IS NULL OR next_settlement_at <= NOW())
+    ORDER BY created_at, id
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+)
+UPDATE transactions t
+SET settlement_attempts = t.settlement_attempts + 1,
+    next_settlement_at = NOW() + make_interval(secs => :lease)
+FROM due
+WHERE t.id = due.id AND t.created_at = due.created_at
+RETURNING t.id, t.user_id, t.transaction_type, t.amount_minor, t.currency, t.reference,
+          t.recipient_account, t.settlement_attempts,
+          EXTRACT(EPOCH FROM NOW() - t.created_at) AS age_seconds
+"""
+
+
+class LocalSettlementProcessor:
+    """
+    In-process stand-in for the payment rails (development and testing)
+    Settles every transaction successfully
+    """
+    
+    async def settle(self, transactions: list) -> dict[int, str]:
+        """
+        Return an outcome (COMPLETED, FAILED or RETRY) per transaction id
+        A transaction can be submitted again (settlement_attempts > 1) after
+        a worker crash; its reference is the idempotency key for the rails.
+        """
+        return {transaction.id: COMPLETED for transaction in transactions}
+
+
+def load_processor(path: Optional[str] = None):
+    """
+    Build the configured processor: "local", or "package.module:ClassName"
+    for any class with an async settle(transactions) -> {id: outcome} that
+    passes each transaction's reference to the rails as its idempotency key
+    """
+    path = path or settings.SETTLEMENT_PROCESSOR
+    if path == "local":
+        return LocalSettlementProcessor()
+    module_name, _, class_name = path.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+async def settle_batch(db: AsyncSession, processor, batch_size: Optional[int] = None) -> int:
+    """
+    Claim and settle one batch of due PENDING transactions
+    Returns the number of transactions claimed (0 when the queue is empty).
+    """
+    started = time.perf_counter()
+    result = await db.execute(
+        CLAIM_SQL,
+        {
+            "limit": batch_size or settings.SETTLEMENT_BATCH_SIZE,
+            "lease": settings.SETTLEMENT_SUBMIT_LEASE_SECONDS,
+        }
+    )
+    transactions = result.fetchall()
+    # Submitted before calling out: a crash from here on resubmits the same references
+    await db.commit()
+    if not transactions:
+        return 0
+    
+    SETTLEMENT_LAG_SECONDS.set(max(float(t.age_seconds) for t in transactions))
+    
+    try:
+        outcomes = await processor.settle(transactions)
+    except Exception as e:
+        logger.warning("Settlement processor failed, batch will be retried", error=str(e))
+        outcomes = {}
+    
+    completed = [t.id for t in transactions if outcomes.get(t.id) == COMPLETED]
+    failed = [t.id for t in transactions if outcomes.get(t.id) == FAILED]
+    retry = [t.id for t in transactions if outcomes.get(t.id) not in (COMPLETED, FAILED)]
+    
+    await complete_transactions(db, completed)
+    
+    if failed:
+        await db.execute(
+            """
+            UPDATE transactions
+            SET status = :failed, completed_at = NOW(), updated_at = NOW()
+            WHERE id = ANY(:ids) AND status = :pending
+            """,
+            {
+                "ids": failed,
+                "failed": TransactionStatus.FAILED.value,
+                "pending": TransactionStatus.PENDING.value,
+            }
+        )
+    
+    if retry:
+        # Exponential backoff with jitter; give up after SETTLEMENT_MAX_ATTEMPTS
+        # (the claim already counted this attempt)
+        result = await db.execute(
+            """
+            UPDATE transactions
+            SET next_settlement_at = NOW() + make_interval(secs =>
+                    LEAST(:max_delay, :base_delay * power(2, settlement_attempts - 1)) * (0.5 + random() / 2)
+                ),
+                status = CASE WHEN settlement_attempts >= :max_attempts THEN :failed ELSE status END,
+                completed_at = CASE WHEN settlement_attempts >= :max_attempts THEN NOW() ELSE completed_at END,
+                updated_at = NOW()
+            WHERE id = ANY(:ids) AND status = :pending
+            RETURNING status
+            """,
+            {
+                "ids": retry,
+                "max_delay": settings.SETTLEMENT_RETRY_MAX_SECONDS,
+                "base_delay": settings.SETTLEMENT_RETRY_BASE_SECONDS,
+                "max_attempts": settings.SETTLEMENT_MAX_ATTEMPTS,
+                "failed": TransactionStatus.FAILED.value,
+                "pending": TransactionStatus.PENDING.value,
+            }
+        )
+        exhausted = sum(1 for row in result.fetchall() if row.status == TransactionStatus.FAILED.value)
+        failed_count = len(failed) + exhausted
+        retry_count = len(retry) - exhausted
+    else:
+        failed_count, retry_count = len(failed), 0
+    
+    await db.commit()
+    
+    SETTLED_TRANSACTIONS.labels(outcome=COMPLETED).inc(len(completed))
+    SETTLED_TRANSACTIONS.labels(outcome=FAILED).inc(failed_count)
+    SETTLED_TRANSACTIONS.labels(outcome=RETRY).inc(retry_count)
+    SETTLEMENT_BATCH_SECONDS.observe(time.perf_counter() - started)
+    
+    logger.info(
+        "Settlement batch processed",
+        claimed=len(transactions),
+        completed=len(completed),
+        failed=failed_count,
+        retried=retry_count,
+    )
+    return len(transactions)
+
+
+class SettlementWorkerPool:
+    """
+    N concurrent settlement workers, each on its own session
+    A worker keeps claiming while batches come back full and sleeps for
+    SETTLEMENT_POLL_INTERVAL_SECONDS once the queue is drained.
+    """
+    
+    def __init__(self, workers: Optional[int] = None, processor=None):
+        self.workers = workers or settings.SETTLEMENT_WORKERS
+        self.processor = processor or load_processor()
+        self._tasks: list[asyncio.Task] = []
+    
+    async def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run(n)) for n in range(self.workers)]
+            logger.info("Settlement workers started", workers=self.workers)
+    
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    async def _run(self, worker: int):
+        batch_size = settings.SETTLEMENT_BATCH_SIZE
+        while True:
+            try:
+                async with AsyncSessionLocal() as session:
+                    claimed = await settle_batch(session, self.processor, batch_size)
+            except Exception as e:
+                logger.error("Settlement batch failed", worker=worker, error=str(e))
+                claimed = 0
+            if claimed < batch_size:
+                await asyncio.sleep(settings.SETTLEMENT_POLL_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    import argparse
+    from prometheus_client import start_http_server
+    
+    parser = argparse.ArgumentParser(description="Run settlement workers")
+    parser.add_argument("--workers", type=int, default=settings.SETTLEMENT_WORKERS)
+    args = parser.parse_args()
+    
+    async def main():
+        if settings.ENABLE_METRICS:
+            start_http_server(settings.METRICS_PORT)
+        pool = SettlementWorkerPool(workers=args.workers)
+        await pool.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await pool.stop()
+    
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Monthly Statement Summaries
+Incrementally maintained rollup of transactions per user and month.
+
+The refresh job scans transactions changed since its watermark, and fully
+recomputes each (user, month) bucket those rows belong to (so a status flip
+on an old transaction is absorbed too). The watermark only advances to the
+commit horizon (see COMMIT_HORIZON_SQL): updated_at is the writer's
+transaction start, so a long settlement batch or bulk ingest commits rows
+stamped well before it ends, and those are still ahead of the watermark.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import COMMIT_HORIZON_SQL
+import structlog
+
+logger = structlog.get_logger()
+
+WATERMARK_NAME = "monthly_summaries"
+
+
+async def refresh_monthly_summaries(db: AsyncSession) -> int:
+    """
+    Bring monthly_summaries up to date with recent transaction changes
+    Safe to run from several workers: only the holder of the watermark row
+    lock does the work. Returns the number of (user, month) buckets rebuilt.
+    """
+    await db.execute(
+        """
+        INSERT INTO rollup_watermarks (name, watermark, updated_at)
+        VALUES (:name, 'epoch', NOW())
+        ON CONFLICT (name) DO NOTHING
+        """,
+        {"name": WATERMARK_NAME}
+    )
+    await db.commit()
+    
+    # The horizon is read before the scan below takes its snapshot
+    result = await db.execute(
+        f"""
+        SELECT watermark, {COMMIT_HORIZON_SQL} AS horizon
+        FROM rollup_watermarks WHERE name = :name FOR UPDATE SKIP LOCKED
+        """,
+        {"name": WATERMARK_NAME}
+    )
+    state = result.fetchone()
+    if state is None:
+        # Another worker is refreshing
+        return 0
+    
+    lower = state.watermark
+    upper = state.horizon
+    if upper <= lower:
+        # A transaction older than the watermark is still open
+        await db.commit()
+        return 0
+    
+    await db.execute(
+        """
+        CREATE TEMPORARY TABLE dirty_months ON COMMIT DROP AS
+        SELECT DISTINCT user_id,
+               date_trunc('month', created_at AT TIME ZONE 'UTC')::date AS month
+        FROM transactions
+        WHERE updated_at >= :lower AND updated_at < :upper
+        """,
+        {"lower": lower, "upper": upper}
+    )
+    
+    await db.execute(
+        """
+        DELETE FROM monthly_summaries s
+        USING dirty_months d
+        WHERE s.user_id = d.user_id AND s.month = d.month
+        """
+    )
+    
+    await db.execute(
+        """
+        INSERT INTO monthly_summaries
+            (user_id, month, transaction_type, status, currency, count, total_minor, updated_at)
+        SELECT t.user_id, d.month, t.transaction_type::text, t.status::text, t.currency,
+               COUNT(*), SUM(t.amount_minor), NOW()
+        FROM dirty_months d
+        JOIN transactions t
+          ON t.user_id = d.user_id
+         AND t.created_at >= d.month::timestamp AT TIME ZONE 'UTC'
+         AND t.created_at < (d.month + INTERVAL '1 month')::timestamp AT TIME ZONE 'UTC'
+        GROUP BY t.user_id, d.month, t.transaction_type, t.status, t.currency
+        """
+    )
+    
+    result = await db.execute("SELECT COUNT(*) AS count FROM dirty_months")
+    rebuilt = result.fetchone().count
+    
+    await db.execute(
+        "UPDATE rollup_watermarks SET watermark = :upper, updated_at = NOW() WHERE name = :name",
+        {"upper": upper, "name": WATERMARK_NAME}
+    )
+    await db.commit()
+    
+    if rebuilt:
+        logger.info("Monthly summaries refreshed", buckets=rebuilt, watermark=upper.isoformat())
+    
+    return rebuilt
+
+
+if __name__ == "__main__":
+    import asyncio
+    from app.core.database import AsyncSessionLocal
+    
+    async def main():
+        async with AsyncSessionLocal() as session:
+            print(f"Rebuilt {await refresh_monthly_summaries(session)} monthly buckets")
+    
+    asyncio.run(main())
@@ -0,0 +1,323 @@
+"""
+Velocity Checks - Fraud Control on Transaction Creation
+"No more than X transactions or Y ZAR per user in the last N minutes".
+
+Each rule is a sliding window split into VELOCITY_BUCKETS ring-buffer slots
+holding a count and an amount, with running totals, so a check costs the
+same however many transactions the user made. Amounts are tracked in minor
+units of the rule's currency. With the Redis tier the same ring
+layout lives in one hash per user and rule, checked and updated atomically
+by a Lua script so all workers share the windows.
+
+A check that passes records the transaction straight away, so concurrent
+requests cannot all squeeze under a limit; if the transaction is then not
+created (the insert fails, or it was an idempotent replay) refund() takes it
+back out of the slots it was recorded in.
+"""
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional
+from app.core.config import settings
+from app.core.currency import to_minor_units
+from app.core.redis import get_redis, use_redis
+import structlog
+
+logger = structlog.get_logger()
+
+
+@dataclass(frozen=True)
+class VelocityRule:
+    """Limits over a sliding window; None disables a limit"""
+    name: str
+    window_seconds: int
+    max_count: Optional[int] = None
+    max_amount: Optional[Decimal] = None
+    currency: str = "ZAR"
+    
+    @property
+    def bucket_seconds(self) -> float:
+        return self.window_seconds / settings.VELOCITY_BUCKETS
+    
+    @property
+    def max_amount_minor(self) -> Optional[int]:
+        return None if self.max_amount is None else to_minor_units(self.max_amount, self.currency)
+    
+    @classmethod
+    def from_config(cls, config: dict) -> "VelocityRule":
+        return cls(
+            name=config["name"],
+            window_seconds=int(config["window_seconds"]),
+            max_count=config.get("max_count"),
+            max_amount=Decimal(str(config["max_amount"])) if config.get("max_amount") is not None else None,
+            currency=config.get("currency", "ZAR"),
+        )
+
+
+@dataclass
+class VelocityDecision:
+    """Outcome of a velocity check"""
+    allowed: bool
+    rule: Optional[str] = None
+    retry_after: int = 0
+    slots: tuple = ()  # Per rule, the slot an allowed transaction was recorded in
+    shared: bool = False  # Recorded in Redis rather than the local windows
+
+
+class _Window:
+    """Ring buffer of per-slot counts and amounts with running totals"""
+    __slots__ = ("slots", "counts", "amounts", "count", "amount", "last_slot")
+    
+    def __init__(self, size: int):
+        self.slots = [-1] * size
+        self.counts = [0] * size
+        self.amounts = [0] * size
+        self.count = 0
+        self.amount = 0
+        self.last_slot = -1
+    
+    def advance(self, now_slot: int):
+        """Expire slots that have left the window (at most one pass over the ring)"""
+        size = len(self.slots)
+        if now_slot <= self.last_slot:
+            return
+        start = max(self.last_slot + 1, now_slot - size + 1)
+        for slot in range(start, now_slot + 1):
+            position = slot % size
+            if self.slots[position] != slot:
+                self.count -= self.counts[position]
+                self.amount -= self.amounts[position]
+                self.slots[position] = slot
+                self.counts[position] = 0
+                self.amounts[position] = 0
+        self.last_slot = now_slot
+    
+    def add(self, now_slot: int, amount: int):
+        position = now_slot % len(self.slots)
+        self.counts[position] += 1
+        self.amounts[position] += amount
+        self.count += 1
+        self.amount += amount
+    
+    def remove(self, slot: int, amount: int):
+        """Take back one add() to `slot`, unless that slot has expired since"""
+        position = slot % len(self.slots)
+        if self.slots[position] == slot and self.counts[position] > 0:
+            self.counts[position] -= 1
+            self.amounts[position] -= amount
+            self.count -= 1
+            self.amount -= amount
+    
+    def oldest_active_slot(self, now_slot: int) -> int:
+        active = [
+            slot for slot, count in zip(self.slots, self.counts)
+            if count and slot > now_slot - len(self.slots)
+        ]
+        return min(active) if active else now_slot
+
+
+class LocalVelocityStore:
+    """
+    In-process velocity windows (development and single-worker use)
+    At most `max_keys` (user, rule) windows are kept; the least recently
+    used are evicted first, and windows idle for longer than their rule's
+    window are empty anyway.
+    """
+    
+    def __init__(self, max_keys: int):
+        self._windows: OrderedDict[tuple, _Window] = OrderedDict()
+        self._max_keys = max_keys
+    
+    async def check(self, user_id: int, rules: list[VelocityRule], amount: int, currency: str) -> VelocityDecision:
+        now = time.time()
+        windows = []
+        for rule in rules:
+            now_slot = int(now // rule.bucket_seconds)
+            window = self._window((user_id, rule.name))
+            window.advance(now_slot)
+            added = amount if currency == rule.currency else 0
+            if (rule.max_count is not None and window.count + 1 > rule.max_count) or (
+                added and rule.max_amount is not None and window.amount + added > rule.max_amount_minor
+            ):
+                expires_slot = window.oldest_active_slot(now_slot) + settings.VELOCITY_BUCKETS
+                return VelocityDecision(
+                    allowed=False,
+                    rule=rule.name,
+                    retry_after=max(1, math.ceil(expires_slot * rule.bucket_seconds - now)),
+                )
+            windows.append((window, now_slot, added))
+        
+        for window, now_slot, added in windows:
+            window.add(now_slot, added)
+        return VelocityDecision(allowed=True, slots=tuple(now_slot for _, now_slot, _ in windows))
+    
+    async def refund(self, user_id: int, rules: list[VelocityRule], amount: int, currency: str, slots: tuple):
+        for rule, slot in zip(rules, slots):
+            window = self._windows.get((user_id, rule.name))
+            if window is not None:
+                window.remove(slot, amount if currency == rule.currency else 0)
+    
+    def _window(self, key: tuple) -> _Window:
+        window = self._windows.get(key)
+        if window is None:
+            if len(self._windows) >= self._max_keys:
+                self._windows.popitem(last=False)
+            window = self._windows[key] = _Window(settings.VELOCITY_BUCKETS)
+        else:
+            self._windows.move_to_end(key)
+        return window
+
+
+# KEYS = one hash per rule for this user
+# ARGV = slots per window, then per rule: bucket seconds, max count, max amount, amount
+# (-1 disables a limit). Hash fields per ring position: s:<pos> (slot), c:<pos>, a:<pos>
+# Returns {0, 0, slot per rule} if allowed, else {rule index, seconds until the oldest slot expires}
+VELOCITY_SCRIPT = """
+local size = tonumber(ARGV[1])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local slots = {}
+for i = 1, #KEYS do
+    local base = 1 + (i - 1) * 4
+    local bucket = tonumber(ARGV[base + 1])
+    local max_count = tonumber(ARGV[base + 2])
+    local max_amount = tonumber(ARGV[base + 3])
+    local amount = tonumber(ARGV[base + 4])
+    local now_slot = math.floor(now / bucket)
+    slots[i] = now_slot
+    local fields = redis.call('HGETALL', KEYS[i])
+    local values = {}
+    for j = 1, #fields, 2 do
+        values[fields[j]] = tonumber(fields[j + 1])
+    end
+    local count, total, oldest = 0, 0, now_slot
+    for pos = 0, size - 1 do
+        local slot = values['s:' .. pos]
+        if slot and slot > now_slot - size then
+            count = count + (values['c:' .. pos] or 0)
+            total = total + (values['a:' .. pos] or 0)
+            if slot < oldest then oldest = slot end
+        end
+    end
+    if (max_count >= 0 and count + 1 > max_count) or
+       (max_amount >= 0 and amount > 0 and total + amount > max_amount) then
+        return {i, math.ceil((oldest + size) * bucket - now)}
+    end
+end
+for i = 1, #KEYS do
+    local base = 1 + (i - 1) * 4
+    local bucket = tonumber(ARGV[base + 1])
+    local amount = tonumber(ARGV[base + 4])
+    local pos = slots[i] % size
+    if tonumber(redis.call('HGET', KEYS[i], 's:' .. pos)) ~= slots[i] then
+        redis.call('HSET', KEYS[i], 's:' .. pos, slots[i], 'c:' .. pos, 0, 'a:' .. pos, 0)
+    end
+    redis.call('HINCRBY', KEYS[i], 'c:' .. pos, 1)
+    redis.call('HINCRBY', KEYS[i], 'a:' .. pos, amount)
+    redis.call('EXPIRE', KEYS[i], math.ceil(bucket * size) + 1)
+end
+return {0, 0, unpack(slots)}
+"""
+
+# KEYS = one hash per rule for this user
+# ARGV = slots per window, then per rule: the slot recorded in, amount
+# Skips a rule whose ring position has since moved on to a newer slot
+VELOCITY_REFUND_SCRIPT = """
+local size = tonumber(ARGV[1])
+for i = 1, #KEYS do
+    local slot = tonumber(ARGV[2 * i])
+    local amount = tonumber(ARGV[2 * i + 1])
+    local pos = slot % size
+    if tonumber(redis.call('HGET', KEYS[i], 's:' .. pos)) == slot and
+       tonumber(redis.call('HGET', KEYS[i], 'c:' .. pos) or 0) > 0 then
+        redis.call('HINCRBY', KEYS[i], 'c:' .. pos, -1)
+        redis.call('HINCRBY', KEYS[i], 'a:' .. pos, -amount)
+    end
+end
+return 0
+"""
+
+
+class RedisVelocityStore:
+    """Shared velocity windows in Redis, checked and updated atomically"""
+    
+    def __init__(self):
+        self._script = None
+        self._refund_script = None
+    
+    async def check(self, user_id: int, rules: list[VelocityRule], amount: int, currency: str) -> VelocityDecision:
+        if self._script is None:
+            self._script = get_redis().register_script(VELOCITY_SCRIPT)
+        args = [settings.VELOCITY_BUCKETS]
+        for rule in rules:
+            args += [
+                rule.bucket_seconds,
+                -1 if rule.max_count is None else rule.max_count,
+                -1 if rule.max_amount is None else rule.max_amount_minor,
+                amount if currency == rule.currency else 0,
+            ]
+        denied_rule, retry_after, *slots = await self._script(
+            keys=[f"velocity:{user_id}:{rule.name}" for rule in rules],
+            args=args,
+        )
+        if int(denied_rule) == 0:
+            return VelocityDecision(allowed=True, slots=tuple(int(slot) for slot in slots), shared=True)
+        return VelocityDecision(
+            allowed=False,
+            rule=rules[int(denied_rule) - 1].name,
+            retry_after=max(1, int(retry_after)),
+        )
+    
+    async def refund(self, user_id: int, rules: list[VelocityRule], amount: int, currency: str, slots: tuple):
+        if self._refund_script is None:
+            self._refund_script = get_redis().register_script(VELOCITY_REFUND_SCRIPT)
+        args = [settings.VELOCITY_BUCKETS]
+        for rule, slot in zip(rules, slots):
+            args += [slot, amount if currency == rule.currency else 0]
+        await self._refund_script(
+            keys=[f"velocity:{user_id}:{rule.name}" for rule in rules],
+            args=args,
+        )
+
+
+class VelocityEngine:
+    """
+    Checks and records a transaction against every velocity rule
+    A transaction is only counted if it passes all rules, and is refunded
+    if it is then not created.
+    """
+    
+    def __init__(self):
+        self.rules = [VelocityRule.from_config(rule) for rule in settings.VELOCITY_RULES]
+        self._local_store = LocalVelocityStore(settings.VELOCITY_MAX_KEYS)
+        self._redis_store = RedisVelocityStore() if use_redis() else None
+    
+    async def check(self, user_id: int, amount_minor: int, currency: str) -> VelocityDecision:
+        if not settings.VELOCITY_ENABLED or not self.rules:
+            return VelocityDecision(allowed=True)
+        currency = currency.upper()
+        if self._redis_store is not None:
+            try:
+                return await self._redis_store.check(user_id, self.rules, amount_minor, currency)
+            except Exception as e:
+                logger.warning("Velocity store unavailable, using local windows", error=str(e))
+        return await self._local_store.check(user_id, self.rules, amount_minor, currency)
+    
+    async def refund(self, user_id: int, amount_minor: int, currency: str, decision: VelocityDecision):
+        """Take back a transaction an allowed check recorded; never raises"""
+        if not decision.slots:
+            return
+        currency = currency.upper()
+        try:
+            if decision.shared:
+                await self._redis_store.refund(user_id, self.rules, amount_minor, currency, decision.slots)
+            else:
+                await self._local_store.refund(user_id, self.rules, amount_minor, currency, decision.slots)
+        except Exception as e:
+            logger.warning("Velocity refund failed", user_id=user_id, error=str(e))
+
+
+# Global velocity engine instance
+velocity_engine = VelocityEngine()
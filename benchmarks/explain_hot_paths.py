@@ -0,0 +1,74 @@
+"""
+EXPLAIN Hot Paths
+Prints EXPLAIN (ANALYZE, BUFFERS) for the hot queries so index changes can be
+checked before and after a migration
+
+Usage:
+    python -m benchmarks.explain_hot_paths [--user-id 1] [--account ACC-0001]
+"""
+import argparse
+import asyncio
+import asyncpg
+from app.core.config import settings
+
+HOT_QUERIES = {
+    "list_transactions (user)": (
+        "SELECT * FROM transactions WHERE user_id = $1 "
+        "ORDER BY created_at DESC, id DESC LIMIT 101"
+    ),
+    "list_transactions (admin)": (
+        "SELECT * FROM transactions ORDER BY created_at DESC, id DESC LIMIT 101"
+    ),
+    "pending transactions": (
+        "SELECT id FROM transactions WHERE status = 'pending' "
+        "ORDER BY created_at, id LIMIT 100"
+    ),
+    "search (staff, date window + amount)": (
+        "SELECT * FROM transactions WHERE created_at >= NOW() - INTERVAL '30 days' "
+        "AND amount_minor >= 1000000 ORDER BY created_at DESC, id DESC LIMIT 101"
+    ),
+    "search (counterparty)": (
+        "SELECT * FROM transactions WHERE (recipient_account = $1 OR sender_account = $1) "
+        "ORDER BY created_at DESC, id DESC LIMIT 101"
+    ),
+    "search (failed)": (
+        "SELECT * FROM transactions WHERE status = 'failed' "
+        "AND created_at >= NOW() - INTERVAL '7 days' ORDER BY created_at DESC, id DESC LIMIT 101"
+    ),
+    "search (user, type)": (
+        "SELECT * FROM transactions WHERE user_id = $1 AND transaction_type = 'payment' "
+        "ORDER BY created_at DESC, id DESC LIMIT 101"
+    ),
+    "DSAR audit logs": (
+        "SELECT * FROM audit_logs WHERE user_id = $1 ORDER BY timestamp DESC LIMIT 100"
+    ),
+    "consent check": (
+        "SELECT consent_given FROM consents WHERE user_id = $1 AND purpose = 'MARKETING'"
+    ),
+}
+
+
+# Queries whose $1 is a counterparty account rather than a user id
+ACCOUNT_QUERIES = {"search (counterparty)"}
+
+
+async def run(user_id: int, account: str):
+    conn = await asyncpg.connect(settings.DATABASE_URL.replace("+asyncpg", ""))
+    try:
+        for name, query in HOT_QUERIES.items():
+            args = [account if name in ACCOUNT_QUERIES else user_id] if "$1" in query else []
+            rows = await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {query}", *args)
+            print(f"== {name}")
+            for row in rows:
+                print(row[0])
+            print()
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--account", default="ACC-0001")
+    args = parser.parse_args()
+    asyncio.run(run(args.user_id, args.account))
@@ -0,0 +1,72 @@
+"""
+Hot Account Transfer Benchmark
+Concurrent transfers from many senders into one hot account, posted the way
+ledger.post_account_legs does (one upsert, ordered by account and shard), for
+increasing sub-ledger shard counts. Throughput should grow with the shard
+count until it stops being the bottleneck. Uses scratch tables only.
+
+Usage:
+    python -m benchmarks.hot_account_transfers [--workers 32] [--seconds 10] [--shards 1,2,4,8,16]
+"""
+import argparse
+import asyncio
+import random
+import time
+import asyncpg
+from app.core.config import settings
+
+HOT_ACCOUNT = "MERCHANT-HOT"
+
+POST_SQL = """
+INSERT INTO bench_account_balances (account, currency, shard, amount_minor)
+SELECT account, 'ZAR', floor(random() * CASE WHEN account = $3 THEN $4 ELSE 1 END)::smallint, amount_minor
+FROM unnest($1::text[], $2::bigint[]) AS legs(account, amount_minor)
+ORDER BY 1, 3
+ON CONFLICT (account, currency, shard)
+DO UPDATE SET amount_minor = bench_account_balances.amount_minor + EXCLUDED.amount_minor
+"""
+
+
+async def worker(pool: asyncpg.Pool, shards: int, deadline: float) -> int:
+    transfers = 0
+    async with pool.acquire() as conn:
+        while time.perf_counter() < deadline:
+            sender = f"SENDER-{random.randrange(10000)}"
+            async with conn.transaction():
+                await conn.execute(POST_SQL, [sender, HOT_ACCOUNT], [-1000, 1000], HOT_ACCOUNT, shards)
+            transfers += 1
+    return transfers
+
+
+async def run(workers: int, seconds: float, shard_counts: list[int]):
+    dsn = settings.DATABASE_URL.replace("+asyncpg", "")
+    pool = await asyncpg.create_pool(dsn, min_size=workers, max_size=workers)
+    try:
+        for shards in shard_counts:
+            async with pool.acquire() as conn:
+                await conn.execute("DROP TABLE IF EXISTS bench_account_balances")
+                await conn.execute(
+                    "CREATE UNLOGGED TABLE bench_account_balances ("
+                    "account varchar(50), currency varchar(3), shard smallint, amount_minor bigint, "
+                    "PRIMARY KEY (account, currency, shard))"
+                )
+            deadline = time.perf_counter() + seconds
+            counts = await asyncio.gather(*(worker(pool, shards, deadline) for _ in range(workers)))
+            async with pool.acquire() as conn:
+                balance = await conn.fetchval(
+                    "SELECT SUM(amount_minor) FROM bench_account_balances WHERE account = $1", HOT_ACCOUNT
+                )
+            print(f"shards={shards:<3} {sum(counts) / seconds:>10.0f} transfers/s  hot balance {balance}")
+        async with pool.acquire() as conn:
+            await conn.execute("DROP TABLE IF EXISTS bench_account_balances")
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--shards", default="1,2,4,8,16")
+    args = parser.parse_args()
+    asyncio.run(run(args.workers, args.seconds, [int(n) for n in args.shards.split(",")]))
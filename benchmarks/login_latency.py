@@ -0,0 +1,70 @@
+"""
+Login Latency Benchmark
+Measures p50/p95/p99 latency of POST /api/v1/auth/login against a running server
+
+Usage:
+    python -m benchmarks.login_latency --base-url http://localhost:8000 \\
+        --requests 2000 --concurrency 50
+
+Run it on the commit before and after a change to compare the hot path.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+import httpx
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run(base_url: str, total: int, concurrency: int):
+    """Register a throwaway user, then hammer the login endpoint"""
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "BenchPassword123!"
+    
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        await client.post(
+            "/api/v1/auth/register",
+            json={"email": email, "password": password},
+        )
+        
+        latencies: list[float] = []
+        errors = 0
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def one_login():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/api/v1/auth/login",
+                    json={"email": email, "password": password},
+                )
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(one_login() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+    
+    print(f"requests:   {total} (concurrency {concurrency}, errors {errors})")
+    print(f"throughput: {total / elapsed:.1f} req/s")
+    print(f"mean:       {statistics.mean(latencies):.2f} ms")
+    for pct in (50, 95, 99):
+        print(f"p{pct}:        {percentile(latencies, pct):.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.requests, args.concurrency))
@@ -0,0 +1,97 @@
+"""
+Minor-Unit Amount Benchmark
+Compares NUMERIC(15,2) and BIGINT minor-unit amounts for the aggregate
+queries behind summaries and reconciliation (SUM ... GROUP BY), and the
+cost of serializing response amounts from Decimal and from minor units.
+
+Usage:
+    python -m benchmarks.minor_unit_amounts [--rows 2000000] [--users 10000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from decimal import Decimal
+import asyncpg
+from app.core.config import settings
+from app.core.currency import format_minor_units, from_minor_units
+
+SCHEMES = {
+    "numeric(15,2)": "numeric(15, 2)",
+    "bigint minor": "bigint",
+}
+
+AGGREGATE_SQL = "SELECT user_id, currency, SUM(amount), COUNT(*) FROM {table} GROUP BY user_id, currency"
+
+
+async def run_aggregate(conn: asyncpg.Connection, name: str, column_type: str, rows: int, users: int, repeat: int) -> dict:
+    table = "bench_amounts"
+    await conn.execute(f"DROP TABLE IF EXISTS {table}")
+    await conn.execute(
+        f"CREATE UNLOGGED TABLE {table} (user_id int NOT NULL, currency char(3) NOT NULL, amount {column_type} NOT NULL)"
+    )
+    scale = "" if column_type == "bigint" else " / 100.0"
+    await conn.execute(
+        f"""
+        INSERT INTO {table}
+        SELECT (random() * $1)::int, 'ZAR', (random() * 10000000)::bigint{scale}
+        FROM generate_series(1, $2)
+        """,
+        users, rows,
+    )
+    await conn.execute(f"VACUUM ANALYZE {table}")
+    
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await conn.fetch(AGGREGATE_SQL.format(table=table))
+        timings.append(time.perf_counter() - started)
+    
+    table_bytes = await conn.fetchval(f"SELECT pg_relation_size('{table}')")
+    await conn.execute(f"DROP TABLE {table}")
+    return {
+        "scheme": name,
+        "best_ms": min(timings) * 1000,
+        "table_mb": table_bytes / (1024 * 1024),
+    }
+
+
+def run_serialization(count: int) -> dict:
+    minors = [random.randint(1, 10_000_000) for _ in range(count)]
+    decimals = [from_minor_units(minor, "ZAR") for minor in minors]
+    
+    started = time.perf_counter()
+    json.dumps([{"amount": str(amount.quantize(Decimal("0.01")))} for amount in decimals])
+    decimal_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    json.dumps([{"amount": format_minor_units(minor, "ZAR")} for minor in minors])
+    minor_seconds = time.perf_counter() - started
+    
+    return {"decimal": count / decimal_seconds, "minor": count / minor_seconds}
+
+
+async def run(rows: int, users: int, repeat: int):
+    conn = await asyncpg.connect(settings.DATABASE_URL.replace("+asyncpg", ""))
+    try:
+        for name, column_type in SCHEMES.items():
+            result = await run_aggregate(conn, name, column_type, rows, users, repeat)
+            print(
+                f"{result['scheme']:<14} SUM/GROUP BY {result['best_ms']:>8.1f} ms  "
+                f"table {result['table_mb']:.1f} MB"
+            )
+    finally:
+        await conn.close()
+    
+    serialization = run_serialization(min(rows, 200000))
+    print(f"{'serialize':<14} Decimal {serialization['decimal']:>10.0f}/s  minor units {serialization['minor']:>10.0f}/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.users, args.repeat))
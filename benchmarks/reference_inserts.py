@@ -0,0 +1,66 @@
+"""
+Reference Insert Benchmark
+Compares insert throughput and unique B-tree size for random (uuid4) and
+time-ordered (ULID-style) transaction references. Each scheme is inserted
+into its own scratch table with a unique index on reference.
+
+Usage:
+    python -m benchmarks.reference_inserts [--rows 1000000] [--batch 1000]
+"""
+import argparse
+import asyncio
+import time
+import uuid
+import asyncpg
+from app.core.config import settings
+from app.transactions.references import ReferenceGenerator
+
+SCHEMES = {
+    "random (uuid4)": lambda: f"TXN-{uuid.uuid4().hex[:12].upper()}",
+    "time-ordered": ReferenceGenerator().generate,
+}
+
+
+async def run_scheme(conn: asyncpg.Connection, name: str, generate, rows: int, batch: int) -> dict:
+    await conn.execute("DROP TABLE IF EXISTS bench_references")
+    await conn.execute(
+        "CREATE UNLOGGED TABLE bench_references (id bigserial PRIMARY KEY, reference varchar(100) NOT NULL)"
+    )
+    await conn.execute("CREATE UNIQUE INDEX bench_references_reference ON bench_references (reference)")
+    
+    started = time.perf_counter()
+    for _ in range(0, rows, batch):
+        await conn.executemany(
+            "INSERT INTO bench_references (reference) VALUES ($1)",
+            [(generate(),) for _ in range(batch)],
+        )
+    elapsed = time.perf_counter() - started
+    
+    index_bytes = await conn.fetchval("SELECT pg_relation_size('bench_references_reference')")
+    await conn.execute("DROP TABLE bench_references")
+    return {
+        "scheme": name,
+        "rows_per_second": rows / elapsed,
+        "index_mb": index_bytes / (1024 * 1024),
+    }
+
+
+async def run(rows: int, batch: int):
+    conn = await asyncpg.connect(settings.DATABASE_URL.replace("+asyncpg", ""))
+    try:
+        for name, generate in SCHEMES.items():
+            result = await run_scheme(conn, name, generate, rows, batch)
+            print(
+                f"{result['scheme']:<16} {result['rows_per_second']:>10.0f} rows/s  "
+                f"index {result['index_mb']:.1f} MB"
+            )
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.batch))